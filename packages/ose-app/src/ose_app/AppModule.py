@@ -97,11 +97,14 @@ class AppModule(Module):
     def file_cache(self, config: ConfigurationService) -> FileCache:
         life_time: typing.Union[int, None] = config.app_config.get("CACHE_LIFETIME", None)
         cache_dir = config.app_config.get("CACHE_DIR")
+        limits = dict(max_bytes=config.app_config.get("CACHE_MAX_BYTES", None),
+                      max_entries=config.app_config.get("CACHE_MAX_ENTRIES", None),
+                      quotas=config.app_config.get("CACHE_QUOTAS", None))
 
         if life_time is not None:
-            return FileCache(cache_dir, life_time)
+            return FileCache(cache_dir, life_time, **limits)
         else:
-            return FileCache(cache_dir)
+            return FileCache(cache_dir, **limits)
         
     @provider
     @singleton
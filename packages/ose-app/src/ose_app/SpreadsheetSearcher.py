@@ -11,7 +11,8 @@ from ose.index.FileStorage import FileStorage
 from ose.index.create_index import add_entity_data_to_index, re_write_entity_data_set
 from ose.index.schema import schema
 from ose.services.ConfigurationService import ConfigurationService
-from ose.utils.github import get_spreadsheet, get_spreadsheets
+from ose.services.RepositorySnapshot import RepositorySnapshot
+from ose.utils.github import parse_spreadsheet
 
 
 class SpreadsheetSearcher:
@@ -175,10 +176,12 @@ class SpreadsheetSearcher:
                 active_sheets = config.indexed_files
                 regex = "|".join(f"({r})" for r in active_sheets)
 
-                excel_files = get_spreadsheets(self.github, config.full_name, branch, include_pattern=regex)
+                snapshot = RepositorySnapshot.load(self.github, config.full_name, branch)
+                excel_files = [p for p in snapshot.paths(include_pattern=regex) if p.endswith(".xlsx")]
+                snapshot.prefetch(excel_files)
 
                 for file in excel_files:
-                    _, data, _ = get_spreadsheet(self.github, config.full_name, file)
+                    data, _ = parse_spreadsheet(snapshot.read(file))
 
                     entity_data = data
 
@@ -18,6 +18,11 @@ GITHUB_CLIENT_SECRET = None
 
 CACHE_DIR = os.path.join(os.environ.get("HOME", "/"), ".cache", "ose")
 CACHE_LIFE_TIME = None
+# Limits of the cache. The least recently used files are removed once one is exceeded.
+CACHE_MAX_BYTES = None
+CACHE_MAX_ENTRIES = None
+# Maximum bytes by namespace, i.e. "github", "url", or "computed"
+CACHE_QUOTAS = dict()
 
 USERS = dict()
 
@@ -31,6 +36,10 @@ REPOSITORIES_REPOSITORY_CONFIG_BASE_URL = 'repos/{full_name}/contents/{path}'
 REPOSITORIES_REPOSITORY_CONFIG_REQUEST_HEADERS = {
     "Accept": "application/vnd.github.raw+json",
 }
+# Seconds after which the latest commit of a repository is checked for changes of its configuration and release script
+REPOSITORIES_REPOSITORY_CONFIG_REFRESH_INTERVAL = 60
+# Secret of the GitHub webhook that notifies about pushes at /api/repo/webhook. Disabled if not set.
+GITHUB_WEBHOOK_SECRET = None
 
 BCIO_SEARCH_API_PATH = "https://api.bciosearch.org/"
 ADDICTO_VOCAB_API_PATH = "https://api.addictovocab.org/"
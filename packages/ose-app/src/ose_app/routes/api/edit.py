@@ -149,7 +149,9 @@ def get_suggestions(repo: str, permission_manager: PermissionManager, config: Co
 
     suggestions_external = []
     try:
-        release_script = ReleaseScript.from_json(json.loads(config.get_file(repo, repo.release_script_path)))
+        release_script = config.load_release_script(repo)
+        if release_script is None:
+            raise ValueError(f"No release script found at '{repo.release_script_path}'")
 
         external_raw = cache.get_from_github(gh, repo.full_name, release_script.external.target.file).decode()
 
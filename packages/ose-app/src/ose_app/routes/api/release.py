@@ -74,14 +74,10 @@ def get_release_script(repo: str, config: ConfigurationService):
         raise NotFound(f"No such repository '{repo}'.")
 
     # Try get from remote
-    data = config.get_file(repo_config, repo_config.release_script_path)
-    if data is None:
+    release_script = config.load_release_script(repo_config)
+    if release_script is None:
         raise NotFound(f"No release script for '{repo}'.")
 
-    data = json.loads(data)
-
-    release_script = ReleaseScript.from_json(data)
-
     if release_script.short_repository_name.lower() != repo.lower():
         raise BadRequest("Release script repository does not match requested repository")
 
@@ -133,6 +129,7 @@ def save_release_script(repo: str, config: ConfigurationService, gh: GitHub):
         commit_message,
         repo_config.main_branch,
     )
+    config.refresh(repo_config.full_name)
 
     return jsonify({"success": True})
 
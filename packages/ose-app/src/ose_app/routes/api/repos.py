@@ -1,12 +1,12 @@
-import json
+import hashlib
+import hmac
 import os.path
 from os.path import normpath
 
-from flask import Blueprint, g, jsonify, current_app
+from flask import Blueprint, g, jsonify, current_app, request
 from flask_github import GitHub
 
 from ose_app.guards.with_permission import requires_permissions
-from ose.model.ReleaseScript import ReleaseScript
 from ose.services.ConfigurationService import ConfigurationService
 from ose.utils import save_file
 
@@ -34,12 +34,10 @@ def install_workflow(gh: GitHub, config: ConfigurationService, repo: str, name:
     if not repo:
         return jsonify({"msg": f"No such repository '{repo}'", "success": False}), 404
 
-    release_script_json = config.get_file(repo, repo.release_script_path)
-    if not release_script_json:
+    release_script = config.load_release_script(repo)
+    if release_script is None:
         return jsonify({"msg": f"No release script found in '{repo}'", "success": False}), 404
 
-    release_script = ReleaseScript.from_json(json.loads(release_script_json))
-
     name = normpath(name).split("/")[-1]
     filepath = f"{current_app.static_folder}/workflows/{name}.yaml.jinja2"
     if not os.path.exists(filepath):
@@ -53,3 +51,25 @@ def install_workflow(gh: GitHub, config: ConfigurationService, repo: str, name:
                   f"Add {name} workflow", repo.main_branch)
 
     return jsonify({"msg": f"Workflow '{name}' installed", "success": True})
+
+
+@bp.route("/webhook", methods=["POST"])
+def push_webhook(config: ConfigurationService):
+    """
+    Receives push events of GitHub webhooks to load the changed configuration and release script of a repository.
+    The webhook must be configured with the secret GITHUB_WEBHOOK_SECRET.
+    """
+    secret = config.app_config.get("GITHUB_WEBHOOK_SECRET")
+    if not secret:
+        return jsonify({"msg": "Webhooks are not enabled", "success": False}), 404
+
+    signature = request.headers.get("X-Hub-Signature-256", "")
+    expected = "sha256=" + hmac.new(secret.encode(), request.get_data(), hashlib.sha256).hexdigest()
+    if not hmac.compare_digest(signature, expected):
+        return jsonify({"msg": "Invalid signature", "success": False}), 403
+
+    payload = request.get_json(silent=True) or {}
+    if request.headers.get("X-GitHub-Event") == "push" and "repository" in payload:
+        config.refresh(payload["repository"]["full_name"])
+
+    return jsonify({"success": True})
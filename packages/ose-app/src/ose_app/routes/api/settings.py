@@ -113,3 +113,12 @@ def clear_caches(cache: FileCache):
     cache.clear()
 
     return jsonify({"success": True, "message": "Caches cleared successfully"})
+
+
+@bp.route("/cache_stats", methods=["GET"])
+@requires_permissions("admin")
+def cache_stats(cache: FileCache):
+    """
+    Usage of the file cache, i.e. hits, misses, and evictions of this worker and the size of the cache.
+    """
+    return jsonify({"success": True, "stats": cache.stats()})
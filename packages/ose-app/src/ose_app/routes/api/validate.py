@@ -197,7 +197,9 @@ def validate_file(config: ConfigurationService, gh: GitHub, cache: FileCache):
     if "include-external" in repo.validation or "include-dependencies" in repo.validation:
         release_script: ReleaseScript
         try:
-            release_script = ReleaseScript.from_json(json.loads(config.get_file(repo, repo.release_script_path)))
+            release_script = config.load_release_script(repo)
+            if release_script is None:
+                raise ValueError(f"No release script found at '{repo.release_script_path}'")
         except Exception as e:
             current_app.logger.error(e)
             return jsonify({"success": False, "error": f"Failed to load release script: {e}"}), 500
@@ -1,5 +1,4 @@
 from collections.abc import Sequence
-import pickle
 import logging
 import re
 import traceback
@@ -8,7 +7,7 @@ from flask import Blueprint, g, json, jsonify
 from ose_app.guards.with_permission import requires_permissions
 from ose.model.Term import Term, UnresolvedTerm
 from ose.model.ExcelOntology import ExcelOntology
-from ose.model.ReleaseScript import ReleaseScript, ReleaseScriptFile
+from ose.model.ReleaseScript import ReleaseScriptFile
 from ose.model.TermIdentifier import TermIdentifier
 from ose.services.FileCache import FileCache
 from ose.services.ConfigurationService import ConfigurationService
@@ -57,17 +56,16 @@ def get_dependencies(
         cached_data = cache.retrieve(cache_key)
         if cached_data:
             logger.debug(f"Returning cached data for {cache_key}")
-            ontology_data = pickle.loads(cached_data)
+            ontology_data = json.loads(cached_data)
             return jsonify({"success": True, "data": ontology_data}), 200
 
         logger.debug(f"Cache miss for {cache_key}, loading from source")
 
         # Load release script
         logger.debug(f"Loading release script from {repository.release_script_path}")
-        release_script_json = json.loads(
-            config.get_file(repository, repository.release_script_path)
-        )
-        release_script = ReleaseScript.from_json(release_script_json)
+        release_script = config.load_release_script(repository)
+        if release_script is None:
+            raise ValueError(f"No release script found at '{repository.release_script_path}'")
         logger.debug("Release script loaded successfully")
 
         # Load externals
@@ -214,7 +212,7 @@ def get_dependencies(
         }
 
         # Cache the result
-        cache.store(cache_key, pickle.dumps(ontology_data))
+        cache.store(cache_key, json.dumps(ontology_data).encode())
         logger.debug(f"Cached result for {cache_key}")
 
         return jsonify({"success": True, "data": ontology_data}), 200
@@ -15,7 +15,7 @@ from openpyxl.styles import Font, PatternFill
 from ..SpreadsheetSearcher import SpreadsheetSearcher
 from ..guards.with_permission import requires_permissions
 from ose.services.ConfigurationService import ConfigurationService
-from ose.utils.github import get_spreadsheet, get_csv, create_branch
+from ose.utils.github import get_spreadsheet, get_csv, create_branch, get_revalidated
 import ose.utils.github as gh
 
 bp = Blueprint("edit", __name__, template_folder="../templates")
@@ -374,7 +374,8 @@ def checkForUpdates(github: GitHub, config: ConfigurationService):
         branch = request.form.get("branch", None)
         repository = config.get(repo_key)
         params = {"ref": branch} if branch else {}
-        spreadsheet_file = github.get(
+        spreadsheet_file = get_revalidated(
+            github,
             f'repos/{repository.full_name}/contents/{folder}/{spreadsheet}',
             params=params
         )
@@ -76,7 +76,8 @@ class ImportExternalCommand(ReleaseCommand):
             release_script.short_repository_name,
             working_dir,
             renamings,
-            new_parents
+            new_parents,
+            progress=lambda *_: self._raise_if_canceled()
         )
 
         self._raise_if_canceled()
@@ -15,6 +15,8 @@ class ReleaseArtifact(Base):
     downloadable = mapped_column(Boolean(), default=True)
     kind = mapped_column(String(), CheckConstraint(
         "kind in ('source', 'intermediate', 'final') and (kind <> 'final' or target_path is not null)"), )
+    input_digest = mapped_column(String(), nullable=True)  # Digest of inputs, set if the artifact may be reused
+    inputs = mapped_column(JSON(none_as_null=True), nullable=True)  # Dict from input name to its digest
 
     def as_dict(self):
         return {c.name: getattr(self, c.name) for c in self.__table__.columns}
@@ -0,0 +1,29 @@
+"""Added artifact input digests
+
+Revision ID: c4e1f0a9d2b7
+Revises: 487271aa555d
+Create Date: 2026-10-18 20:12:41.518204
+
+"""
+import sqlite3
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'c4e1f0a9d2b7'
+down_revision = '487271aa555d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("release_artifacts", sa.Column("input_digest", sa.String(), nullable=True))
+    op.add_column("release_artifacts", sa.Column("inputs", sa.JSON(none_as_null=True), nullable=True))
+
+
+def downgrade():
+    # Dropping columns is only supported for sqlite >= 3.35.0
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        op.drop_column("release_artifacts", "inputs")
+        op.drop_column("release_artifacts", "input_digest")
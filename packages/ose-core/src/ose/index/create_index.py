@@ -1,12 +1,14 @@
 import io
+import itertools
 import logging
 from typing import List, Union, Dict
 
-import openpyxl
 from whoosh.index import FileIndex
 from whoosh.qparser import MultifieldParser
 from whoosh.writing import SegmentWriter
 
+from ..utils.spreadsheets import open_sheet
+
 _logger = logging.getLogger(__name__)
 
 EntityData = Dict[str, str]
@@ -22,17 +24,11 @@ def parse_input_sheet(file: Union[str, bytes, io.BytesIO]) -> List[EntityData]:
     :param file: The Excel file. Either a filename or bytes of the Excel file
     :return: Pairs of headers and data
     """
-    if isinstance(file, bytes):
-        file = io.BytesIO(file)
-
-    wb = openpyxl.load_workbook(file)
-
-    sheet = wb.active
-    data = sheet.rows
+    _, data = open_sheet(file)
 
-    header = [i.value for i in next(data)]
+    header = list(next(data, ()))
 
-    return [{header[i]: cell.value for i, cell in enumerate(row)} for row in data]
+    return [dict(itertools.zip_longest(header, row)) for row in data]
 
 
 def re_write_entity_data_set(repo_name: str, index: FileIndex, sheet_name: str, entity_data: List[EntityData]):
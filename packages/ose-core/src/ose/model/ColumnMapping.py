@@ -234,6 +234,16 @@ class ColumnMappingFactory(abc.ABC):
     def create_mapping(self, origin: str, column_name: str) -> ColumnMapping:
         pass
 
+    def try_create_mapping(self, origin: str, column_name: str) -> Optional[ColumnMapping]:
+        """
+        Creates the mapping for the column if this factory maps it.
+
+        :param origin: Origin of the column, e.g. the sheet name
+        :param column_name: Header of the column
+        :return: The mapping or None if the factory does not map the column
+        """
+        return self.create_mapping(origin, column_name) if self.maps(column_name) else None
+
 
 @dataclass
 class SingletonMappingFactory(ColumnMappingFactory):
@@ -249,16 +259,23 @@ class SingletonMappingFactory(ColumnMappingFactory):
 
 @dataclass
 class PatternMappingFactory(ColumnMappingFactory):
-    pattern: re.Pattern
+    pattern: Union[str, re.Pattern]
     mapping_factory: Callable[[str, str, re.Match], ColumnMapping]
 
+    def __post_init__(self):
+        self.pattern = re.compile(self.pattern)
+
     def maps(self, column_name: str) -> bool:
-        return re.match(self.pattern, column_name) is not None
+        return self.pattern.match(column_name) is not None
 
     def create_mapping(self, origin: str, column_name: str) -> ColumnMapping:
-        match = re.match(self.pattern, column_name)
+        match = self.pattern.match(column_name)
         return self.mapping_factory(origin, column_name, match)
 
+    def try_create_mapping(self, origin: str, column_name: str) -> Optional[ColumnMapping]:
+        match = self.pattern.match(column_name)
+        return self.mapping_factory(origin, column_name, match) if match is not None else None
+
 
 def singleton(excel_names: List[str], mapping: Callable[..., ColumnMapping], *args, **kwargs) -> ColumnMappingFactory:
     return SingletonMappingFactory(excel_names, mapping(*args, **{"name": excel_names[0], **kwargs}))
@@ -1,7 +1,14 @@
 import dataclasses
 import typing
+from collections import defaultdict
 
-from typing import Generic, List
+from typing import Generic, List, Iterable, Iterator, Dict, Any, Union, Callable, Hashable
+
+from .ExcelOntology import ExcelOntology
+from .Relation import Relation, UnresolvedRelation
+from .Term import Term, UnresolvedTerm
+from .TermIdentifier import TermIdentifier
+from ..utils import lower, str_space_normalise
 
 A = typing.TypeVar("A")
 
@@ -63,15 +70,179 @@ def diff(a, b, __path="") -> List[Diff]:
             if val_a != val_b:
                 results.append(Diff(path, val_a, val_b))
         elif isinstance(val_a, (list, tuple, set)):
-            adds = [v for v in val_b if v not in val_a]
-            removes = [v for v in val_a if v not in val_b]
-
-            for v in adds:
-                results.append(Diff(path, None, v, "add"))
-
-            for v in removes:
-                results.append(Diff(path, v, None, "remove"))
+            results.extend(_diff_values(path, val_a, val_b, _freeze))
         else:
             results.extend(diff(val_a, val_b, path))
 
     return results
+
+
+def _freeze(value: Any) -> Hashable:
+    """
+    Hashable value that is equal for equal values, e.g. for the dictionaries of dataclasses.
+    """
+    if isinstance(value, dict):
+        return frozenset((k, _freeze(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, set):
+        return frozenset(_freeze(v) for v in value)
+
+    return value
+
+
+def _diff_values(path: str, a: Iterable[Any], b: Iterable[Any], key: Callable[[Any], Hashable]) -> Iterator[Diff]:
+    """
+    Additions and removals between two collections. Values are compared by their key, so it takes linear time.
+    """
+    keys_a = set(key(v) for v in a)
+    keys_b = set(key(v) for v in b)
+
+    for v in b:
+        if key(v) not in keys_a:
+            yield Diff(path, None, v, "add")
+
+    for v in a:
+        if key(v) not in keys_b:
+            yield Diff(path, v, None, "remove")
+
+
+Entity = Union[Term, UnresolvedTerm, Relation, UnresolvedRelation]
+
+
+def _reference(value: Any) -> Hashable:
+    # Identifiers are compared by id so that renaming a parent or relation is only reported for the renamed entity
+    if isinstance(value, (TermIdentifier, Term, UnresolvedTerm, Relation, UnresolvedRelation)):
+        return ("id", value.id) if value.id is not None else ("label", value.label)
+
+    return _freeze(value)
+
+
+def _diff_relation_values(path: str, a: Entity, b: Entity) -> Iterator[Diff]:
+    values_a: Dict[Hashable, List[Any]] = defaultdict(list)
+    values_b: Dict[Hashable, List[Any]] = defaultdict(list)
+    for values, entity in [(values_a, a), (values_b, b)]:
+        for relation, value in entity.relations:
+            values[_reference(relation)].append(value)
+
+    for relation in values_a.keys() | values_b.keys():
+        old, new = values_a.get(relation, []), values_b.get(relation, [])
+        field = path + "." + str(relation[1])
+        if len(old) == 1 and len(new) == 1:
+            # A single value, e.g. a definition, is updated rather than replaced
+            if _reference(old[0]) != _reference(new[0]):
+                yield Diff(field, old[0], new[0])
+        else:
+            yield from _diff_values(field, old, new, _reference)
+
+
+def _diff_entity(path: str, a: Entity, b: Entity) -> Iterator[Diff]:
+    if a.label != b.label:
+        yield Diff(path + ".label", a.label, b.label)
+
+    yield from _diff_relation_values(path + ".relations", a, b)
+
+    if isinstance(a, (Term, UnresolvedTerm)):
+        yield from _diff_values(path + ".sub_class_of", a.sub_class_of, b.sub_class_of, _reference)
+        yield from _diff_values(path + ".equivalent_to", a.equivalent_to, b.equivalent_to, _freeze)
+        yield from _diff_values(path + ".disjoint_with", a.disjoint_with, b.disjoint_with, _reference)
+    else:
+        yield from _diff_values(path + ".sub_property_of", a.sub_property_of, b.sub_property_of, _reference)
+        yield from _diff_values(path + ".equivalent_relations", a.equivalent_relations, b.equivalent_relations,
+                                _reference)
+        yield from _diff_values(path + ".inverse_of", a.inverse_of, b.inverse_of, _reference)
+        if a.owl_property_type != b.owl_property_type:
+            yield Diff(path + ".owl_property_type", a.owl_property_type, b.owl_property_type)
+        for f in ["domain", "range"]:
+            old, new = getattr(a, f), getattr(b, f)
+            if (_reference(old) if old is not None else None) != (_reference(new) if new is not None else None):
+                yield Diff(path + "." + f, old, new)
+
+
+def _rename_keys(entity: Entity) -> List[Hashable]:
+    keys: List[Hashable] = []
+    label = str_space_normalise(lower(entity.label), none_as_empty=False)
+    if label:
+        keys.append(("label", label))
+
+    definition = next((v for r, v in entity.relations if r.id == "IAO:0000115" and isinstance(v, str)), None)
+    definition = str_space_normalise(lower(definition), none_as_empty=False)
+    if definition:
+        keys.append(("definition", definition))
+
+    return keys
+
+
+def diff_entities(path: str, a: Iterable[Entity], b: Iterable[Entity]) -> Iterator[Diff]:
+    """
+    Changes between two versions of the terms or relations of an ontology.
+
+    Entities are matched by id, or by label if they have no id. For each entity only in `b`, a diff with change type
+    "add" and the entity as new value is yielded, and for each entity only in `a` one with change type "remove". An
+    entity of `a` and one of `b` whose ids differ but whose labels or definitions are the same, ignoring case and
+    whitespace, are reported as "rename" from the old to the new entity if no other removed entity has the same
+    label or definition. For matched and renamed entities, the changes of their fields are reported with the path
+    `<path>.<id>.<field>`. Relation values are reported by relation, e.g. `<path>.<id>.relations.IAO:0000115`, and
+    a relation with one value on both sides as "update".
+
+    Entities are compared by hashing, so two versions of a whole ontology are compared in linear time. Changes are
+    yielded while comparing, so callers may stream them.
+
+    :param path: Prefix of the fields of the changes, e.g. "terms"
+    :param a: Old version of the entities
+    :param b: New version of the entities
+    :return: Changes from `a` to `b`
+    """
+    old: Dict[Hashable, Entity] = dict()
+    for entity in a:
+        old.setdefault(_reference(entity), entity)
+    new: Dict[Hashable, Entity] = dict()
+    for entity in b:
+        new.setdefault(_reference(entity), entity)
+
+    removed = [e for k, e in old.items() if k not in new]
+    added = [e for k, e in new.items() if k not in old]
+
+    # Group the removed entities by normalised label and definition. Only unambiguous matches are renames.
+    buckets: Dict[Hashable, List[Entity]] = defaultdict(list)
+    for entity in removed:
+        for k in _rename_keys(entity):
+            buckets[k].append(entity)
+
+    renamed_from: Dict[int, Entity] = dict()
+    renamed: set = set()
+    for entity in added:
+        candidates = [buckets[k] for k in _rename_keys(entity)]
+        match = next((c[0] for c in candidates if len(c) == 1 and id(c[0]) not in renamed), None)
+        if match is not None:
+            renamed_from[id(entity)] = match
+            renamed.add(id(match))
+
+    for k, entity in new.items():
+        previous = old.get(k)
+        if previous is None:
+            previous = renamed_from.get(id(entity))
+            if previous is None:
+                yield Diff(path, None, entity, "add")
+                continue
+
+            yield Diff(path, previous, entity, "rename")
+
+        yield from _diff_entity(f"{path}.{k[1]}", previous, entity)
+
+    for entity in removed:
+        if id(entity) not in renamed:
+            yield Diff(path, entity, None, "remove")
+
+
+def diff_ontologies(a: ExcelOntology, b: ExcelOntology) -> Iterator[Diff]:
+    """
+    Changes between two versions of an ontology, e.g. of the last release and the release candidate. Changes of
+    relations are reported with the path "relations", those of terms with the path "terms".
+
+    :param a: Old version of the ontology
+    :param b: New version of the ontology
+    :return: Changes from `a` to `b` as described in `diff_entities`
+    """
+    yield from diff_entities("relations", a.relations(), b.relations())
+    yield from diff_entities("terms", a.terms(), b.terms())
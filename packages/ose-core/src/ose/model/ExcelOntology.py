@@ -1,13 +1,13 @@
+import builtins
+import copy
 import csv
-import dataclasses
 import itertools
 import logging
 import os.path
 from dataclasses import dataclass, field
 from io import BytesIO
-from typing import Optional, Union, Iterator, List, Tuple, FrozenSet, Set, Literal, Dict
+from typing import Optional, Union, Iterator, List, Tuple, FrozenSet, Set, Literal, Dict, Generic, TypeVar, Iterable
 
-import openpyxl
 from openpyxl.workbook import Workbook
 from openpyxl.worksheet.worksheet import Worksheet
 import pyhornedowl as ho
@@ -21,7 +21,8 @@ from .Schema import Schema, DEFAULT_SCHEMA, DEFAULT_IMPORT_SCHEMA
 from .Term import Term, UnresolvedTerm
 from .TermIdentifier import TermIdentifier
 from .. import constants
-from ..utils import str_empty, lower, str_space_eq
+from ..utils import str_empty, lower, str_space_normalise
+from ..utils.spreadsheets import SheetRow, open_sheet
 
 # Same as js/common/model.ts
 DIAGNOSTIC_KIND = Literal[
@@ -60,6 +61,67 @@ def get_id(ontology: ho.PyIndexedOntology, iri: str):
     return id
 
 
+_E = TypeVar("_E", UnresolvedTerm, UnresolvedRelation, TermIdentifier)
+
+
+class _EntityIndex(Generic[_E]):
+    """
+    Hash index of entities by id and by label.
+
+    Entities sharing an id or label are kept in insertion order so that lookups return the same entity a linear scan
+    over the underlying list would. Entities only ever have to be added in the order of that list. Whenever ids or
+    labels are changed in place or entities are removed, the index must be rebuilt.
+    """
+    _by_id: Dict[Optional[str], List[_E]]
+    _by_label: Dict[Optional[str], List[_E]]
+    _order: Dict[int, int]
+
+    def __init__(self, entities: Iterable[_E] = ()):
+        self._by_id = {}
+        self._by_label = {}
+        self._order = {}
+        self.add_all(entities)
+
+    def add(self, entity: _E) -> None:
+        self._order[builtins.id(entity)] = len(self._order)
+        self._by_id.setdefault(entity.id, []).append(entity)
+        self._by_label.setdefault(entity.label, []).append(entity)
+
+    def add_all(self, entities: Iterable[_E]) -> None:
+        for entity in entities:
+            self.add(entity)
+
+    def rebuild(self, entities: Iterable[_E]) -> None:
+        self._by_id.clear()
+        self._by_label.clear()
+        self._order.clear()
+        self.add_all(entities)
+
+    def with_id(self, id: Optional[str]) -> List[_E]:
+        # Filter again in case an id was changed without rebuilding the index
+        return [e for e in self._by_id.get(id, []) if e.id == id]
+
+    def with_label(self, label: Optional[str]) -> List[_E]:
+        return [e for e in self._by_label.get(label, []) if e.label == label]
+
+    def matching(self, id: Optional[str], label: Optional[str]) -> List[_E]:
+        """
+        Entities with the given id or the given label in insertion order. ``None`` does not match anything.
+        """
+        by_id = self.with_id(id) if id is not None else []
+        by_label = self.with_label(label) if label is not None else []
+        if len(by_id) == 0 or len(by_label) == 0:
+            return by_id or by_label
+
+        merged = {builtins.id(e): e for e in by_id + by_label}
+        return sorted(merged.values(), key=lambda e: self._order[builtins.id(e)])
+
+    def __reduce__(self):
+        # The order is keyed by object ids which do not survive pickling. Rebuild the index from the entities instead.
+        entities = sorted((e for es in self._by_id.values() for e in es), key=lambda e: self._order[builtins.id(e)])
+        return self.__class__, (entities,)
+
+
 @dataclass
 class OntologyImport:
     id: str
@@ -81,6 +143,10 @@ class ExcelOntology:
     _discard_status: List[str]
     _ignore_status: List[str]
 
+    _term_index: _EntityIndex[UnresolvedTerm]
+    _relation_index: _EntityIndex[UnresolvedRelation]
+    _import_index: _EntityIndex[TermIdentifier]
+
     def __init__(self, iri: str, version_iri: Optional[str] = None, *,
                  ignore_terms_with_status: Optional[List[str]] = None,
                  discard_terms_with_status: Optional[List[str]] = None):
@@ -108,6 +174,10 @@ class ExcelOntology:
         self._imports = []
         self._used_relations = set()
 
+        self._term_index = _EntityIndex()
+        self._relation_index = _EntityIndex()
+        self._import_index = _EntityIndex()
+
         self._ignore_status = ignore_terms_with_status
         self._discard_status = discard_terms_with_status
 
@@ -123,46 +193,71 @@ class ExcelOntology:
     def imported_terms(self) -> List[TermIdentifier]:
         return [TermIdentifier(t.id, t.label) for o in self._imports for t in o.imported_terms]
 
+    def _is_included(self, term: UnresolvedTerm) -> bool:
+        status = lower(term.curation_status())
+        return not term.is_unresolved() and status not in self._discard_status and status not in self._ignore_status
+
+    def _is_ignored(self, term: Union[UnresolvedTerm, TermIdentifier]) -> bool:
+        return isinstance(term, UnresolvedTerm) and lower(term.curation_status()) in self._ignore_status
+
     def terms(self) -> List[Term]:
-        return [t.as_resolved() for t in self._terms if not t.is_unresolved() and
-                lower(t.curation_status()) not in self._discard_status and lower(
-            t.curation_status()) not in self._ignore_status]
+        return [t.as_resolved() for t in self._terms if self._is_included(t)]
 
     def term_by_label(self, label: str) -> Optional[Term]:
-        return next(iter(t for t in (self.terms() + self.imported_terms()) if t.label == label), None)
+        term = next((t for t in self._term_index.with_label(label) if self._is_included(t)), None)
+        if term is not None:
+            return term.as_resolved()
+
+        return next((TermIdentifier(t.id, t.label) for t in self._import_index.with_label(label)), None)
 
     def find_term_id(self, label: str) -> Optional[str]:
-        return next((t.id for t in (self._terms + self.imported_terms()) if t.label == label), None)
+        term = next(iter(self._term_index.with_label(label) + self._import_index.with_label(label)), None)
+        return term.id if term is not None else None
 
     def find_term_label(self, id: str) -> Optional[str]:
-        return next((t.label for t in (self._terms + self.imported_terms()) if t.id == id), None)
+        term = next(iter(self._term_index.with_id(id) + self._import_index.with_id(id)), None)
+        return term.label if term is not None else None
 
     def term_by_id(self, id: str | None) -> Optional[Term]:
-        return next(iter(t for t in (self.terms()) if t.id == id), None)
+        return next((t.as_resolved() for t in self._term_index.with_id(id) if self._is_included(t)), None)
 
     def _term_by_id(self, id: str) -> Optional[UnresolvedTerm]:
-        return next(iter(t for t in self._terms if t.id == id), None)
+        return next(iter(self._term_index.with_id(id)), None)
 
     def _term_by_label(self, label: str) -> Optional[UnresolvedTerm]:
-        return next(iter(t for t in self._terms if t.label == label), None)
+        return next(iter(self._term_index.with_label(label)), None)
 
     def _raw_term_by_id(self,
                         id: str,
                         exclude: Optional[UnresolvedTerm] = None) -> Optional[Union[UnresolvedTerm, TermIdentifier]]:
-        terms_ = [t for t in (self._terms + self.imported_terms()) if t.id == id and (exclude is None or exclude != t)]
-        terms_.sort(
-            key=lambda t: 1 if isinstance(t, UnresolvedTerm) and lower(
-                t.curation_status()) in self._ignore_status else 0)
-        return next(iter(terms_), None)
+        # Own terms take precedence over imported terms, but terms with an ignored status come last
+        ignored: Optional[UnresolvedTerm] = None
+        for t in self._term_index.with_id(id):
+            if exclude is not None and exclude == t:
+                continue
+
+            if not self._is_ignored(t):
+                return t
+
+            if ignored is None:
+                ignored = t
+
+        imported = next((TermIdentifier(t.id, t.label) for t in self._import_index.with_id(id)
+                         if exclude is None or exclude != t), None)
+
+        return imported if imported is not None else ignored
 
     def _raw_relation_by_id(self,
                             id: str,
                             exclude: Optional[UnresolvedRelation] = None
                             ) -> Optional[Union[UnresolvedRelation, TermIdentifier]]:
-        relations_ = [r for r in (self._relations + self.imported_terms())
-                      if r.id == id and (exclude is None or exclude != r)]
-        relations_.sort(key=lambda r: 1 if isinstance(r, UnresolvedRelation) else 0)
-        return next(iter(relations_), None)
+        # Imported relations take precedence over own relations
+        imported = next((TermIdentifier(t.id, t.label) for t in self._import_index.with_id(id)
+                         if exclude is None or exclude != t), None)
+        if imported is not None:
+            return imported
+
+        return next((r for r in self._relation_index.with_id(id) if exclude is None or exclude != r), None)
 
     def relations(self) -> List[Relation]:
         return [r.as_resolved() for r in self._relations if not r.is_unresolved()]
@@ -305,7 +400,19 @@ class ExcelOntology:
     def add_term(self, term: Term):
         self._used_relations = set.union(self._used_relations,
                                          {UnresolvedRelation(r.id, r.label) for r, _ in term.relations})
-        self._terms.append(UnresolvedTerm(**term.__dict__))
+        self._add_term(UnresolvedTerm(**term.as_dict()))
+
+    def _add_term(self, term: UnresolvedTerm) -> None:
+        self._terms.append(term)
+        self._term_index.add(term)
+
+    def _add_relation(self, relation: UnresolvedRelation) -> None:
+        self._relations.append(relation)
+        self._relation_index.add(relation)
+
+    def _add_import(self, ontology_import: OntologyImport) -> None:
+        self._imports.append(ontology_import)
+        self._import_index.add_all(ontology_import.imported_terms)
 
     def add_imported_terms(self, name: str, file: Union[bytes, str, BytesIO],
                            schema: Optional[Schema] = None) -> Result[tuple]:
@@ -319,28 +426,42 @@ class ExcelOntology:
         for i, row in enumerate(data):
             row_idx = i + 2  # +1 for zerobased +1 for header
             origin = (name, row_idx)
-            result = result.merge(
-                self._parse_import([(m, c.value) for m, c in zip(mapped, row) if m is not None],
-                                   dict(row=row_idx, origin=origin)))
+            result += self._parse_import([(m, c) for m, c in zip(mapped, row) if m is not None],
+                                         dict(row=row_idx, origin=origin))
 
             if result.ok():
                 term = result.value
                 term.origin = (name, row_idx)
-                self._imports.append(term)
+                self._add_import(term)
 
         return result.merge(Result(()))
 
     def import_other_excel_ontology(self, other: Self) -> Result[tuple]:
-        result = Result((), template=dict(file=other._iri))
+        return self.add_import(other.as_import())
+
+    def as_import(self) -> OntologyImport:
+        """
+        Compact form of this ontology for other ontologies that import it. Only holds the identifiers of the resolved
+        terms and relations.
+
+        :return: The import of this ontology
+        """
         imported_terms = []
-        for term in other._terms + other._relations:
+        for term in self._terms + self._relations:
             if not term.identifier().is_unresolved():
                 imported_terms.append(term.identifier())
 
-        ontology = OntologyImport(id=other._iri, imported_terms=[t for t in imported_terms])
-        self._imports.append(ontology)
+        return OntologyImport(id=self._iri, imported_terms=imported_terms)
 
-        return result
+    def add_import(self, ontology_import: OntologyImport) -> Result[tuple]:
+        """
+        Imports the terms of another ontology, e.g. created with `as_import`.
+
+        :param ontology_import: The import to add
+        """
+        self._add_import(ontology_import)
+
+        return Result((), template=dict(file=ontology_import.id))
 
     def import_excel_ontology_from_file(self, name: str, file: Union[bytes, str, BytesIO],
                                         schema: Optional[Schema] = None) -> Result[tuple]:
@@ -352,9 +473,8 @@ class ExcelOntology:
         for i, row in enumerate(data):
             row_idx = i + 2  # +1 for zerobased +1 for header
             origin = (name, row_idx)
-            result = result.merge(
-                self._parse_term([(m, c.value) for m, c in zip(mapped, row) if m is not None],
-                                 dict(row=row_idx, origin=origin)))
+            result += self._parse_term([(m, c) for m, c in zip(mapped, row) if m is not None],
+                                       dict(row=row_idx, origin=origin))
 
             if result.ok():
                 term = result.value
@@ -362,16 +482,31 @@ class ExcelOntology:
                 imported_terms.append(term.identifier())
 
         ontology = OntologyImport(id=name, imported_terms=[t for t in imported_terms])
-        self._imports.append(ontology)
+        self._add_import(ontology)
 
         return result.merge(Result(()))
 
     def merge(self, other: Self) -> None:
-        self._terms += other._terms
+        for term in other._terms:
+            self._add_term(term)
         self._used_relations = set.union(self._used_relations, other._used_relations)
-        self._imports += other._imports
-        self._relations += other._relations
-        
+        for ontology_import in other._imports:
+            self._add_import(ontology_import)
+        for relation in other._relations:
+            self._add_relation(relation)
+
+    def merge_copies(self, other: Self) -> None:
+        """
+        Adds copies of the terms and relations of another ontology, but not its imports. Resolving this ontology
+        afterwards does not change the other one.
+        """
+        terms, relations, used_relations = copy.deepcopy((other._terms, other._relations, other._used_relations))
+        for term in terms:
+            self._add_term(term)
+        self._used_relations = set.union(self._used_relations, used_relations)
+        for relation in relations:
+            self._add_relation(relation)
+
     def add_terms_from_list(self, data: list[list[str]], header: list[str], schema: Optional[Schema] =None, origin: Optional[str] = None) -> Result[tuple]:
         result = Result()
         if schema is None:
@@ -380,13 +515,9 @@ class ExcelOntology:
         if origin is None:
             origin = "<from_list>"
         
-        mapped: List[Optional[ColumnMapping]] = []
-        for h in header:
-            header_name = h.strip()
-            mapping = schema.get_mapping(origin, header_name)
-            
-            mapped.append(mapping)
-            
+        header_names = [h.strip() for h in header]
+        mapped = schema.get_mappings(origin, header_names)
+        for header_name, mapping in zip(header_names, mapped):
             if mapping is None and not schema.is_ignored(header_name):
                 result.warning(type='unknown-column',
                                column=header_name,
@@ -395,20 +526,19 @@ class ExcelOntology:
 
         for c in mapped:
             if isinstance(c, RelationColumnMapping):
-                self._used_relations.add(UnresolvedRelation(**c.relation.__dict__))
+                self._used_relations.add(UnresolvedRelation(**c.relation.as_dict()))
 
         result += Result(())
         for i, row in enumerate(data):
             row_idx = i + 2  # +1 for zerobased +1 for header
-            result = result.merge(
-                self._parse_term([(m, c) for m, c in zip(mapped, row) if m is not None],
-                                 dict(row=row_idx, origin=(origin, row_idx))))
+            result += self._parse_term([(m, c) for m, c in zip(mapped, row) if m is not None],
+                                       dict(row=row_idx, origin=(origin, row_idx)))
 
             if result.ok():
                 assert result.value is not None
                 term = result.value
                 term.origin = (origin, row_idx)
-                self._terms.append(term)
+                self._add_term(term)
 
         return result.merge(Result(()))
         
@@ -420,20 +550,19 @@ class ExcelOntology:
 
         for c in mapped:
             if isinstance(c, RelationColumnMapping):
-                self._used_relations.add(UnresolvedRelation(**c.relation.__dict__))
+                self._used_relations.add(UnresolvedRelation(**c.relation.as_dict()))
 
         result += Result((), template=dict(file=name))
         for i, row in enumerate(data):
             row_idx = i + 2  # +1 for zerobased +1 for header
             origin = (name, row_idx)
-            result = result.merge(
-                self._parse_term([(m, c.value) for m, c in zip(mapped, row) if m is not None],
-                                 dict(row=row_idx, origin=origin)))
+            result += self._parse_term([(m, c) for m, c in zip(mapped, row) if m is not None],
+                                       dict(row=row_idx, origin=origin))
 
             if result.ok():
                 term = result.value
                 term.origin = origin
-                self._terms.append(term)
+                self._add_term(term)
 
         return result.merge(Result(()))
 
@@ -444,21 +573,20 @@ class ExcelOntology:
 
         for c in mapped:
             if isinstance(c, RelationColumnMapping):
-                self._used_relations.add(UnresolvedRelation(**c.relation.__dict__))
+                self._used_relations.add(UnresolvedRelation(**c.relation.as_dict()))
 
         result += Result((), template=dict(file=name))
         for i, row in enumerate(data):
             row_idx = i + 2  # +1 for zerobased +1 for header
             origin = (name, row_idx)
-            result = result.merge(
-                self._parse_relation([(m, c.value) for m, c in zip(mapped, row) if m is not None],
-                                     dict(row=row_idx, origin=origin)))
+            result += self._parse_relation([(m, c) for m, c in zip(mapped, row) if m is not None],
+                                           dict(row=row_idx, origin=origin))
 
             if result.ok():
                 relation = result.value
                 relation.origin = (name, row_idx)
 
-                self._relations.append(relation)
+                self._add_relation(relation)
 
         return result.merge(Result(()))
 
@@ -500,77 +628,100 @@ class ExcelOntology:
                         term.label = label
 
                 if scope == 'import' or scope == 'all':
-                    term = next((t for i in self._imports for t in i.imported_terms if t.id == id), None)
+                    term = next(iter(self._import_index.with_id(id)), None)
 
                     if term is not None:
                         term.label = label
 
+        # Labels were changed in place
+        self._term_index.rebuild(self._terms)
+        self._import_index.rebuild(t for i in self._imports for t in i.imported_terms)
+
     def _open_excel(self, origin: str, file: Union[bytes, str, BytesIO], schema: Optional[Schema] = None) -> \
-            Result[Tuple[Iterator[Iterator[Optional[str]]], List[ColumnMapping]]]:
+            Result[Tuple[Iterator[SheetRow], List[ColumnMapping]]]:
         result = Result()
         if schema is None:
             schema = DEFAULT_SCHEMA
-        if isinstance(file, bytes):
-            file = BytesIO(file)
-        wb = openpyxl.load_workbook(file)
-        sheet: Worksheet = wb.active
-        data = sheet.rows
-        header = next(data)
-        mapped: List[ColumnMapping] = []
-        for h in header:
-            if h.value is None:
-                continue
-
-            header_name = h.value.strip()
-            mapping = schema.get_mapping(origin, header_name)
+        title, data = open_sheet(file)
+        header = next(data, ())
+        header_names = [h.strip() for h in header if h is not None]
+        mapped = schema.get_mappings(origin, header_names)
+        for header_name, mapping in zip(header_names, mapped):
             if mapping is None and not schema.is_ignored(header_name):
                 result.warning(type='unknown-column',
                                column=header_name,
-                               sheet=os.path.basename(file) if isinstance(file, str) else sheet.title)
-
-            mapped.append(mapping)
+                               sheet=os.path.basename(file) if isinstance(file, str) else title)
 
         result.value = (data, mapped)
         return result
 
     def resolve(self) -> Result[tuple]:
+        """
+        Complements references to terms and relations by id or label, e.g. parents, disjoint classes, relation
+        values, domains, ranges, parent relations, and the relations used as columns.
+
+        The candidates for each kind of reference are indexed once. Afterwards, every reference is resolved with a
+        single lookup. The number of references that were resolved and the number of references that remain
+        unresolved are reported as ``resolve-summary`` info.
+        """
         result = Result(())
         imported = self.imported_terms()
+        excluded_status = self._ignore_status + self._discard_status
+
+        def is_excluded(t: Union[UnresolvedTerm, TermIdentifier]) -> bool:
+            return isinstance(t, UnresolvedTerm) and lower(t.curation_status()) in excluded_status
+
+        # Own terms come before imported terms but terms with an ignored status come last
+        term_candidates = _EntityIndex(sorted(self._terms + imported, key=lambda t: 1 if self._is_ignored(t) else 0))
+        # Domains, ranges, and equivalent relations never refer to ignored or discarded terms
+        allowed_term_candidates = _EntityIndex(t for t in self._terms + imported if not is_excluded(t))
+        import_candidates = _EntityIndex(imported)
+
+        resolved = 0
+        unresolved = 0
+
+        def complement(reference: TermIdentifier, candidates: _EntityIndex) -> None:
+            nonlocal resolved, unresolved
+            if reference.is_resolved():
+                return
+
+            # An unresolved reference is missing either its id or its label, so only one key is left to look up
+            if reference.label is not None:
+                matching = candidates.with_label(reference.label)
+            elif reference.id is not None:
+                matching = candidates.with_id(reference.id)
+            else:
+                matching = []
+
+            for m in matching:
+                reference.complement(m)
+                if reference.is_resolved():
+                    break
+
+            if reference.is_resolved():
+                resolved += 1
+            else:
+                unresolved += 1
 
         for term in self._terms:
-            if lower(term.curation_status()) in self._ignore_status + self._discard_status:
+            if lower(term.curation_status()) in excluded_status:
                 self._logger.debug(f"Not resolving {term.curation_status()} term {term.label} ({term.id})")
                 continue
 
             if term.id is None or term.label is None:
                 self._logger.error(f"Term without id or label encountered. This should not happen. Term: {term}")
-                # continue
 
             if term.is_resolved():
                 continue
 
-            relation_values = [x for r, x in term.relations if isinstance(x, TermIdentifier)]
-            unresolved: List[TermIdentifier] = ([*term.sub_class_of, *term.disjoint_with] +
-                                                relation_values)
-            unresolved = [i for i in unresolved if i.is_unresolved()]
-            for unresolved_term in unresolved:
-                matching_terms = [t for t in (self._terms + imported) if t != unresolved_term and
-                                  (unresolved_term.label is not None and unresolved_term.label == t.label or
-                                   unresolved_term.id is not None and unresolved_term.id == t.id)]
-
-                matching_terms.sort(key=lambda t: 1 if isinstance(t, UnresolvedTerm) and (
-                        lower(t.curation_status()) in self._ignore_status) else 0)
-
-                for m in matching_terms:
-                    unresolved_term.complement(m)
+            for reference in itertools.chain(term.sub_class_of, term.disjoint_with,
+                                             (x for _, x in term.relations if isinstance(x, TermIdentifier))):
+                complement(reference, term_candidates)
 
-        for relation in self._relations:
-            if not relation.is_unresolved():
-                continue
-
-            matching_import = next((t for t in imported if
-                                    (relation.label is not None and relation.label == t.label or
-                                     relation.id is not None and relation.id == t.id)), None)
+        # Complete the relations themselves first, so that they can be found as parent relations of each other
+        unresolved_relations = [r for r in self._relations if r.is_unresolved()]
+        for relation in unresolved_relations:
+            matching_import = next(iter(import_candidates.matching(relation.id, relation.label)), None)
 
             if matching_import is not None:
                 if matching_import.id is not None:
@@ -578,66 +729,34 @@ class ExcelOntology:
                 if matching_import.label is not None:
                     relation.label = matching_import.label
 
-            if relation.range and relation.range.is_unresolved():
-                matching_terms = [t for t in (self._terms + imported) if
-                                  (relation.range.label is not None and relation.range.label == t.label or
-                                   relation.range.id is not None and relation.range.id == t.id)]
-
-                for m in matching_terms:
-                    if isinstance(m, UnresolvedTerm) and \
-                            lower(m.curation_status()) in self._ignore_status + self._discard_status:
-                        continue
-
-                    relation.range.complement(m)
+        # Ids and labels of relations may have been completed from imports
+        self._relation_index.rebuild(self._relations)
+        relation_candidates = _EntityIndex(self._relations + imported)
 
-            if relation.domain and relation.domain.is_unresolved():
-                matching_terms = [t for t in (self._terms + imported) if
-                                  (relation.domain.label is not None and relation.domain.label == t.label or
-                                   relation.domain.id is not None and relation.domain.id == t.id)]
+        for relation in unresolved_relations:
+            if relation.range is not None:
+                complement(relation.range, allowed_term_candidates)
 
-                for m in matching_terms:
-                    if isinstance(m, UnresolvedTerm) and \
-                            lower(m.curation_status()) in self._ignore_status + self._discard_status:
-                        continue
-
-                    relation.domain.complement(m)
+            if relation.domain is not None:
+                complement(relation.domain, allowed_term_candidates)
 
             for sub in relation.sub_property_of:
-                matching_terms = [t for t in (self._relations + imported) if
-                                  (sub.label is not None and sub.label == t.label or
-                                   sub.id is not None and sub.id == t.id)]
-
-                for m in matching_terms:
-                    if isinstance(m, UnresolvedTerm) and \
-                            lower(m.curation_status()) in self._ignore_status + self._discard_status:
-                        continue
-
-                    sub.complement(m)
+                complement(sub, relation_candidates)
 
             for er in relation.equivalent_relations:
-                matching_terms = [t for t in (self._terms + imported) if
-                                  (er.label is not None and er.label == t.label or
-                                   er.id is not None and er.id == t.id)]
-
-                for m in matching_terms:
-                    if isinstance(m, UnresolvedTerm) and \
-                            lower(m.curation_status()) in self._ignore_status + self._discard_status:
-                        continue
-
-                    er.complement(m)
+                complement(er, allowed_term_candidates)
 
+        resolved_relations = _EntityIndex(r for r in self._relations if not r.is_unresolved())
         replacements: List[Tuple[UnresolvedRelation, UnresolvedRelation]] = []
         for relation in self._used_relations:
             if relation.is_unresolved():
-                matching = next((r for r in self._relations if not r.is_unresolved() and (
-                        r.label == relation.label or r.id == id)), None)
+                matching = next(iter(resolved_relations.matching(relation.id, relation.label)), None)
 
                 if matching is not None:
                     replacements.append((relation, matching))
                     continue
 
-                matching = next((t for i in self._imports for t in i.imported_terms if
-                                 t.id == relation.id or t.label == relation.label), None)
+                matching = next(iter(import_candidates.matching(relation.id, relation.label)), None)
                 if matching is not None:
                     relation.id = matching.id
                     relation.label = matching.label
@@ -646,15 +765,25 @@ class ExcelOntology:
             self._used_relations.remove(old)
             self._used_relations.add(new)
 
+        used_relations = list(self._used_relations)
+        used_relations_by_label: Dict[Optional[str], List[UnresolvedRelation]] = {}
+        for r in used_relations:
+            used_relations_by_label.setdefault(r.label, []).append(r)
+
         for term in self._terms:
             for relation, _ in term.relations:
                 if relation.is_unresolved():
-                    used_relations = [r for r in self._used_relations if
-                                      (r.label is None or relation.label is None or relation.label == r.label) and
-                                      (r.id is None or relation.label is None or relation.label == r.label)]
-                    for r in used_relations:
+                    if relation.label is None:
+                        matching_used = used_relations
+                    else:
+                        matching_used = used_relations_by_label.get(relation.label, [])
+
+                    for r in matching_used:
                         relation.complement(r.identifier())
 
+        self._logger.debug(f"Resolved {resolved} references, {unresolved} remain unresolved")
+        result.info(type="resolve-summary", resolved=resolved, unresolved=unresolved)
+
         return result
 
     def validate(self,
@@ -691,11 +820,11 @@ class ExcelOntology:
 
             if c("missing-label") and term.label is None:
                 result.error(type="missing-label",
-                             term=term.__dict__)
+                             term=term.as_dict())
 
             if c("missing-id") and term.id is None:
                 result.error(type="missing-id",
-                             term=term.__dict__)
+                             term=term.as_dict())
 
             by_id.setdefault(term.id, []).append(term)
             by_label.setdefault(term.label, []).append(term)
@@ -707,50 +836,50 @@ class ExcelOntology:
                     if c("inconsistent-import"):
                         result.warning(type="inconsistent-import",
                                        imported_term=imported_term,
-                                       term=term.__dict__)
+                                       term=term.as_dict())
                 elif c("missing-import"):
                     result.warning(type="missing-import",
-                                   term=term.__dict__)
+                                   term=term.as_dict())
 
             if c("no-parent") and len(term.sub_class_of) < 1:
                 result.error(type="no-parent",
-                             term=term.__dict__)
+                             term=term.as_dict())
 
             for p in term.sub_class_of:
                 if c("unknown-parent") and p.is_unresolved():
                     result.error(type="unknown-parent",
-                                 term=term.__dict__,
-                                 parent=p.__dict__)
+                                 term=term.as_dict(),
+                                 parent=p.as_dict())
                 elif c("missing-parent", "ignored-parent"):
                     t = self._raw_term_by_id(p.id)
                     if c("missing-parent") and t is None:
                         result.error(type="missing-parent",
-                                     term=term.__dict__,
-                                     parent=p.__dict__)
+                                     term=term.as_dict(),
+                                     parent=p.as_dict())
                     elif c("ignored-parent") and isinstance(t, UnresolvedTerm) and lower(
                             t.curation_status()) in self._ignore_status:
                         result.error(type="ignored-parent",
                                      status=t.curation_status(),
-                                     term=term.__dict__,
-                                     parent=p.__dict__)
+                                     term=term.as_dict(),
+                                     parent=p.as_dict())
 
             for p in term.disjoint_with:
                 if c("unknown-disjoint") and p.is_unresolved():
                     result.error(type="unknown-disjoint",
-                                 term=term.__dict__,
-                                 disjoint_class=p.__dict__)
+                                 term=term.as_dict(),
+                                 disjoint_class=p.as_dict())
                 elif c("missing-disjoint", "ignored-disjoint"):
                     t = self._raw_term_by_id(p.id)
                     if c("missing-disjoint") and t is None:
                         result.error(type="missing-disjoint",
-                                     term=term.__dict__,
-                                     disjoint_class=p.__dict__)
+                                     term=term.as_dict(),
+                                     disjoint_class=p.as_dict())
                     elif c("ignored-disjoint") and isinstance(t, UnresolvedTerm) and lower(
                             t.curation_status()) in self._ignore_status:
                         result.error(type="ignored-disjoint",
                                      status=t.curation_status(),
-                                     term=term.__dict__,
-                                     disjoint_class=p.__dict__)
+                                     term=term.as_dict(),
+                                     disjoint_class=p.as_dict())
 
             for relation, value in term.relations:
                 if isinstance(value, TermIdentifier):
@@ -758,19 +887,19 @@ class ExcelOntology:
                         result.error(type="unknown-relation-value",
                                      relation=relation,
                                      value=value,
-                                     term=term.__dict__)
+                                     term=term.as_dict())
                     else:
                         t = self._raw_term_by_id(value.id)
                         if c("missing-relation-value") and t is None:
                             result.error(type="missing-relation-value",
-                                         term=term.__dict__,
+                                         term=term.as_dict(),
                                          relation=relation,
                                          value=value)
                         elif c("ignored-relation-value") and isinstance(t, UnresolvedTerm) and lower(
                                 t.curation_status()) in self._ignore_status:
                             result.error(type="ignored-relation-value",
                                          status=t.curation_status(),
-                                         term=term.__dict__,
+                                         term=term.as_dict(),
                                          relation=relation,
                                          value=value)
 
@@ -778,11 +907,11 @@ class ExcelOntology:
             result.template = {"row": relation.origin[1]} if relation.origin is not None else {}
             if c("missing-label") and relation.label is None:
                 result.error(type="missing-label",
-                             relation=relation.__dict__)
+                             relation=relation.as_dict())
 
             if c("missing-id") and relation.id is None:
                 result.error(type="missing-id",
-                             relation=relation.__dict__)
+                             relation=relation.as_dict())
 
             by_id.setdefault(relation.id, []).append(relation)
             by_label.setdefault(relation.label, []).append(relation)
@@ -790,48 +919,48 @@ class ExcelOntology:
             if relation.domain:
                 if c("unknown-domain") and relation.domain.is_unresolved():
                     result.error(type="unknown-domain",
-                                 relation=relation.__dict__)
+                                 relation=relation.as_dict())
                 else:
                     t = self._raw_term_by_id(relation.domain.id)
                     if c("missing-domain") and t is None:
                         result.error(type="missing-domain",
-                                     relation=relation.__dict__,
-                                     domain=relation.domain.__dict__)
+                                     relation=relation.as_dict(),
+                                     domain=relation.domain.as_dict())
                     elif c("ignored-domain") and isinstance(t, UnresolvedTerm) and lower(
                             t.curation_status()) in self._ignore_status:
                         result.error(type="ignored-domain",
                                      status=t.curation_status(),
-                                     relation=relation.__dict__,
-                                     domain=relation.domain.__dict__)
+                                     relation=relation.as_dict(),
+                                     domain=relation.domain.as_dict())
 
             if relation.range:
                 if c("unknown-range") and relation.range.is_unresolved():
                     result.error(type="unknown-range",
-                                 relation=relation.__dict__)
+                                 relation=relation.as_dict())
                 else:
                     t = self._raw_term_by_id(relation.range.id)
                     if c("missing-range") and t is None:
                         result.error(type="missing-range",
-                                     relation=relation.__dict__,
-                                     range=relation.range.__dict__)
+                                     relation=relation.as_dict(),
+                                     range=relation.range.as_dict())
                     elif c("ignored-range") and isinstance(t, UnresolvedTerm) and lower(
                             t.curation_status()) in self._ignore_status:
                         result.error(type="ignored-range",
                                      status=t.curation_status(),
-                                     relation=relation.__dict__,
-                                     range=relation.range.__dict__)
+                                     relation=relation.as_dict(),
+                                     range=relation.range.as_dict())
 
             for p in relation.sub_property_of:
                 if c("unknown-parent") and p.is_unresolved():
                     result.error(type="unknown-parent",
-                                 term=relation.__dict__,
-                                 parent=p.__dict__)
+                                 term=relation.as_dict(),
+                                 parent=p.as_dict())
                 else:
                     t = self._raw_relation_by_id(p.id)
                     if c("missing-parent") and t is None:
                         result.error(type="missing-parent",
-                                     term=relation.__dict__,
-                                     parent=p.__dict__)
+                                     term=relation.as_dict(),
+                                     parent=p.as_dict())
 
             for r, value in relation.relations:
                 if isinstance(value, TermIdentifier):
@@ -839,19 +968,19 @@ class ExcelOntology:
                         result.error(type="unknown-relation-value",
                                      relation=r,
                                      value=value,
-                                     term=relation.__dict__)
+                                     term=relation.as_dict())
                     else:
                         t = self._raw_term_by_id(value.id)
                         if c("missing-relation-value") and t is None:
                             result.error(type="missing-relation-value",
-                                         term=relation.__dict__,
+                                         term=relation.as_dict(),
                                          relation=r,
                                          value=value)
                         elif c("ignored-relation-value") and isinstance(t, UnresolvedTerm) and lower(
                                 t.curation_status()) in self._ignore_status:
                             result.error(type="ignored-relation-value",
                                          status=t.curation_status(),
-                                         term=relation.__dict__,
+                                         term=relation.as_dict(),
                                          relation=r,
                                          value=value)
 
@@ -863,49 +992,69 @@ class ExcelOntology:
             result.template = {"row": relation.origin[1]} if relation.origin is not None else {}
             if relation.is_unresolved():
                 result.error(type="unknown-relation",
-                             relation=relation.__dict__)
+                             relation=relation.as_dict())
 
         # Check for duplicates
         if c("duplicate"):
             for k, items in itertools.chain(by_id.items(), by_label.items()):
-                duplicates = [d for d in items
-                              if not isinstance(d, UnresolvedTerm) or d.curation_status() not in self._ignore_status]
-                if len(duplicates) > 1:
-                    mismatches = []
-                    for a, b in itertools.combinations(duplicates, 2):
-                        if a.id is None or b.id is None or a.label is None or b.label is None:
-                            continue
-                        if a.label != b.label:
-                            mismatches.append(("label", a, b))
-                        if a.id != b.id:
-                            mismatches.append(("id", a, b))
-                        if isinstance(a, UnresolvedTerm) and isinstance(b, UnresolvedTerm):
-                            definition_a = (a.definition()
-                                            .replace("<", "")
-                                            .replace(">", "")) if a.definition() is not None else ""
-                            definition_b = (b.definition()
-                                            .replace("<", "")
-                                            .replace(">", "")) if b.definition() is not None else ""
-                            if not str_space_eq(definition_a, definition_b):
-                                mismatches.append(("definition", a, b))
-                            if not str_space_eq(a.curation_status(), b.curation_status()):
-                                mismatches.append(("curation status", a, b))
-                        elif isinstance(a, UnresolvedRelation) and isinstance(b, UnresolvedRelation):
-                            pass
-                        else:
-                            mismatches.append(("type", a, b))
-                    if len(mismatches) > 0:
-                        result.error(type="duplicate",
-                                     duplicate_field="id" if k in by_id else "label",
-                                     duplicate_value=k,
-                                     duplicates=list(set(x for _, a, b in mismatches for x in [a, b])),
-                                     mismatches=[dict(field=f, a=a, b=b) for f, a, b in mismatches])
+                duplicates, mismatches = self._duplicate_mismatches(items)
+                if len(mismatches) > 0:
+                    result.error(type="duplicate",
+                                 duplicate_field="id" if k in by_id else "label",
+                                 duplicate_value=k,
+                                 duplicates=duplicates,
+                                 mismatches=[dict(field=f, a=a, b=b) for f, a, b in mismatches])
 
         if not any(result.errors):
             result.value = ()
 
         return result
 
+    def _duplicate_mismatches(self, items: List[Union[UnresolvedTerm, UnresolvedRelation]]) -> \
+            Tuple[List[Union[UnresolvedTerm, UnresolvedRelation]],
+                  List[Tuple[str, Union[UnresolvedTerm, UnresolvedRelation], Union[UnresolvedTerm, UnresolvedRelation]]]]:
+        """
+        Compares terms and relations that share an id or label.
+
+        The compared fields of every item are normalised once. Each item is compared to the first item and, for fields
+        of terms, to the first term. As the normalised fields are equal or not, any difference within the items shows
+        up as a difference to the first one. This keeps the comparison linear in the number of items.
+
+        :param items: Terms and relations with the same id or label
+        :return: The compared items and the mismatching fields as triples of field name and the two differing items
+        """
+        duplicates = [d for d in items
+                      if (not isinstance(d, UnresolvedTerm) or d.curation_status() not in self._ignore_status) and
+                      d.id is not None and d.label is not None]
+        if len(duplicates) < 2:
+            return duplicates, []
+
+        def fingerprint(term: UnresolvedTerm) -> Tuple[str, str]:
+            definition = term.definition()
+            definition = definition.replace("<", "").replace(">", "") if definition is not None else ""
+            return str_space_normalise(definition), str_space_normalise(term.curation_status())
+
+        first = duplicates[0]
+        first_term = next((d for d in duplicates if isinstance(d, UnresolvedTerm)), None)
+        first_fingerprint = fingerprint(first_term) if first_term is not None else None
+
+        mismatches = []
+        for d in duplicates[1:]:
+            if d.label != first.label:
+                mismatches.append(("label", first, d))
+            if d.id != first.id:
+                mismatches.append(("id", first, d))
+            if isinstance(d, UnresolvedTerm) and d is not first_term:
+                definition, curation_status = fingerprint(d)
+                if definition != first_fingerprint[0]:
+                    mismatches.append(("definition", first_term, d))
+                if curation_status != first_fingerprint[1]:
+                    mismatches.append(("curation status", first_term, d))
+            if isinstance(d, UnresolvedTerm) != isinstance(first, UnresolvedTerm):
+                mismatches.append(("type", first, d))
+
+        return duplicates, mismatches
+
     def remove_duplicates(self) -> int:
         to_remove: List[UnresolvedTerm] = []
         hashset: Set[TermIdentifier] = set()
@@ -918,13 +1067,15 @@ class ExcelOntology:
         for term in to_remove:
             self._terms.remove(term)
 
+        self._term_index.rebuild(self._terms)
+
         return len(to_remove)
 
     def iri(self) -> str:
         return self._iri
 
     def add_relation(self, relation: Relation):
-        self._relations.append(UnresolvedRelation(**dataclasses.asdict(relation)))
+        self._add_relation(UnresolvedRelation(**relation.as_dict()))
 
     @classmethod
     def from_excel(cls, iri: str, files: list[Tuple[str, Union[bytes, str, BytesIO], Literal["classes", "relations"]]]):
@@ -0,0 +1,423 @@
+import struct
+import sys
+from array import array
+from itertools import accumulate
+from typing import BinaryIO, Dict, List, Optional, Any, Tuple, Union
+
+from .ExcelOntology import ExcelOntology, OntologyImport
+from .Relation import Relation, UnresolvedRelation, OWLPropertyType
+from .Result import Result
+from .Term import Term, UnresolvedTerm
+from .TermIdentifier import TermIdentifier
+
+SNAPSHOT_VERSION = 1
+
+_MAGIC = b"OSE-ONTO"
+# Magic, version, and the byte lengths of the string lengths, the strings, the labels, and the body
+_HEADER = struct.Struct("<8sH4Q")
+
+# Tags of the values in the body
+_NONE, _STR, _INT, _BIG_INT, _FLOAT, _TRUE, _FALSE, _LIST, _TUPLE, _DICT, _STR_DICT, _IDENTIFIER, _TERM, \
+    _UNRESOLVED_TERM, _RELATION, _UNRESOLVED_RELATION, _PROPERTY_TYPE, _IMPORT = range(18)
+
+
+class SnapshotError(ValueError):
+    """
+    The data is not a snapshot or was written by an incompatible version.
+    """
+    pass
+
+
+class OntologySnapshot:
+    """
+    Compact binary snapshot of an ``ExcelOntology`` and the diagnostics of parsing it.
+
+    A snapshot holds the terms, relations, imports, and used relations of the ontology. Unlike a pickle, reading a
+    snapshot never executes code and only creates the model classes of the ontology. Snapshots are versioned. A
+    snapshot of another version is rejected and has to be written again.
+
+    Each string is stored once and referenced by its position. Everything else is a sequence of unsigned 32-bit
+    integers: a tag followed by the fields of the tagged value. The identifiers and labels of all terms and relations
+    are stored in a separate section before the body, so they can be read without reading the ontology.
+    """
+
+    @classmethod
+    def write(cls, file: BinaryIO, ontology: ExcelOntology, result: Optional[Result[Any]] = None) -> None:
+        """
+        Writes a snapshot of an ontology.
+
+        :param file: Binary file to write to
+        :param ontology: The ontology
+        :param result: Diagnostics to store with the ontology, e.g. of parsing it
+        """
+        writer = _Writer()
+        body = writer.ontology(ontology, result if result is not None else Result())
+
+        labels = array("I")
+        for entity in [*(t for i in ontology.imports() for t in i.imported_terms), *ontology._relations,
+                       *ontology._terms]:
+            if entity.id is not None and entity.label is not None:
+                labels.append(writer.string(entity.id))
+                labels.append(writer.string(entity.label))
+
+        # The first string is a placeholder for None
+        lengths = array("I", (len(s) for s in writer.strings[1:]))
+        text = "".join(writer.strings[1:]).encode("utf-8", "surrogatepass")
+
+        sections = [_little_endian(lengths), text, _little_endian(labels), _little_endian(body)]
+        file.write(_HEADER.pack(_MAGIC, SNAPSHOT_VERSION, *(len(s) for s in sections)))
+        for section in sections:
+            file.write(section)
+
+    @classmethod
+    def read(cls, file: BinaryIO) -> Result[ExcelOntology]:
+        """
+        Reads the ontology and the diagnostics of a snapshot.
+
+        :param file: Binary file to read from
+        :return: The stored diagnostics with the ontology as value
+        """
+        lengths, labels, body = _read_header(file)
+        strings = _read_strings(file, lengths)
+        file.seek(labels, 1)
+
+        return _read_ontology(_read_ints(file, body), strings)
+
+    @classmethod
+    def read_labels(cls, file: BinaryIO) -> Dict[str, str]:
+        """
+        Reads only the labels of the terms, relations, and imported terms of a snapshot.
+
+        :param file: Binary file to read from
+        :return: Label by id. Terms take precedence over relations, which take precedence over imported terms.
+        """
+        lengths, labels, _ = _read_header(file)
+        strings = _read_strings(file, lengths)
+        ints = _read_ints(file, labels)
+
+        return dict(zip((strings[i] for i in ints[::2]), (strings[i] for i in ints[1::2])))
+
+
+def _little_endian(ints: array) -> bytes:
+    if sys.byteorder == "big":
+        ints = array(ints.typecode, ints)
+        ints.byteswap()
+
+    return ints.tobytes()
+
+
+def _read_header(file: BinaryIO) -> Tuple[Tuple[int, int], int, int]:
+    header = file.read(_HEADER.size)
+    if len(header) < _HEADER.size:
+        raise SnapshotError("Not an ontology snapshot")
+
+    magic, version, lengths, text, labels, body = _HEADER.unpack(header)
+    if magic != _MAGIC:
+        raise SnapshotError("Not an ontology snapshot")
+    if version != SNAPSHOT_VERSION:
+        raise SnapshotError(f"Snapshot version {version} is not supported. Expected version {SNAPSHOT_VERSION}.")
+
+    return (lengths, text), labels, body
+
+
+def _read_ints(file: BinaryIO, size: int) -> array:
+    data = file.read(size)
+    if len(data) < size:
+        raise SnapshotError("The snapshot is truncated")
+
+    ints = array("I")
+    ints.frombytes(data)
+    if sys.byteorder == "big":
+        ints.byteswap()
+
+    return ints
+
+
+def _read_strings(file: BinaryIO, sizes: Tuple[int, int]) -> List[Optional[str]]:
+    lengths = _read_ints(file, sizes[0])
+    data = file.read(sizes[1])
+    if len(data) < sizes[1]:
+        raise SnapshotError("The snapshot is truncated")
+
+    text = data.decode("utf-8", "surrogatepass")
+    offsets = list(accumulate(lengths, initial=0))
+    # Terms intern their identifiers. Interning while reading shares each string between all its uses.
+    return [None] + [sys.intern(text[a:b]) for a, b in zip(offsets, offsets[1:])]
+
+
+class _Writer:
+    strings: List[Optional[str]]
+    _string_index: Dict[str, int]
+    _out: array
+
+    def __init__(self) -> None:
+        self.strings = [None]
+        self._string_index = dict()
+        self._out = array("I")
+
+    def string(self, value: Optional[str]) -> int:
+        if value is None:
+            return 0
+
+        i = self._string_index.get(value)
+        if i is None:
+            i = self._string_index[value] = len(self.strings)
+            self.strings.append(value)
+
+        return i
+
+    def ontology(self, ontology: ExcelOntology, result: Result[Any]) -> array:
+        out = self._out
+        out.append(self.string(ontology.iri()))
+        out.append(self.string(ontology._version_iri))
+        self.value(ontology._ignore_status)
+        self.value(ontology._discard_status)
+        self.value(ontology._imports)
+        self.value(ontology._relations)
+        self.value(ontology._terms)
+        self.value(list(ontology._used_relations))
+        self.value(result.template)
+        self.value(result.errors)
+        self.value(result.warnings)
+        self.value(result.infos)
+
+        return out
+
+    def identifier(self, value: Optional[TermIdentifier]) -> None:
+        if value is None:
+            self._out.append(0)
+        elif isinstance(value, TermIdentifier):
+            self._out.append(1)
+            self._out.append(self.string(value.id))
+            self._out.append(self.string(value.label))
+        else:
+            raise TypeError(f"Expected a term identifier but got '{type(value).__name__}'")
+
+    def identifiers(self, values: List[TermIdentifier]) -> None:
+        self._out.append(len(values))
+        for v in values:
+            if not isinstance(v, TermIdentifier):
+                raise TypeError(f"Expected a term identifier but got '{type(v).__name__}'")
+
+            self._out.append(self.string(v.id))
+            self._out.append(self.string(v.label))
+
+    def relations(self, values: List[Tuple[TermIdentifier, Any]]) -> None:
+        self.identifiers([r for r, _ in values])
+        for _, v in values:
+            self.value(v)
+
+    def term(self, term: Union[Term, UnresolvedTerm]) -> None:
+        out = self._out
+        out.append(self.string(term.id))
+        out.append(self.string(term.label))
+        self.value(term.origin)
+        self.relations(term.relations)
+        self.identifiers(term.sub_class_of)
+        self.value(term.equivalent_to)
+        self.identifiers(term.disjoint_with)
+
+    def relation(self, relation: Union[Relation, UnresolvedRelation]) -> None:
+        out = self._out
+        out.append(self.string(relation.id))
+        out.append(self.string(relation.label))
+        self.identifiers(relation.equivalent_relations)
+        self.relations(relation.relations)
+        self.identifiers(relation.inverse_of)
+        self.identifiers(relation.sub_property_of)
+        out.append(relation.owl_property_type.value + 1 if relation.owl_property_type is not None else 0)
+        self.identifier(relation.domain)
+        self.identifier(relation.range)
+        self.value(relation.origin)
+
+    def ontology_import(self, ontology_import: OntologyImport) -> None:
+        out = self._out
+        out.append(self.string(ontology_import.id))
+        out.append(self.string(ontology_import.iri))
+        out.append(self.string(ontology_import.version_iri))
+        self.identifier(ontology_import.root_id)
+        self.identifiers(ontology_import.imported_terms)
+        out.append(self.string(ontology_import.intermediates))
+        self.value(ontology_import.prefixes)
+        self.identifiers(ontology_import.excluding)
+
+    def value(self, value: Any) -> None:
+        out = self._out
+        if value is None:
+            out.append(_NONE)
+        elif isinstance(value, str):
+            out.append(_STR)
+            out.append(self.string(value))
+        elif isinstance(value, TermIdentifier):
+            out.append(_IDENTIFIER)
+            out.append(self.string(value.id))
+            out.append(self.string(value.label))
+        elif isinstance(value, bool):
+            out.append(_TRUE if value else _FALSE)
+        elif isinstance(value, int):
+            if 0 <= value < 2 ** 32:
+                out.append(_INT)
+                out.append(value)
+            else:
+                out.append(_BIG_INT)
+                out.append(self.string(str(value)))
+        elif isinstance(value, float):
+            out.append(_FLOAT)
+            out.append(self.string(repr(value)))
+        elif isinstance(value, (list, tuple)):
+            out.append(_LIST if isinstance(value, list) else _TUPLE)
+            out.append(len(value))
+            for v in value:
+                self.value(v)
+        elif isinstance(value, dict) and all(isinstance(k, str) for k in value):
+            # Most dictionaries, e.g. those of diagnostics, have only string keys, which are stored without tags
+            out.append(_STR_DICT)
+            out.append(len(value))
+            for k, v in value.items():
+                out.append(self.string(k))
+                self.value(v)
+        elif isinstance(value, dict):
+            out.append(_DICT)
+            out.append(len(value))
+            for k, v in value.items():
+                self.value(k)
+                self.value(v)
+        elif isinstance(value, (Term, UnresolvedTerm)):
+            out.append(_TERM if isinstance(value, Term) else _UNRESOLVED_TERM)
+            self.term(value)
+        elif isinstance(value, (Relation, UnresolvedRelation)):
+            out.append(_RELATION if isinstance(value, Relation) else _UNRESOLVED_RELATION)
+            self.relation(value)
+        elif isinstance(value, OWLPropertyType):
+            out.append(_PROPERTY_TYPE)
+            out.append(value.value)
+        elif isinstance(value, OntologyImport):
+            out.append(_IMPORT)
+            self.ontology_import(value)
+        else:
+            raise TypeError(f"Values of type '{type(value).__name__}' cannot be stored in a snapshot")
+
+
+def _read_ontology(ints: array, strings: List[Optional[str]]) -> Result[ExcelOntology]:
+    """
+    Reads the body of a snapshot. Each value is read by a closure over an iterator of the integers, which is
+    considerably faster than keeping the position in an object.
+    """
+    read = iter(ints).__next__
+    new = object.__new__
+
+    def identifier() -> Optional[TermIdentifier]:
+        if read() == 0:
+            return None
+
+        # The strings are interned already, so the checks of the constructor are skipped
+        i = new(TermIdentifier)
+        i.id = strings[read()]
+        i.label = strings[read()]
+        return i
+
+    def identifiers() -> List[TermIdentifier]:
+        values = []
+        for _ in range(read()):
+            i = new(TermIdentifier)
+            i.id = strings[read()]
+            i.label = strings[read()]
+            values.append(i)
+
+        return values
+
+    def relations() -> List[Tuple[TermIdentifier, Any]]:
+        return [(r, value()) for r in identifiers()]
+
+    def term(cls):
+        return cls(strings[read()], strings[read()], value(), relations(), identifiers(), value(), identifiers())
+
+    def relation(cls):
+        fields = dict(id=strings[read()],
+                      label=strings[read()],
+                      equivalent_relations=identifiers(),
+                      relations=relations(),
+                      inverse_of=identifiers(),
+                      sub_property_of=identifiers())
+        property_type = read()
+        return cls(**fields,
+                   owl_property_type=OWLPropertyType(property_type - 1) if property_type > 0 else None,
+                   domain=identifier(),
+                   range=identifier(),
+                   origin=value())
+
+    def ontology_import() -> OntologyImport:
+        return OntologyImport(id=strings[read()],
+                              iri=strings[read()],
+                              version_iri=strings[read()],
+                              root_id=identifier(),
+                              imported_terms=identifiers(),
+                              intermediates=strings[read()],
+                              prefixes=value(),
+                              excluding=identifiers())
+
+    def value() -> Any:
+        tag = read()
+        if tag == _STR:
+            return strings[read()]
+        elif tag == _IDENTIFIER:
+            i = new(TermIdentifier)
+            i.id = strings[read()]
+            i.label = strings[read()]
+            return i
+        elif tag == _LIST:
+            return [value() for _ in range(read())]
+        elif tag == _STR_DICT:
+            return {strings[read()]: value() for _ in range(read())}
+        elif tag == _NONE:
+            return None
+        elif tag == _INT:
+            return read()
+        elif tag == _TUPLE:
+            return tuple([value() for _ in range(read())])
+        elif tag == _DICT:
+            return dict([(value(), value()) for _ in range(read())])
+        elif tag == _UNRESOLVED_TERM:
+            return term(UnresolvedTerm)
+        elif tag == _TERM:
+            return term(Term)
+        elif tag == _UNRESOLVED_RELATION:
+            return relation(UnresolvedRelation)
+        elif tag == _RELATION:
+            return relation(Relation)
+        elif tag == _TRUE or tag == _FALSE:
+            return tag == _TRUE
+        elif tag == _BIG_INT:
+            return int(strings[read()])
+        elif tag == _FLOAT:
+            return float(strings[read()])
+        elif tag == _PROPERTY_TYPE:
+            return OWLPropertyType(read())
+        elif tag == _IMPORT:
+            return ontology_import()
+        else:
+            raise SnapshotError(f"Unknown tag {tag} in snapshot")
+
+    try:
+        iri = strings[read()]
+        version_iri = strings[read()]
+        ontology = ExcelOntology(iri, version_iri,
+                                 ignore_terms_with_status=value(),
+                                 discard_terms_with_status=value())
+
+        for i in value():
+            ontology._add_import(i)
+        for r in value():
+            ontology._add_relation(r)
+        for t in value():
+            ontology._add_term(t)
+        ontology._used_relations = set(value())
+
+        template = value()
+        errors = value()
+        warnings = value()
+        infos = value()
+    except (StopIteration, IndexError) as e:
+        raise SnapshotError("The snapshot is truncated or corrupt") from e
+
+    return Result(value=ontology, template=template, errors=errors, warnings=warnings, infos=infos)
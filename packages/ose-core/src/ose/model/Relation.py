@@ -1,6 +1,7 @@
+import dataclasses
 import enum
 from dataclasses import dataclass, field
-from typing import Optional, Any, Tuple, List
+from typing import Optional, Any, Tuple, List, Union
 
 from .TermIdentifier import TermIdentifier
 
@@ -17,7 +18,7 @@ class OWLPropertyType(enum.Enum):
         return self.name
 
 
-@dataclass
+@dataclass(slots=True)
 class Relation:
     id: str
     label: str
@@ -33,11 +34,17 @@ class Relation:
     def identifier(self) -> TermIdentifier:
         return TermIdentifier(self.id, self.label)
 
+    def as_dict(self) -> dict:
+        """
+        Shallow dictionary of the fields of the relation, e.g. to copy it or to include it in messages.
+        """
+        return {f.name: getattr(self, f.name) for f in dataclasses.fields(self)}
+
     def __hash__(self) -> int:
-        return hash(self.__dict__.values())
+        return _relation_hash(self)
 
 
-@dataclass
+@dataclass(slots=True)
 class UnresolvedRelation:
     id: Optional[str] = None
     label: Optional[str] = None
@@ -65,27 +72,37 @@ class UnresolvedRelation:
         if self.is_unresolved():
             return None
         else:
-            return Relation(**self.__dict__)
+            return Relation(**self.as_dict())
 
     def as_resolved(self) -> Relation:
         if self.is_unresolved():
             raise ValueError(f"Cannot convert unresolved term {self} to a resolved term.")
 
-        return Relation(**self.__dict__)
+        return Relation(**self.as_dict())
 
     def identifier(self) -> TermIdentifier:
         return TermIdentifier(self.id, self.label)
 
+    def as_dict(self) -> dict:
+        """
+        Shallow dictionary of the fields of the relation, e.g. to copy it or to include it in messages.
+        """
+        return {f.name: getattr(self, f.name) for f in dataclasses.fields(self)}
+
     def __hash__(self) -> int:
-        fields = [
-            self.id,
-            self.label,
-            sum(map(hash, self.equivalent_relations)),
-            sum(map(hash, self.relations)),
-            sum(map(hash, self.sub_property_of)),
-            sum(map(hash, self.inverse_of)),
-            self.owl_property_type,
-            self.domain,
-            self.range
-        ]
-        return sum(map(hash, fields))
+        return _relation_hash(self)
+
+
+def _relation_hash(relation: Union[Relation, UnresolvedRelation]) -> int:
+    fields = [
+        relation.id,
+        relation.label,
+        sum(map(hash, relation.equivalent_relations)),
+        sum(map(hash, relation.relations)),
+        sum(map(hash, relation.sub_property_of)),
+        sum(map(hash, relation.inverse_of)),
+        relation.owl_property_type,
+        relation.domain,
+        relation.range
+    ]
+    return sum(map(hash, fields))
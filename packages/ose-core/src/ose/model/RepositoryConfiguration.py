@@ -29,6 +29,10 @@ class RepositoryConfiguration:
     validation: List[Literal['include-external', 'include-dependencies']] = field(
         default_factory=lambda: ["include-external", "include-dependencies"])
 
+    ontology_builder: Literal['robot', 'horned-owl'] = "robot"
+
+    incremental_releases: bool = False
+
     def __post_init__(self):
         if self.release_file == DEFAULT:
             self.release_file = self.short_name.lower() + ".owl"
@@ -21,6 +21,12 @@ class Result(Generic[A]):
         if isinstance(other, Result):
             return self.merge(other)
 
+    def __iadd__(self, other: Result[B]) -> Result[B]:
+        if isinstance(other, Result):
+            return self.extend(other)
+
+        return NotImplemented
+
     def error(self, **kwargs) -> None:
         self.errors.append({**self.template, **kwargs})
 
@@ -32,7 +38,8 @@ class Result(Generic[A]):
 
     def bind(self, fn: Callable[[A], Result[B]]) -> Result[B]:
         if self.value is None:
-            return Result(template=self.template, errors=self.errors, warnings=self.warnings, value=self.value)
+            return Result(template=self.template, errors=list(self.errors), warnings=list(self.warnings),
+                          infos=list(self.infos), value=self.value)
         else:
             return self.merge(fn(self.value))
 
@@ -40,8 +47,26 @@ class Result(Generic[A]):
         return Result(template={**self.template, **other.template},
                       errors=self.errors + other.errors,
                       warnings=self.warnings + other.warnings,
+                      infos=self.infos + other.infos,
                       value=other.value)
 
+    def extend(self, other: Result[B]) -> Result[B]:
+        """
+        In-place variant of `merge`. Appends the messages of `other` to this result and takes over its value.
+
+        Accumulating many results this way takes linear time whereas repeated merges copy all messages collected so
+        far. Used by ``+=``.
+
+        :return: This result
+        """
+        self.template = {**self.template, **other.template}
+        self.errors.extend(other.errors)
+        self.warnings.extend(other.warnings)
+        self.infos.extend(other.infos)
+        self.value = other.value
+
+        return self
+
     def ok(self) -> bool:
         return self.value is not None
 
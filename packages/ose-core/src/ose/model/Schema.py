@@ -1,6 +1,7 @@
-from typing import List, Optional
+from collections import OrderedDict
+from typing import List, Optional, Dict, Tuple, Iterable
 
-from .ColumnMapping import ColumnMappingFactory, ColumnMapping, simple, \
+from .ColumnMapping import ColumnMappingFactory, ColumnMapping, SingletonMappingFactory, simple, \
     ColumnMappingKind, singleton, LabelMapping, ParentMapping, ManchesterSyntaxMapping, TermMapping, \
     ChoiceColumnMapping, relation, relation_pattern, internal, PrefixColumnMapping, ignore, IRIMapping
 from .Relation import OWLPropertyType
@@ -9,24 +10,86 @@ from .TermIdentifier import TermIdentifier
 
 class Schema:
     _mapping_factories: List[ColumnMappingFactory]
+    _dispatch_table: Dict[str, Tuple[int, ColumnMapping]]
+    _dynamic_factories: List[Tuple[int, ColumnMappingFactory]]
+    _mapping_cache: "OrderedDict[Tuple[str, str], Optional[ColumnMapping]]"
+    _max_cached_mappings: int
 
     def __init__(self, mapping_factories: List[ColumnMappingFactory],
-                 ignored_fields: Optional[List[str]] = None) -> None:
+                 ignored_fields: Optional[List[str]] = None, max_cached_mappings: int = 4096) -> None:
+        """
+        :param max_cached_mappings: Maximum number of resolved column mappings kept. The least recently used mappings
+                                    are dropped first.
+        """
         if ignored_fields is None:
             ignored_fields = []
 
         self._mapping_factories = mapping_factories
         self._ignored_fields = ignored_fields
+        self._mapping_cache = OrderedDict()
+        self._max_cached_mappings = max_cached_mappings
+        self.compile()
+
+    def compile(self) -> None:
+        """
+        Precompiles the mapping factories into a dispatch table.
+
+        Columns with fixed names are looked up directly in the table. Only factories that depend on the column name,
+        e.g. patterns, are tried one after another. The order of the factories is kept, i.e. the first factory that
+        maps a column wins. Must be called again if the mapping factories are changed.
+        """
+        self._dispatch_table = {}
+        self._dynamic_factories = []
+        for i, factory in enumerate(self._mapping_factories):
+            if isinstance(factory, SingletonMappingFactory):
+                for name in factory.column_names:
+                    self._dispatch_table.setdefault(name, (i, factory.mapping))
+            else:
+                self._dynamic_factories.append((i, factory))
+
+        self._mapping_cache.clear()
 
     def is_ignored(self, header_name: str) -> bool:
         return header_name in self._ignored_fields
 
     def get_mapping(self, origin: str, header_name: str) -> Optional[ColumnMapping]:
+        # Mappings created by dynamic factories may depend on the origin, hence it is part of the key
+        key = (origin, header_name)
+        if key in self._mapping_cache:
+            self._mapping_cache.move_to_end(key)
+            return self._mapping_cache[key]
+
+        mapping = self._create_mapping(origin, header_name)
+        self._mapping_cache[key] = mapping
+        while len(self._mapping_cache) > self._max_cached_mappings:
+            self._mapping_cache.popitem(last=False)
+
+        return mapping
+
+    def get_mappings(self, origin: str, header_names: Iterable[str]) -> List[Optional[ColumnMapping]]:
+        """
+        Maps all columns of a sheet header.
+
+        :param origin: Origin of the sheet, e.g. the sheet name
+        :param header_names: Names of the columns
+        :return: The mapping of each column or None if the column is not mapped
+        """
+        return [self.get_mapping(origin, h) for h in header_names]
+
+    def _create_mapping(self, origin: str, header_name: str) -> Optional[ColumnMapping]:
         if self.is_ignored(header_name):
             return None
 
-        return next(
-            iter(m.create_mapping(origin, header_name) for m in self._mapping_factories if m.maps(header_name)), None)
+        index, mapping = self._dispatch_table.get(header_name, (len(self._mapping_factories), None))
+        for i, factory in self._dynamic_factories:
+            if i > index:
+                break
+
+            dynamic_mapping = factory.try_create_mapping(origin, header_name)
+            if dynamic_mapping is not None:
+                return dynamic_mapping
+
+        return mapping
 
 
 DEFAULT_MAPPINGS = [
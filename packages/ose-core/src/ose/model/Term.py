@@ -1,14 +1,129 @@
 import abc
+import dataclasses
 import typing
 from dataclasses import dataclass, field
-from typing import Any, Optional, Union, List, Tuple
+from typing import Any, Optional, Union, List, Tuple, Dict, Iterable
 
 from typing_extensions import Self
 
 from .TermIdentifier import TermIdentifier
 
 
+class TermRelations(list):
+    """
+    List of the relations of a term, i.e. pairs of relation and value, with an index of their positions by relation id
+    and label.
+
+    The index is built on the first lookup and dropped whenever the list is changed. Relations without id or label,
+    e.g. those given only by label before the ontology is resolved, are kept aside and checked on each lookup until
+    they are completed.
+    """
+    __slots__ = ("_by_id", "_by_label")
+
+    _by_id: Optional[Dict[Optional[str], List[int]]]
+    _by_label: Optional[Dict[Optional[str], List[int]]]
+
+    def __init__(self, relations: Iterable[Tuple[TermIdentifier, Any]] = ()):
+        super().__init__(relations)
+        self._by_id = None
+        self._by_label = None
+
+    def _changed(self) -> None:
+        self._by_id = None
+        self._by_label = None
+
+    def _index(self, attr: str) -> Dict[Optional[str], List[int]]:
+        index = self._by_id if attr == "id" else self._by_label
+        if index is None or any(getattr(self[i][0], attr) is not None for i in index.get(None, ())):
+            index = {}
+            for i, (r, _) in enumerate(self):
+                index.setdefault(getattr(r, attr), []).append(i)
+
+            if attr == "id":
+                self._by_id = index
+            else:
+                self._by_label = index
+
+        return index
+
+    def positions(self, attr: str, key: Optional[str]) -> List[int]:
+        """
+        Positions of the relations whose identifier has the given value.
+
+        :param attr: Attribute of the relation identifier, i.e. "id" or "label"
+        :param key: Value of the attribute
+        :return: Positions in ascending order
+        """
+        return [i for i in self._index(attr).get(key, ()) if getattr(self[i][0], attr) == key]
+
+    def values(self, attr: str, key: Optional[str]) -> List[Any]:
+        """
+        Values of the relations whose identifier has the given value.
+
+        :param attr: Attribute of the relation identifier, i.e. "id" or "label"
+        :param key: Value of the attribute
+        :return: Values in the order of the relations
+        """
+        return [self[i][1] for i in self.positions(attr, key)]
+
+    def __reduce__(self):
+        return self.__class__, (list(self),)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self._changed()
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self._changed()
+
+    def __iadd__(self, other):
+        result = super().__iadd__(other)
+        self._changed()
+        return result
+
+    def __imul__(self, n):
+        result = super().__imul__(n)
+        self._changed()
+        return result
+
+    def append(self, item) -> None:
+        super().append(item)
+        self._changed()
+
+    def extend(self, items) -> None:
+        super().extend(items)
+        self._changed()
+
+    def insert(self, index, item) -> None:
+        super().insert(index, item)
+        self._changed()
+
+    def remove(self, item) -> None:
+        super().remove(item)
+        self._changed()
+
+    def pop(self, index=-1):
+        item = super().pop(index)
+        self._changed()
+        return item
+
+    def clear(self) -> None:
+        super().clear()
+        self._changed()
+
+    def sort(self, *args, **kwargs) -> None:
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self) -> None:
+        super().reverse()
+        self._changed()
+
+
 class _TermBase(abc.ABC):
+    __slots__ = ()
+
     relations: List[Tuple[TermIdentifier, Any]]
     sub_class_of: List[TermIdentifier]
     equivalent_to: List[str]
@@ -17,13 +132,29 @@ class _TermBase(abc.ABC):
     def identifier(self) -> TermIdentifier:
         return TermIdentifier(self.id, self.label)
 
+    def as_dict(self) -> dict:
+        """
+        Shallow dictionary of the fields of the term, e.g. to copy it or to include it in messages.
+        """
+        return {f.name: getattr(self, f.name) for f in dataclasses.fields(self)}
+
+    def __post_init__(self):
+        self._relation_store()
+
+    def _relation_store(self) -> TermRelations:
+        # Relations may have been replaced by a plain list
+        if not isinstance(self.relations, TermRelations):
+            self.relations = TermRelations(self.relations)
+
+        return self.relations
+
     def curation_status(self) -> typing.Optional[str]:
         """
         Convenience function to retrieve the value of the annotation property 'has curation status' (IAO:0000114)
 
         :return: The curation status if defined.
         """
-        return next((v.strip() for r, v in self.relations if r.id == "IAO:0000114"), None)
+        return next((v.strip() for v in self._relation_store().values("id", "IAO:0000114")), None)
 
     def definition(self, value: Optional[str] = None) -> typing.Optional[str]:
         """
@@ -31,19 +162,18 @@ class _TermBase(abc.ABC):
 
         :return: The curation status if defined.
         """
-        i, v = next(
-            ((i, v.strip()) for i, (r, v) in enumerate(self.relations) if r.id == "IAO:0000115"),
-            (None, None),
-        )
+        relations = self._relation_store()
+        i = next(iter(relations.positions("id", "IAO:0000115")), None)
+        v = relations[i][1].strip() if i is not None else None
 
         if value is None or v == value:
             return v
 
         r = TermIdentifier("IAO:0000115", "definition")
         if i is not None:
-            self.relations[i] = (r, value)
+            relations[i] = (r, value)
         else:
-            self.relations.append((r, value))
+            relations.append((r, value))
 
         return value
 
@@ -53,7 +183,7 @@ class _TermBase(abc.ABC):
 
         :return: All defined synonyms.
         """
-        return [v.strip() for r, v in self.relations if r.id == "IAO:0000118"]
+        return [v.strip() for v in self._relation_store().values("id", "IAO:0000118")]
 
     def is_external(self) -> Optional[bool]:
         curation_status = self.curation_status()
@@ -66,11 +196,16 @@ class _TermBase(abc.ABC):
         return next(iter(self.get_relation_values(id)), None)
 
     def get_relation_values(self, id: TermIdentifier) -> List[Any]:
-        return [
-            v
-            for r, v in self.relations
-            if ((id.id is None or id.id == r.id) and id.label is None or id.label == r.label)
-        ]
+        relations = self._relation_store()
+        if id.label is not None:
+            return relations.values("label", id.label)
+
+        if id.id is None:
+            return [v for _, v in relations]
+
+        # Relations without label match any identifier without label
+        positions = sorted({*relations.positions("id", id.id), *relations.positions("label", None)})
+        return [relations[i][1] for i in positions]
 
     def __eq__(self, other):
         if other is None or not isinstance(other, Term):
@@ -102,7 +237,7 @@ class _TermBase(abc.ABC):
         )
 
 
-@dataclass
+@dataclass(slots=True)
 class Term(_TermBase):
     id: str
     label: str
@@ -113,7 +248,7 @@ class Term(_TermBase):
     disjoint_with: List[TermIdentifier]
 
 
-@dataclass
+@dataclass(slots=True)
 class UnresolvedTerm(_TermBase):
     id: Optional[str] = None
     label: Optional[str] = None
@@ -138,23 +273,24 @@ class UnresolvedTerm(_TermBase):
         if self.is_unresolved():
             return None
         else:
-            return Term(**self.__dict__)
+            return Term(**self.as_dict())
 
     def as_resolved(self) -> Term:
         if self.is_unresolved():
             raise ValueError(f"Cannot convert unresolved term {self} to a resolved term.")
 
-        return Term(**self.__dict__)
+        return Term(**self.as_dict())
 
     def complement(self, other: Union[Self, Term, TermIdentifier]) -> None:
-        for k in self.__dict__.keys():
-            if k not in other.__dict__:
+        other_fields = other.as_dict()
+        for k, v in self.as_dict().items():
+            if k not in other_fields:
                 continue
 
-            if self.__dict__[k] is None:
-                self.__dict__[k] = other.__dict__[k]
-            elif other.__dict__[k] is not None and isinstance(other.__dict__[k], list):
-                self.__dict__[k] += other.__dict__[k]
+            if v is None:
+                setattr(self, k, other_fields[k])
+            elif other_fields[k] is not None and isinstance(other_fields[k], list):
+                v += other_fields[k]
 
     def __hash__(self):
-        return super().__hash__()
+        return _TermBase.__hash__(self)
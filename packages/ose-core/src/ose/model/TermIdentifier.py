@@ -1,14 +1,22 @@
+import sys
 from dataclasses import dataclass
 from typing import Optional
 
 from typing_extensions import Self
 
 
-@dataclass
+@dataclass(slots=True)
 class TermIdentifier:
     id: Optional[str] = None
     label: Optional[str] = None
 
+    def __post_init__(self):
+        # Identifiers of relations, parents, etc. are repeated for many terms. Share a single string instance for them.
+        if isinstance(self.id, str):
+            self.id = sys.intern(self.id)
+        if isinstance(self.label, str):
+            self.label = sys.intern(self.label)
+
     def is_unresolved(self) -> bool:
         return self.id is None or self.label is None
 
@@ -22,8 +30,11 @@ class TermIdentifier:
         if self.label is None:
             self.label = other.label
 
+    def as_dict(self) -> dict:
+        return {"id": self.id, "label": self.label}
+
     def __json__(self) -> dict:
-        return self.__dict__
+        return self.as_dict()
 
     def __eq__(self, other):
         if other is None or not isinstance(other, TermIdentifier):
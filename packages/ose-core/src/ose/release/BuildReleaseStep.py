@@ -1,77 +1,152 @@
+import shutil
+from concurrent.futures import ThreadPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Dict, Tuple, List, Optional
+
+from flask_github import GitHub
+from flask_sqlalchemy import SQLAlchemy
+
 from .ReleaseStep import ReleaseStep
-from .common import order_sources
+from .common import order_sources, parse_release_file, DependencyScheduler
 from ..model.ExcelOntology import ExcelOntology
+from ..model.ReleaseScript import ReleaseScript, ReleaseScriptFile
 from ..model.Result import Result
+from ..services.ConfigurationService import ConfigurationService
+from ..services.HornedOwlOntologyBuildService import HornedOwlOntologyBuildService
 from ..services.RobotOntologyBuildService import RobotOntologyBuildService
 
 
 class BuildReleaseStep(ReleaseStep):
+    def __init__(self, db: SQLAlchemy, gh: GitHub, release_script: ReleaseScript, release_id: int, tmp: str,
+                 config: ConfigurationService, *, workers: int = 2) -> None:
+        """
+        :param workers: Maximum number of release files built at the same time. Each build runs its own ROBOT process.
+        """
+        super().__init__(db, gh, release_script, release_id, tmp, config)
+
+        self._workers = max(1, workers)
+
     def run(self) -> bool:
         result = Result(())
-        builder = RobotOntologyBuildService()
+        builder = HornedOwlOntologyBuildService() if self._repo_config.ontology_builder == "horned-owl" else \
+            RobotOntologyBuildService()
         sources = order_sources(self._release_script.files)
 
         self._total_items = len(sources)
 
-        loaded = dict()
-        for i, (k, file) in enumerate(sources):
-            self._next_item(item=file.target.file, message="Building")
-            ontology = ExcelOntology(file.target.iri)
-
-            external_ontology_result = self._load_externals_ontology()
-
-            self._raise_if_canceled()
-
-            result += external_ontology_result
-            external_ontology = external_ontology_result.value
-            
-            if external_ontology is None:
-                self._set_release_result(result)
-                return False
-            
-            ontology.import_other_excel_ontology(external_ontology)
-
-            self._raise_if_canceled()
-
-            for n in file.needs:
-                other = loaded[n]  # Must exist queue is ordered to first load ontologies others depend on
-                result += ontology.import_other_excel_ontology(other)
-
-                self._raise_if_canceled()
-
-            for s in file.sources:
-                if s.type == "classes":
-                    result += ontology.add_terms_from_excel(s.file, self._local_name(s.file))
-                elif s.type == "relations":
-                    result += ontology.add_relations_from_excel(s.file, self._local_name(s.file))
-
-            if file.renameTermFile is not None:
-                ontology.apply_renamings(self._local_name(file.renameTermFile))
-
-            if file.addParentsFile is not None:
-                ontology.apply_new_parents(self._local_name(file.addParentsFile))
-
-            result += ontology.resolve()
-            self._raise_if_canceled()
-
-            dependencies = [f for f in (
-                    [self._release_script.files[n].target.iri for n in file.needs] +
-                    [self._release_script.external.target.iri])]
-
-            result += builder.build_ontology(ontology, self._local_name(file.target.file),
-                                             self._release_script.prefixes, dependencies, self._working_dir,
-                                             self._release_script.iri_prefix)
-
-            self._store_target_artifact(file, kind="intermediate")
-
-            self._raise_if_canceled()
-
-            loaded[k] = ontology
+        external_ontology_result = self._load_externals_ontology()
+
+        self._raise_if_canceled()
+
+        result += external_ontology_result
+        external_ontology = external_ontology_result.value
+
+        if external_ontology is None:
+            self._set_release_result(result)
+            return False
+
+        # Files built by a previous release from the same inputs are copied instead of being built again
+        reasons: Dict[str, str] = dict()
+        reused: Dict[str, str] = dict()
+        if self._incremental:
+            for k, file in sources:
+                previous, reasons[k] = self._reusable_artifact(file.target.file, "intermediate", self._file_inputs(k))
+                if previous is not None:
+                    reused[k] = previous.local_path
+
+        # Build each file as soon as all files it needs are built. The builds run in threads as the work is done by
+        # ROBOT processes. Progress, artifacts, and cancellation are handled here as the database session must not be
+        # shared between threads.
+        results: Dict[str, Result] = dict()
+        loaded: Dict[str, ExcelOntology] = dict()
+        scheduler = DependencyScheduler(dict(sources))
+        running: Dict[Future, Tuple[str, ReleaseScriptFile]] = dict()
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            try:
+                while len(loaded) < len(sources):
+                    for k, file in scheduler.ready():
+                        needed = [loaded[n] for n in file.needs]
+                        future = executor.submit(self._build_file, builder, file, external_ontology, needed,
+                                                 reused.get(k), self._parsed_ontology(k))
+                        running[future] = (k, file)
+
+                    self._update_progress(position=(len(loaded), len(sources)),
+                                          current_item=", ".join(f.target.file for _, f in running.values()),
+                                          message="Building")
+
+                    done, _ = wait(running.keys(), timeout=5, return_when=FIRST_COMPLETED)
+                    self._raise_if_canceled()
+
+                    for future in done:
+                        k, file = running.pop(future)
+                        results[k], loaded[k] = future.result()
+                        self._keep_parsed_ontology(k, loaded[k])
+                        scheduler.done(k)
+
+                        inputs = self._file_inputs(k) if self._incremental and not results[k].has_errors() else None
+                        self._store_target_artifact(file, kind="intermediate", inputs=inputs)
+            except BaseException:
+                # Stop queued builds and kill the running ROBOT processes
+                executor.shutdown(wait=False, cancel_futures=True)
+                builder.cancel()
+                raise
+
+        for k, _ in sources:
+            result += results[k]
 
         result.warnings = []
-        self._set_release_result(result)
+        if self._incremental:
+            self._set_release_result(result, incremental=reasons)
+        else:
+            self._set_release_result(result)
         return result.ok()
 
+    def _build_file(self, builder: RobotOntologyBuildService, file: ReleaseScriptFile,
+                    external_ontology: ExcelOntology, needed: List[ExcelOntology],
+                    previous: Optional[str] = None,
+                    parsed: Optional[ExcelOntology] = None) -> Tuple[Result, ExcelOntology]:
+        """
+        Parses, resolves, and builds a single release file. Runs in a worker thread and must not access the database.
+
+        :param builder: The build service
+        :param file: The release file to build
+        :param external_ontology: The ontology of external terms
+        :param needed: The already built ontologies the file needs
+        :param previous: Path of the same file built by a previous release. It is copied instead of building the file,
+                         which is still parsed for the files needing it.
+        :param parsed: The file's resolved ontology if an earlier step parsed it from the same inputs
+        :return: The result of the build and the parsed ontology
+        """
+        result = Result(())
+        if parsed is not None:
+            ontology = parsed
+        else:
+            parsed_result = parse_release_file(
+                file.target.iri,
+                [external_ontology.as_import()] + [other.as_import() for other in needed],
+                [(s.type, s.file, self._local_name(s.file)) for s in file.sources],
+                self._local_name(file.renameTermFile) if file.renameTermFile is not None else None,
+                self._local_name(file.addParentsFile) if file.addParentsFile is not None else None,
+            )
+            ontology = parsed_result.value
+            result += parsed_result
+            result.value = ()
+
+        dependencies = [f for f in (
+                [self._release_script.files[n].target.iri for n in file.needs] +
+                [self._release_script.external.target.iri])]
+
+        if previous is not None:
+            shutil.copyfile(previous, self._local_name(file.target.file))
+            # Later steps resolve the imports of the file through the catalog
+            builder.register_dependencies(self._working_dir, dependencies)
+            return result, ontology
+
+        result += builder.build_ontology(ontology, self._local_name(file.target.file),
+                                         self._release_script.prefixes, dependencies, self._working_dir,
+                                         self._release_script.iri_prefix)
+
+        return result, ontology
+
     @classmethod
     def name(cls) -> str:
         return "BUILD"
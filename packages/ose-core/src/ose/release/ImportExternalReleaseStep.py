@@ -1,5 +1,5 @@
 import csv
-from typing import Tuple, List, Literal, cast
+from typing import Tuple, List, Literal, Optional, cast
 
 from flask_github import GitHub
 from flask_sqlalchemy import SQLAlchemy
@@ -20,10 +20,17 @@ class ImportExternalReleaseStep(ReleaseStep):
         return "IMPORT_EXTERNAL"
 
     def __init__(self, db: SQLAlchemy, gh: GitHub, release_script: ReleaseScript, release_id: int, tmp: str,
-                 config: ConfigurationService, *, use_existing_file: bool = False) -> None:
+                 config: ConfigurationService, *, use_existing_file: bool = False,
+                 workers: Optional[int] = None) -> None:
+        """
+        :param use_existing_file: Use the external ontology of the repository instead of building it
+        :param workers: Maximum number of imported ontologies extracted at the same time. Defaults to the number of CPUs
+                        and is further bounded by the available memory.
+        """
         super().__init__(db, gh, release_script, release_id, tmp, config)
 
         self._use_existing_file = use_existing_file
+        self._workers = workers
 
     def run(self) -> bool:
         result = Result(())
@@ -38,7 +45,7 @@ class ImportExternalReleaseStep(ReleaseStep):
             self._set_release_result(result)
             return result.ok()
 
-        builder = RobotOntologyBuildService()
+        builder = RobotOntologyBuildService(workers=self._workers)
 
         ontology = ExcelOntology(file.target.iri)
         for s in file.sources:
@@ -105,7 +112,8 @@ class ImportExternalReleaseStep(ReleaseStep):
             self._release_script.short_repository_name,
             self._working_dir,
             renamings,
-            new_parents
+            new_parents,
+            progress=self._extracted
         )
 
         self._raise_if_canceled()
@@ -114,3 +122,7 @@ class ImportExternalReleaseStep(ReleaseStep):
 
         self._set_release_result(result)
         return result.ok()
+
+    def _extracted(self, done: int, total: int, name: str) -> None:
+        self._raise_if_canceled()
+        self._update_progress(position=(done, total), current_item=name, message="Extracted")
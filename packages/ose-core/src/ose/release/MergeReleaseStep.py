@@ -1,10 +1,12 @@
+import shutil
 from datetime import datetime
-from typing import List, Optional
+from typing import List, Optional, Dict, Any
 
 from flask_github import GitHub
 from flask_sqlalchemy import SQLAlchemy
 
 from .ReleaseStep import ReleaseStep
+from .common import file_digest
 from ..model.ReleaseScript import ReleaseScript
 from ..model.Result import Result
 from ..services.ConfigurationService import ConfigurationService
@@ -35,19 +37,27 @@ class MergeReleaseStep(ReleaseStep):
 
         self._total_items = len(merge_files) + len(collapse_imports)
 
+        # The version IRI is part of the inputs, so merged files are only reused by releases on the same day
+        reasons: Dict[str, str] = dict()
         for k, file in merge_files:
             self._next_item(item=file.target.file, message="Collecting")
 
             ontologies = [self._local_name(n.file) for n in file.sources if n.file.endswith(".owl")]
             version_iri = file.target.iri + "/" + datetime.utcnow().strftime("%Y-%m-%d")
-            result += builder.merge_ontologies(ontologies, self._local_name(file.target.file), file.target.iri,
-                                               version_iri,
-                                               file.target.ontology_annotations)
 
-            self._store_target_artifact(file)
+            inputs = {**self._file_inputs(k), "version_iri": version_iri} if self._incremental else None
+
+            if not self._reuse(k, file.target.file, self._local_name(file.target.file), inputs, reasons):
+                merge_result = builder.merge_ontologies(ontologies, self._local_name(file.target.file),
+                                                        file.target.iri, version_iri, file.target.ontology_annotations)
+                result += merge_result
+                inputs = inputs if not merge_result.has_errors() else None
+
+            self._store_target_artifact(file, inputs=inputs)
 
             self._raise_if_canceled()
 
+        built = dict((a.target_path, a) for a in self._artifacts() if a.kind == "intermediate")
         for k, file in collapse_imports:
             self._next_item(item=file.target.file, message="Collapsing import closure of")
 
@@ -56,13 +66,49 @@ class MergeReleaseStep(ReleaseStep):
 
             ontologies = [self._local_name(file.target.file)]
             version_iri = file.target.iri + "/" + datetime.utcnow().strftime("%Y-%m-%d")
-            result += builder.merge_ontologies(ontologies, out_file, file.target.iri,
-                                               version_iri,
-                                               file.target.ontology_annotations)
 
-            self._store_artifact(out_file, file.target.file)
+            # The inputs of the built file include the files it imports
+            inputs = None
+            build = built.get(file.target.file)
+            if self._incremental and build is not None and build.input_digest is not None:
+                inputs = dict(build=build.input_digest,
+                              file=file_digest(self._local_name(file.target.file)),
+                              version_iri=version_iri)
+
+            if not self._reuse(k, file.target.file, out_file, inputs, reasons):
+                merge_result = builder.merge_ontologies(ontologies, out_file, file.target.iri, version_iri,
+                                                        file.target.ontology_annotations)
+                result += merge_result
+                inputs = inputs if not merge_result.has_errors() else None
+
+            self._store_artifact(out_file, file.target.file, inputs=inputs)
 
             self._raise_if_canceled()
 
-        self._set_release_result(result)
+        if self._incremental:
+            self._set_release_result(result, incremental=reasons)
+        else:
+            self._set_release_result(result)
         return result.ok()
+
+    def _reuse(self, name: str, target_path: str, out_file: str, inputs: Optional[Dict[str, Any]],
+               reasons: Dict[str, str]) -> bool:
+        """
+        Copies the merged file of a previous release with the same inputs.
+
+        :param name: Name of the release file
+        :param target_path: Target path of the merged file
+        :param out_file: Local path to write the merged file to
+        :param inputs: Digests of the inputs of the merged file. Nothing is reused if None.
+        :param reasons: Why a file was reused or merged by release file name. Updated in place.
+        :return: True if the file was reused
+        """
+        if not self._incremental:
+            return False
+
+        previous, reasons[name] = self._reusable_artifact(target_path, "final", inputs)
+        if previous is None:
+            return False
+
+        shutil.copyfile(previous.local_path, out_file)
+        return True
@@ -0,0 +1,112 @@
+import logging
+import os
+import tempfile
+import threading
+from typing import Dict, Optional, ClassVar
+
+from typing_extensions import Self
+
+from ..model.ExcelOntology import ExcelOntology
+from ..model.OntologySnapshot import OntologySnapshot, SnapshotError
+from ..model.Result import Result
+
+
+class ParsedOntologyStore:
+    """
+    Parsed ontologies of a release shared between its steps.
+
+    Ontologies are kept under a digest of the content they were parsed from. A step only gets an ontology if the files
+    it was parsed from did not change since. The store lives in memory during one run of ``do_release``. If a
+    directory is given, each ontology is also written there as an ``OntologySnapshot``. A resumed release, e.g. after
+    the process was restarted, reads the snapshots instead of parsing the files again. Steps parse the files from disk
+    if neither is available.
+
+    Stored ontologies are shared between steps and must not be changed other than by resolving them again.
+    """
+    _logger = logging.getLogger(__name__)
+
+    _releases: ClassVar[Dict[int, "ParsedOntologyStore"]] = dict()
+    _releases_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    _ontologies: Dict[str, Result[ExcelOntology]]
+    _directory: Optional[str]
+    _lock: threading.Lock
+
+    def __init__(self, directory: Optional[str] = None) -> None:
+        self._ontologies = dict()
+        self._directory = directory
+        self._lock = threading.Lock()
+
+    @classmethod
+    def for_release(cls, release_id: int, directory: Optional[str] = None) -> Self:
+        """
+        :param release_id: The release
+        :param directory: Directory for the snapshots of the ontologies, e.g. in the working directory of the release
+        """
+        with cls._releases_lock:
+            return cls._releases.setdefault(release_id, cls(directory))
+
+    @classmethod
+    def discard(cls, release_id: int) -> None:
+        """
+        Frees the ontologies of a release. Called once a run of the release ends. Snapshots are kept.
+        """
+        with cls._releases_lock:
+            cls._releases.pop(release_id, None)
+
+    def get(self, key: str) -> Optional[Result[ExcelOntology]]:
+        """
+        :param key: Digest of the content the ontology was parsed from
+        :return: The ontology with the diagnostics of parsing it, or None if it is neither in memory nor in a snapshot
+        """
+        with self._lock:
+            loaded = self._ontologies.get(key)
+
+        if loaded is None and self._directory is not None:
+            loaded = self._read_snapshot(key)
+            if loaded is not None:
+                with self._lock:
+                    loaded = self._ontologies.setdefault(key, loaded)
+
+        return loaded
+
+    def put(self, key: str, loaded: Result[ExcelOntology]) -> None:
+        """
+        :param key: Digest of the content the ontology was parsed from
+        :param loaded: The ontology with the diagnostics of parsing it
+        """
+        with self._lock:
+            self._ontologies[key] = loaded
+
+        if self._directory is not None:
+            self._write_snapshot(key, loaded)
+
+    def _snapshot_path(self, key: str) -> str:
+        return os.path.join(self._directory, key.replace(":", "-") + ".snapshot")
+
+    def _read_snapshot(self, key: str) -> Optional[Result[ExcelOntology]]:
+        path = self._snapshot_path(key)
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with open(path, "rb") as f:
+                return OntologySnapshot.read(f)
+        except (OSError, SnapshotError) as e:
+            self._logger.warning(f"Ignoring the snapshot {path}: {e}")
+            return None
+
+    def _write_snapshot(self, key: str, loaded: Result[ExcelOntology]) -> None:
+        os.makedirs(self._directory, exist_ok=True)
+
+        # Write to a temporary file first so other processes never read a partial snapshot
+        fd, tmp = tempfile.mkstemp(".snapshot", dir=self._directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                OntologySnapshot.write(f, loaded.value, loaded)
+            os.replace(tmp, self._snapshot_path(key))
+        except (OSError, TypeError) as e:
+            # The ontology is still kept in memory
+            self._logger.warning(f"Could not write a snapshot of {key}: {e}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
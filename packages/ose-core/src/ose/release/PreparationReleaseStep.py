@@ -1,12 +1,37 @@
+from typing import Dict, List, Optional
+
 from .ReleaseStep import ReleaseStep
+from .common import file_digest
+from ..services.RepositorySnapshot import RepositorySnapshot
 
 
 class PreparationReleaseStep(ReleaseStep):
+    """
+    Downloads the source files of the release.
+
+    All files are taken from one snapshot of the main branch. Their blobs are downloaded in parallel before the files
+    are written to the working directory.
+    """
+    _snapshot: Optional[RepositorySnapshot] = None
+
     @classmethod
     def name(cls) -> str:
         return "PREPARATION"
 
+    def _download(self, file: str, local_name: Optional[str] = None):
+        if self._snapshot is None or file not in self._snapshot:
+            return super()._download(file, local_name)
+
+        self._snapshot.write(file, local_name if local_name is not None else self._local_name(file))
+
     def run(self):
+        self._update_progress(message="Listing files")
+        self._snapshot = RepositorySnapshot.load(self._gh, self._release_script.full_repository_name,
+                                                 self._repo_config.main_branch)
+        self._snapshot.prefetch(self._source_files())
+
+        self._raise_if_canceled()
+
         total = len(self._release_script.external.sources)
         if self._release_script.external.addParentsFile is not None:
             total += 1
@@ -61,6 +86,39 @@ class PreparationReleaseStep(ReleaseStep):
 
             self._raise_if_canceled()
 
+        if self._incremental:
+            self._set_release_info(dict(incremental=self._record_sources()))
+
         self._next_release_step()
 
         return True
+
+    def _record_sources(self) -> Dict[str, str]:
+        """
+        Stores the downloaded files with the digest of their content and compares them to the previous release.
+
+        The files are always downloaded as their content is only known afterwards.
+
+        :return: Why each file is considered changed or unchanged
+        """
+        reasons: Dict[str, str] = dict()
+        for path in self._source_files():
+            inputs = dict(content=file_digest(self._local_name(path)))
+            _, reasons[path] = self._reusable_artifact(path, "source", inputs)
+
+            self._store_artifact(self._local_name(path), path, "source", downloadable=False, inputs=inputs)
+
+        return reasons
+
+    def _source_files(self) -> List[str]:
+        """
+        :return: Paths of all files downloaded in this step, without duplicates
+        """
+        external = self._release_script.external
+        files: List[str] = [s.file for s in external.sources] + \
+                           [f for f in [external.addParentsFile, external.renameTermFile] if f]
+        for file in self._release_script.files.values():
+            files += [s.file for s in file.sources if s.type != "owl"]
+            files += [f for f in [file.addParentsFile, file.renameTermFile] if f]
+
+        return list(dict.fromkeys(files))
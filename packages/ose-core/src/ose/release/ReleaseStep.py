@@ -1,15 +1,19 @@
 import abc
+import dataclasses
 import logging
 import os
 from datetime import datetime
-from typing import Tuple, Optional, Literal, List
+from typing import Tuple, Optional, Literal, List, Dict, Any
 
 from flask_github import GitHub
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import Query
 
+from .ParsedOntologyStore import ParsedOntologyStore
 from .common import ReleaseCanceledException, fetch_assert_release, local_name, set_release_info, update_release, next_release_step, \
-    set_release_result, add_artifact, get_artifacts
+    set_release_result, add_artifact, get_artifacts, latest_artifact, file_digest, inputs_digest, changed_inputs, \
+    parse_release_file
+from .. import __version__
 from ..database.Release import Release, ReleaseArtifact
 from ..model.ExcelOntology import ExcelOntology
 from ..model.ReleaseScript import ReleaseScript, ReleaseScriptFile
@@ -49,6 +53,8 @@ class ReleaseStep(abc.ABC):
         self._q = db.session.query(Release)
         self._a = db.session.query(ReleaseArtifact)
         self._working_dir = tmp
+        self._inputs: Dict[str, Dict[str, Any]] = dict()
+        self._digests: Dict[str, Optional[str]] = dict()
 
     @property
     def _repo_config(self) -> RepositoryConfiguration:
@@ -61,6 +67,13 @@ class ReleaseStep(abc.ABC):
         assert config is not None, f"Repository configuration for '{self._release_script.full_repository_name}' not found."
         return config   
 
+    @property
+    def _incremental(self) -> bool:
+        """
+        Whether files whose inputs did not change since the previous release are reused instead of being rebuilt.
+        """
+        return self._repo_config.incremental_releases
+
     def _update_progress(self,
                          *,
                          position: Optional[Tuple[int, int]] = None,
@@ -111,7 +124,8 @@ class ReleaseStep(abc.ABC):
         periodically check for cancellation requests via `_raise_if_canceled`.
         
         A release step can store artifacts using `_store_artifact` or `_store_target_artifact`, and retrieve them and artifacts
-        from previous steps using `_artifacts`.
+        from previous steps using `_artifacts`. Ontologies of release files parsed by earlier steps of the same run are
+        available through `_parsed_ontology` and `_resolved_ontology`.
         
         The state of the execution should be reported using `_update_progress` and the final result should be set using `_set_release_result`.
         
@@ -150,8 +164,8 @@ class ReleaseStep(abc.ABC):
     def _next_release_step(self) -> None:
         next_release_step(self._q, self._release_id)
 
-    def _set_release_result(self, result):
-        set_release_result(self._q, self._release_id, result)
+    def _set_release_result(self, result, **details):
+        set_release_result(self._q, self._release_id, result, **details)
 
     def _download(self, file: str, local_name: Optional[str] = None):
         if local_name is None:
@@ -161,29 +175,184 @@ class ReleaseStep(abc.ABC):
 
     def _store_artifact(self, local_path: str, target_path: Optional[str] = None,
                        kind: Optional[Literal["source", "intermediate", "final"]] = None,
-                       downloadable: bool = True) -> None:
+                       downloadable: bool = True, inputs: Optional[Dict[str, Any]] = None) -> None:
+        """
+        :param inputs: Digests of the inputs the artifact was created from. Only artifacts with inputs are reused by
+                       later releases.
+        """
         kind = kind if kind is not None else ("intermediate" if target_path is None else "final")
 
         artifact = ReleaseArtifact(release_id=self._release_id, local_path=local_path, target_path=target_path,
-                                   kind=kind, downloadable=downloadable)
+                                   kind=kind, downloadable=downloadable,
+                                   input_digest=inputs_digest(inputs) if inputs is not None else None,
+                                   inputs=inputs)
 
         add_artifact(self._db, artifact)
 
     def _store_target_artifact(self, file: ReleaseScriptFile,
                               kind: Literal["source", "intermediate", "final"] = "final",
-                              downloadable: bool = True):
-        return self._store_artifact(self._local_name(file.target.file), file.target.file, kind, downloadable)
+                              downloadable: bool = True, inputs: Optional[Dict[str, Any]] = None):
+        return self._store_artifact(self._local_name(file.target.file), file.target.file, kind, downloadable, inputs)
 
     def _artifacts(self) -> List[ReleaseArtifact]:
         return get_artifacts(self._a, self._release_id)
 
+    def _file_inputs(self, name: str) -> Dict[str, Any]:
+        """
+        Digests of everything a release file is built from: its downloaded sources, its part of the release script, the
+        external ontology, the files it needs, and the version of the tools.
+
+        :param name: Name of the release file in the release script
+        :return: Digest or version by input name
+        """
+        if name in self._inputs:
+            return self._inputs[name]
+
+        file = self._release_script.files[name]
+        inputs: Dict[str, Any] = dict(
+            tool=f"ose-core {__version__} ({self._repo_config.ontology_builder})",
+            script=inputs_digest(dict(file=dataclasses.asdict(file),
+                                      prefixes=self._release_script.prefixes,
+                                      iri_prefix=self._release_script.iri_prefix)),
+        )
+
+        for path in [s.file for s in file.sources] + [f for f in [file.renameTermFile, file.addParentsFile] if f]:
+            inputs[f"source:{path}"] = self._local_digest(path)
+
+        inputs["external"] = self._local_digest(self._release_script.external.target.file)
+
+        for n in file.needs:
+            inputs[f"needs:{n}"] = inputs_digest(self._file_inputs(n))
+
+        self._inputs[name] = inputs
+        return inputs
+
+    def _local_digest(self, remote_name: str) -> Optional[str]:
+        """
+        Digest of the local file of a remote file name. Files do not change during a step, so each is only read once.
+
+        :return: The digest or None if the file does not exist
+        """
+        if remote_name not in self._digests:
+            local = self._local_name(remote_name)
+            self._digests[remote_name] = file_digest(local) if os.path.exists(local) else None
+
+        return self._digests[remote_name]
+
+    def _reusable_artifact(self, target_path: str, kind: Literal["source", "intermediate", "final"],
+                           inputs: Optional[Dict[str, Any]]) -> Tuple[Optional[ReleaseArtifact], str]:
+        """
+        Looks up the artifact of the previous release of the repository with the same target and inputs.
+
+        :param target_path: Target path of the artifact
+        :param kind: Kind of the artifact
+        :param inputs: Digests of the inputs of the artifact to create
+        :return: The previous artifact if its file can be reused and why it can or cannot be reused
+        """
+        if inputs is None:
+            return None, "inputs unknown"
+
+        repo = fetch_assert_release(self._q, self._release_id).repo
+        previous = latest_artifact(self._a, self._release_id, repo, target_path, kind)
+        if previous is None:
+            return None, "not part of a previous release"
+
+        if previous.input_digest is None:
+            return None, f"inputs not recorded by release {previous.release_id}"
+
+        if previous.input_digest != inputs_digest(inputs):
+            return None, "changed " + ", ".join(changed_inputs(previous.inputs, inputs))
+
+        if not os.path.exists(previous.local_path):
+            return None, f"file of release {previous.release_id} was removed"
+
+        return previous, f"unchanged since release {previous.release_id}"
+
+    @property
+    def _parsed(self) -> ParsedOntologyStore:
+        """
+        Ontologies parsed by earlier steps or earlier runs of the release.
+        """
+        return ParsedOntologyStore.for_release(self._release_id, os.path.join(self._working_dir, "parsed"))
+
+    def _parsed_ontology(self, name: str) -> Optional[ExcelOntology]:
+        """
+        Returns the resolved ontology of a release file if an earlier step parsed it from the same inputs.
+
+        :param name: Name of the release file in the release script
+        """
+        loaded = self._parsed.get("file:" + inputs_digest(self._file_inputs(name)))
+        return loaded.value if loaded is not None else None
+
+    def _keep_parsed_ontology(self, name: str, ontology: ExcelOntology) -> None:
+        """
+        Keeps the resolved ontology of a release file for later steps. The ontology must not be modified afterwards.
+
+        :param name: Name of the release file in the release script
+        :param ontology: The ontology parsed from the file's sources with its imports and resolved
+        """
+        self._parsed.put("file:" + inputs_digest(self._file_inputs(name)), Result(ontology))
+
+    def _resolved_ontology(self, name: str) -> Result[ExcelOntology]:
+        """
+        Returns the resolved ontology of a release file as VALIDATION parses it, i.e. with its renamings and new parents
+        applied and imports of the externals and of the files it needs. It is taken from an earlier step if possible and
+        parsed and kept otherwise, so a step sees the same ontology either way.
+
+        The ontology is shared with other steps and must not be modified. Use `ExcelOntology.merge_copies` to combine
+        it with other ontologies.
+
+        :param name: Name of the release file in the release script
+        :return: The ontology or the errors that prevented parsing it
+        """
+        parsed = self._parsed_ontology(name)
+        if parsed is not None:
+            return Result(parsed)
+
+        result = Result()
+        external = self._load_externals_ontology()
+        result += external
+        if not external.ok():
+            return result
+
+        imports = [external.value.as_import()]
+        file = self._release_script.files[name]
+        for n in file.needs:
+            needed = self._resolved_ontology(n)
+            result += needed
+            if not needed.ok():
+                return result
+
+            imports.append(needed.value.as_import())
+
+        parsed_result = parse_release_file(
+            file.target.iri,
+            imports,
+            [(s.type, s.file, self._local_name(s.file)) for s in file.sources],
+            self._local_name(file.renameTermFile) if file.renameTermFile is not None else None,
+            self._local_name(file.addParentsFile) if file.addParentsFile is not None else None,
+        )
+        result += parsed_result
+        self._keep_parsed_ontology(name, parsed_result.value)
+
+        return result
+
     def _load_externals_ontology(self) -> Result[ExcelOntology]:
         result = Result()
         config = self._repo_config
 
         externals_owl = self._local_name(self._release_script.external.target.file)
         if os.path.exists(externals_owl):
-            return ExcelOntology.from_owl(externals_owl, config.prefixes)
+            key = "external:" + inputs_digest(dict(file=self._local_digest(self._release_script.external.target.file),
+                                                   prefixes=config.prefixes))
+            loaded = self._parsed.get(key)
+            if loaded is None:
+                loaded = ExcelOntology.from_owl(externals_owl, config.prefixes)
+                if loaded.ok():
+                    self._parsed.put(key, loaded)
+
+            # Callers may extend the result
+            return Result().merge(loaded)
         else:
             result.error(type="external-owl-missing",
                          msg="The external OWL file is missing. Ensure it is build before this step")
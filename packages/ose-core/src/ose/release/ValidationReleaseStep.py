@@ -1,14 +1,79 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, Future, wait, FIRST_COMPLETED
+from typing import Dict, List, Optional, Tuple, Any
+
+from flask_github import GitHub
+from flask_sqlalchemy import SQLAlchemy
+
 from .ReleaseStep import ReleaseStep
-from .common import order_sources
-from ..model.ExcelOntology import ExcelOntology
+from .common import order_sources, parse_release_file, DependencyScheduler, fetch_assert_release, inputs_digest
+from ..model.ExcelOntology import ExcelOntology, OntologyImport
+from ..model.ReleaseScript import ReleaseScript
 from ..model.Result import Result
+from ..services.ConfigurationService import ConfigurationService
+
+
+def _validate_file(iri: str,
+                   imports: List[OntologyImport],
+                   sources: List[Tuple[str, str, str]],
+                   rename_term_file: Optional[str],
+                   add_parents_file: Optional[str],
+                   validate: bool = True) -> Tuple[Result[tuple], ExcelOntology]:
+    """
+    Parses, resolves, and validates a single release file. Runs in a worker process.
+
+    :param validate: Whether to validate the file or only to parse it for the files needing it
+    :return: The validation result and the parsed ontology
+    """
+    parsed = parse_release_file(iri, imports, sources, rename_term_file, add_parents_file)
+    ontology = parsed.value
+    result = Result().merge(parsed)
+    result.value = ()
+
+    if validate:
+        result += ontology.validate()
+
+    return result, ontology
 
 
 class ValidationReleaseStep(ReleaseStep):
+    def __init__(self, db: SQLAlchemy, gh: GitHub, release_script: ReleaseScript, release_id: int, tmp: str,
+                 config: ConfigurationService, *, workers: Optional[int] = None) -> None:
+        """
+        :param workers: Maximum number of release files validated at the same time. Defaults to the number of CPUs.
+        """
+        super().__init__(db, gh, release_script, release_id, tmp, config)
+
+        self._workers = workers
+
     @classmethod
     def name(cls) -> str:
         return "VALIDATION"
 
+    def _previous_validation(self, release_id: int, name: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Looks up the validation of a release file by a previous release from the same inputs.
+
+        A release stopped by validation errors may be continued, so a file built by a previous release did not
+        necessarily pass its validation.
+
+        :param release_id: The previous release
+        :param name: Name of the release file in the release script
+        :return: The validation info of the file if it passed without errors and why it can or cannot be reused
+        """
+        details = fetch_assert_release(self._q, release_id).details or dict()
+        digest = inputs_digest(self._file_inputs(name))
+        for info in details.values():
+            file_info = info.get(name) if isinstance(info, dict) else None
+            if isinstance(file_info, dict) and file_info.get("input_digest") == digest:
+                if file_info.get("valid") and len(file_info.get("errors", [])) == 0:
+                    return file_info, f"validated by release {release_id}"
+
+                return None, f"failed validation in release {release_id}"
+
+        return None, f"validation not recorded by release {release_id}"
+
     def run(self) -> bool:
         # Validate
         validation_info = dict()
@@ -27,7 +92,7 @@ class ValidationReleaseStep(ReleaseStep):
 
         external = external_ontology_result.value
         validation_result += external_ontology_result
-        
+
         if external is None:
             self._set_release_result(validation_result)
             return False
@@ -36,51 +101,80 @@ class ValidationReleaseStep(ReleaseStep):
         overall_ontology = ExcelOntology("<final>")
         overall_ontology.import_other_excel_ontology(external)
 
-        loaded = dict()
-        for k, file in queue:
-            self._next_item(item=k, message="Validating")
-
-            result = Result()
-            ontology = ExcelOntology(file.target.iri)
-            ontology.import_other_excel_ontology(external)
-
-            self._raise_if_canceled()
-
-            for n in file.needs:
-                other = loaded[n]  # Must exist queue is ordered to first load ontologies others depend on
-                result += ontology.import_other_excel_ontology(other)
-                self._raise_if_canceled()
-
-            for s in file.sources:
-                if s.type == "classes":
-                    result += ontology.add_terms_from_excel(s.file, self._local_name(s.file))
-                elif s.type == "relations":
-                    result += ontology.add_relations_from_excel(s.file, self._local_name(s.file))
-
-                self._raise_if_canceled()
-
-            if file.renameTermFile is not None:
-                ontology.apply_renamings(self._local_name(file.renameTermFile))
-
-            if file.addParentsFile is not None:
-                ontology.apply_new_parents(self._local_name(file.addParentsFile))
-
-            result += ontology.resolve()
-            self._raise_if_canceled()
-
-            result += ontology.validate()
-            self._raise_if_canceled()
+        external_import = external.as_import()
+
+        # Files built by a previous release from the same inputs were validated back then. If they passed, they are
+        # only parsed as they are part of the global validation and may be needed by other files, and the diagnostics
+        # of their previous validation are reported again.
+        reasons: Dict[str, str] = dict()
+        reused: Dict[str, Dict[str, Any]] = dict()
+        if self._incremental:
+            for k, file in queue:
+                previous, reasons[k] = self._reusable_artifact(file.target.file, "intermediate", self._file_inputs(k))
+                if previous is not None:
+                    previous_validation, reasons[k] = self._previous_validation(previous.release_id, k)
+                    if previous_validation is not None:
+                        reused[k] = previous_validation
+
+        # Files only depend on each other through their needs. Validate all files whose needs are validated in parallel
+        # and pass only the compact imports of validated ontologies on to the files needing them.
+        results: Dict[str, Tuple[Result[tuple], ExcelOntology]] = dict()
+        loaded: Dict[str, OntologyImport] = dict()
+        scheduler = DependencyScheduler(dict(queue))
+        running: Dict[Future, str] = dict()
+        max_workers = max(1, self._workers or min(len(queue), os.cpu_count() or 1))
+        # The release runs in a thread of the web server. Forking it could copy held locks, e.g. of the database
+        # session or logging, into the workers, so the workers are started from a clean server process instead.
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 mp_context=multiprocessing.get_context("forkserver")) as executor:
+            try:
+                while len(results) < len(queue):
+                    for k, file in scheduler.ready():
+                        future = executor.submit(
+                            _validate_file,
+                            file.target.iri,
+                            [external_import] + [loaded[n] for n in file.needs],
+                            [(s.type, s.file, self._local_name(s.file)) for s in file.sources],
+                            self._local_name(file.renameTermFile) if file.renameTermFile is not None else None,
+                            self._local_name(file.addParentsFile) if file.addParentsFile is not None else None,
+                            k not in reused,
+                        )
+                        running[future] = k
+
+                    done, _ = wait(running.keys(), timeout=5, return_when=FIRST_COMPLETED)
+                    self._raise_if_canceled()
+
+                    for future in done:
+                        k = running.pop(future)
+                        result, ontology = future.result()
+                        if k in reused:
+                            # The inputs did not change, so neither did the diagnostics
+                            result = Result((), warnings=list(reused[k]["warnings"]), errors=list(reused[k]["errors"]))
+                        results[k] = (result, ontology)
+                        loaded[k] = ontology.as_import()
+                        self._keep_parsed_ontology(k, ontology)
+                        scheduler.done(k)
+
+                        self._next_item(item=k, message="Validated")
+            except BaseException:
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+
+        for k, _ in queue:
+            result, ontology = results[k]
 
             validation_info[k] = dict(
                 valid=result.ok(),
                 warnings=result.warnings,
-                errors=result.errors
+                errors=result.errors,
+                input_digest=inputs_digest(self._file_inputs(k))
             )
+            if k in reasons:
+                validation_info[k]["incremental"] = reasons[k]
 
             validation_result += result
 
             overall_ontology.merge(ontology)
-            loaded[k] = ontology
 
         result = overall_ontology.validate(only=["duplicate"])
         validation_info["global"] = dict(
@@ -1,10 +1,14 @@
+import hashlib
+import json
 import os
-from typing import List, Tuple, Dict
+from typing import List, Tuple, Dict, Optional, Any
 
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import Query
 
 from ..database.Release import Release, ReleaseArtifact
+from ..model.ExcelOntology import ExcelOntology, OntologyImport
+from ..model.Result import Result
 from ose.model.ReleaseScript import ReleaseScriptFile
 
 
@@ -35,10 +39,11 @@ def next_release_step(q: Query[Release], release_id: int) -> None:
     return update_release(q, release_id, {Release.step: Release.step + 1})
 
 
-def set_release_result(q, release_id, result):
+def set_release_result(q, release_id, result, **details):
     set_release_info(q, release_id, dict(
         errors=result.errors,
-        warnings=result.warnings
+        warnings=result.warnings,
+        **details
     ))
     if not result.has_errors() and result.ok():
         next_release_step(q, release_id)
@@ -46,34 +51,156 @@ def set_release_result(q, release_id, result):
         update_release(q, release_id, dict(state="waiting-for-user"))
 
 
+class DependencyScheduler:
+    """
+    Hands out release files as soon as all files they need are done (Kahn's algorithm). Each file counts the files it
+    still waits for and is handed out once the count drops to zero, so marking a file as done only touches its
+    dependents. Files handed out together keep the order of the release script.
+    """
+    _sources: Dict[str, ReleaseScriptFile]
+    _position: Dict[str, int]
+    _waiting: Dict[str, int]
+    _dependents: Dict[str, List[str]]
+    _ready: List[str]
+
+    def __init__(self, sources: Dict[str, ReleaseScriptFile]) -> None:
+        """
+        :param sources: Release files by name
+        :raises ValueError: If a file needs an unknown file
+        """
+        unknown = [(k, n) for k, file in sources.items() for n in file.needs if n not in sources]
+        if any(unknown):
+            raise ValueError(", ".join(f"Unknown dependency '{n}' for '{k}'" for k, n in unknown))
+
+        self._sources = sources
+        self._position = dict((k, i) for i, k in enumerate(sources))
+        self._waiting = dict((k, len(set(file.needs))) for k, file in sources.items())
+        self._dependents = dict((k, []) for k in sources)
+        for k, file in sources.items():
+            for n in set(file.needs):
+                self._dependents[n].append(k)
+
+        self._ready = [k for k, n in self._waiting.items() if n == 0]
+
+    def ready(self) -> List[Tuple[str, ReleaseScriptFile]]:
+        """
+        Takes the files whose needs are all done and that were not handed out before.
+        """
+        ready = sorted(self._ready, key=self._position.__getitem__)
+        self._ready = []
+        return [(k, self._sources[k]) for k in ready]
+
+    def done(self, name: str) -> None:
+        """
+        Marks a file as done. Its dependents are handed out by the next call to `ready` once all their needs are done.
+        """
+        for d in self._dependents[name]:
+            self._waiting[d] -= 1
+            if self._waiting[d] == 0:
+                self._ready.append(d)
+
+    def waiting(self, name: str) -> int:
+        """
+        Number of files the file still waits for.
+        """
+        return self._waiting[name]
+
+
+def dependency_levels(sources: Dict[str, ReleaseScriptFile]) -> List[List[Tuple[str, ReleaseScriptFile]]]:
+    """
+    Groups release files into levels such that each file only needs files of earlier levels. Files of the same level
+    do not need each other and may be processed concurrently. Within a level, files keep the order of the release
+    script.
+
+    :param sources: Release files by name
+    :return: The levels of the files in the order they can be processed
+    :raises ValueError: If a file needs an unknown file or the files need each other in a cycle
+    """
+    scheduler = DependencyScheduler(sources)
+
+    levels: List[List[Tuple[str, ReleaseScriptFile]]] = []
+    level = scheduler.ready()
+    while len(level) > 0:
+        levels.append(level)
+        for k, _ in level:
+            scheduler.done(k)
+
+        level = scheduler.ready()
+
+    if sum(len(x) for x in levels) < len(sources):
+        # Every file that was not processed still waits for another one, so following them leads into a cycle
+        path: List[str] = []
+        visited: Dict[str, int] = dict()
+        current = next(k for k in sources if scheduler.waiting(k) > 0)
+        while current not in visited:
+            visited[current] = len(path)
+            path.append(current)
+            current = next(n for n in sources[current].needs if scheduler.waiting(n) > 0)
+
+        cycle = path[visited[current]:] + [current]
+        raise ValueError(f"Circular dependency in release files: {' needs '.join(cycle)}")
+
+    return levels
+
+
 def order_sources(sources: Dict[str, ReleaseScriptFile]) -> List[Tuple[str, ReleaseScriptFile]]:
-    queue: List[Tuple[str, ReleaseScriptFile]] = []
-    files: List[Tuple[str, ReleaseScriptFile]] = list(sources.items())
+    """
+    Orders the release files that are built from spreadsheets such that each file comes after the files it needs.
+    Files merged only from OWL files are not built and therefore not included.
+
+    :param sources: Release files by name
+    :return: The files to build in order
+    :raises ValueError: If the dependencies are invalid, see `dependency_levels`
+    """
+    ordered = [(k, file) for level in dependency_levels(sources) for k, file in level]
+    merged = set(k for k, file in ordered if all(s.type == "owl" for s in file.sources))
+
+    for k, file in ordered:
+        needs_merged = [n for n in file.needs if n in merged]
+        if k not in merged and any(needs_merged):
+            raise ValueError(f"'{k}' cannot need '{needs_merged[0]}', which is merged from OWL files and not built")
+
+    return [(k, file) for k, file in ordered if k not in merged]
 
-    for k, file in files:
-        unknown_dependencies = [n for n in file.needs if n not in (x for x, _ in files)]
-        if any(unknown_dependencies):
-            raise ValueError(f"Unknown dependencies '{', '.join(unknown_dependencies)}' for '{k}'")
 
-    no_change_since = 0
-    while len(files) > 0:
-        (k, file) = files.pop(0)
-        if all(s.type == "owl" for s in file.sources):
-            no_change_since = 0
-            continue
+def parse_release_file(iri: str,
+                       imports: List[OntologyImport],
+                       sources: List[Tuple[str, str, str]],
+                       rename_term_file: Optional[str],
+                       add_parents_file: Optional[str]) -> Result[ExcelOntology]:
+    """
+    Parses and resolves a single release file. All steps parse release files this way, so an ontology kept by one step
+    equals the one another step would parse. Must not access the database as it runs in worker processes.
 
-        if all(n in (x for x, _ in queue) for n in file.needs):
-            queue.append((k, file))
-            no_change_since = 0
-        else:
-            files.append((k, file))
+    :param iri: IRI of the ontology
+    :param imports: Imports of the external ontology and the files this file needs
+    :param sources: Type, name, and local path of each source of the file
+    :param rename_term_file: Local path of the renamings to apply
+    :param add_parents_file: Local path of the new parents to apply
+    :return: The resolved ontology
+    """
+    result = Result()
+    ontology = ExcelOntology(iri)
 
-            if len(files) < no_change_since:
-                raise ValueError("Circular dependency in release files!")
+    for ontology_import in imports:
+        result += ontology.add_import(ontology_import)
 
-            no_change_since += 1
+    for kind, name, path in sources:
+        if kind == "classes":
+            result += ontology.add_terms_from_excel(name, path)
+        elif kind == "relations":
+            result += ontology.add_relations_from_excel(name, path)
 
-    return queue
+    if rename_term_file is not None:
+        ontology.apply_renamings(rename_term_file)
+
+    if add_parents_file is not None:
+        ontology.apply_new_parents(add_parents_file)
+
+    result += ontology.resolve()
+
+    result.value = ontology
+    return result
 
 
 def add_artifact(db: SQLAlchemy, artifact: ReleaseArtifact) -> int:
@@ -87,6 +214,41 @@ def get_artifacts(q: Query[ReleaseArtifact], release_id: int) -> List[ReleaseArt
     return q.filter_by(release_id=release_id).all()
 
 
+def latest_artifact(q: Query[ReleaseArtifact], release_id: int, repo: str, target_path: str,
+                    kind: str) -> Optional[ReleaseArtifact]:
+    """
+    Returns the artifact stored last for a target by a release of the same repository before the given release.
+    """
+    return (q.join(Release, ReleaseArtifact.release_id == Release.id)
+            .filter(Release.repo == repo,
+                    Release.id < release_id,
+                    ReleaseArtifact.target_path == target_path,
+                    ReleaseArtifact.kind == kind)
+            .order_by(ReleaseArtifact.id.desc())
+            .first())
+
+
+def file_digest(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+
+    return h.hexdigest()
+
+
+def inputs_digest(inputs: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def changed_inputs(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> List[str]:
+    """
+    Names of the inputs which were added, removed, or changed.
+    """
+    previous = previous if previous is not None else dict()
+    return sorted(k for k in previous.keys() | current.keys() if previous.get(k) != current.get(k))
+
+
 def fetch_assert_release(q: Query[Release], release_id: int) -> Release:
     release = q.get(release_id)
 
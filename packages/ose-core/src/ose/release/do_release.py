@@ -18,6 +18,7 @@ from .GithubPublishReleaseStep import GithubPublishReleaseStep
 from .HumanVerificationReleaseStep import HumanVerificationReleaseStep
 from .ImportExternalReleaseStep import ImportExternalReleaseStep
 from .MergeReleaseStep import MergeReleaseStep
+from .ParsedOntologyStore import ParsedOntologyStore
 from .PreparationReleaseStep import PreparationReleaseStep
 from .ReleaseStep import ReleaseStep
 from .ValidationReleaseStep import ValidationReleaseStep
@@ -111,4 +112,5 @@ def do_release(db: SQLAlchemy, gh: GitHub, release_script: ReleaseScript, releas
         update_release(q, release_id, {Release.state: "errored"})
         logger.error(traceback.format_exc())
     finally:
+        ParsedOntologyStore.discard(release_id)
         update_release(q, release_id, {Release.worker_id: None})
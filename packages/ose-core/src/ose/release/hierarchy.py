@@ -14,6 +14,7 @@ def build_hierarchy(
     artifacts: list[ReleaseArtifact],
     local_name_fn: Callable[[str], str],
     prefixes: dict[str, str],
+    excel_ontology: Optional[ExcelOntology] = None,
 ) -> tuple[nx.DiGraph, pyhornedowl.PyIndexedOntology]:
     """Build a hierarchy graph and ontology from a release script file.
 
@@ -27,6 +28,9 @@ def build_hierarchy(
         artifacts: Release artifacts from previous steps (used to find built OWL files).
         local_name_fn: Function mapping remote file paths to local paths.
         prefixes: IRI prefix mappings to register with the ontology.
+        excel_ontology: The resolved ontology of the file as returned by
+            ``ReleaseStep._resolved_ontology``. It is only read. If not given, the
+            source spreadsheets are parsed as they are, without renamings or new parents.
 
     Returns:
         A tuple of (DiGraph, PyIndexedOntology). The graph has nodes with
@@ -59,12 +63,13 @@ def build_hierarchy(
         else:
             child_parent.append((c, None))
 
-    excel_ontology = ExcelOntology(file.target.iri)
-    for s in file.sources:
-        if s.type == "classes":
-            excel_ontology.add_terms_from_excel(s.file, local_name_fn(s.file)).ok_or_raise()
-        elif s.type == "relations":
-            excel_ontology.add_relations_from_excel(s.file, local_name_fn(s.file)).ok_or_raise()
+    if excel_ontology is None:
+        excel_ontology = ExcelOntology(file.target.iri)
+        for s in file.sources:
+            if s.type == "classes":
+                excel_ontology.add_terms_from_excel(s.file, local_name_fn(s.file)).ok_or_raise()
+            elif s.type == "relations":
+                excel_ontology.add_relations_from_excel(s.file, local_name_fn(s.file)).ok_or_raise()
 
     def node_annotations(iri: str) -> dict[str, str | None]:
         id = ontology.get_id_for_iri(iri)
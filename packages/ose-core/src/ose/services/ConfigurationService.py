@@ -1,6 +1,8 @@
 import abc
+import json
 from typing import Dict, Optional, Any, List
 
+from ose.model.ReleaseScript import ReleaseScript
 from ose.model.RepositoryConfiguration import RepositoryConfiguration
 
 
@@ -53,6 +55,28 @@ class ConfigurationService(abc.ABC):
     def get_file_raw(self, config: RepositoryConfiguration, path: str) -> Optional[bytes]:
         ...
 
+    def load_release_script(self, config: RepositoryConfiguration) -> Optional[ReleaseScript]:
+        """
+        Loads and parses the release script of a repository.
+
+        :param config: The repository
+        :return: The release script or None if the repository has none
+        :raises ValueError: If the release script is not valid JSON
+        """
+        file = self.get_file(config, config.release_script_path)
+        if file is None:
+            return None
+
+        return ReleaseScript.from_json(json.loads(file))
+
+    def refresh(self, full_name: str) -> None:
+        """
+        Notifies the service that the repository changed, e.g. on a push to it.
+
+        :param full_name: Full name of the repository
+        """
+        pass
+
     def get(self, name: str) -> Optional[RepositoryConfiguration]:
         parts = name.split("/")
         if len(parts) == 1:
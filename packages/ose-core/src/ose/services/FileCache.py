@@ -1,9 +1,15 @@
+import contextlib
+import fcntl
 import hashlib
 import json
+import logging
 import os
+import tempfile
+import threading
+import uuid
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Any, Tuple
 
 import requests
 from flask_github import GitHub
@@ -12,6 +18,9 @@ from ose.utils import get_file
 
 DEFAULT_LIFE_TIME = 60 * 60 * 24
 
+# Namespaces of cached entries, each with an optional quota
+NAMESPACES = ["github", "url", "computed"]
+
 
 @dataclass
 class CacheEntry:
@@ -19,71 +28,303 @@ class CacheEntry:
     updated: datetime
     expires: datetime
     id: str
+    size: int = 0
+
+    @property
+    def namespace(self) -> str:
+        if self.id.startswith("GH_"):
+            return "github"
+        if self.id.startswith("URL_"):
+            return "url"
+
+        return "computed"
 
 
 class FileCache:
+    """
+    Cache of downloaded files and of data derived from them.
+
+    The index of the cache is kept in memory. It is loaded from an append-only journal in the cache directory on first
+    use. Before each access, only the lines other processes appended since are read, which usually costs a single
+    ``stat``. The first line of the journal holds a generation id that changes whenever the journal is replaced, so a
+    replaced journal is noticed even if it got the inode of the previous one. Each change appends a line to the
+    journal while holding a file lock, so workers sharing the cache directory never lose entries. Cached files are
+    written to a temporary file and moved into place, so they are never read partially written. Once most lines of the
+    journal are outdated, it is compacted and replaced atomically.
+
+    The cache may be limited in total size, number of entries, and size per namespace (see ``NAMESPACES``). After each
+    store, expired entries are removed, and then the least recently used entries until all limits are met. An entry is
+    used when it is stored or retrieved, which is recorded in the modification time of its file, so all processes share
+    it. Removed entries are deleted from disk.
+    """
+    _logger = logging.getLogger(__name__)
+
     lifetime: int
     cache_dir: str
+    max_bytes: Optional[int]
+    max_entries: Optional[int]
+    quotas: Dict[str, int]
 
-    _cache_file: str
+    _journal_file: str
     _cache: Dict[str, CacheEntry]
+    _lock: threading.RLock
+    # Generation, inode and change time, and read position of the journal, to notice appends and compactions by other
+    # processes
+    _journal_generation: Optional[str]
+    _journal_stamp: Optional[Tuple[int, int]]
+    _journal_position: int
+    _journal_lines: int
+    _stats: Dict[str, int]
+
+    def __init__(self, cache_dir: str, life_time: int = DEFAULT_LIFE_TIME, max_bytes: Optional[int] = None,
+                 max_entries: Optional[int] = None, quotas: Optional[Dict[str, int]] = None):
+        """
+        :param cache_dir: Directory of the cache. May be shared between processes.
+        :param life_time: Default time in seconds after which entries expire
+        :param max_bytes: Maximum total size of the cached files
+        :param max_entries: Maximum number of cached files
+        :param quotas: Maximum size of the cached files by namespace
+        """
+        unknown = [n for n in (quotas or {}) if n not in NAMESPACES]
+        if any(unknown):
+            raise ValueError(f"Unknown cache namespaces '{', '.join(unknown)}'. Expected one of {', '.join(NAMESPACES)}")
 
-    def __init__(self, cache_dir: str, life_time: int = DEFAULT_LIFE_TIME):
         self.lifetime = life_time
         self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.quotas = dict(quotas or {})
         if not os.path.exists(self.cache_dir):
             os.makedirs(self.cache_dir, exist_ok=True)
 
-        self._cache_file = os.path.join(self.cache_dir, "cache.json")
+        self._journal_file = os.path.join(self.cache_dir, "cache.journal")
         self._cache = {}
+        self._lock = threading.RLock()
+        self._reset_journal()
+        self._stats = dict(hits=0, misses=0, stores=0, evictions=0)
+
+    @contextlib.contextmanager
+    def _locked(self):
+        # File locks are held per open file, so they also exclude other threads of this process
+        with self._lock, open(os.path.join(self.cache_dir, "cache.lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _reset_journal(self) -> None:
+        self._cache.clear()
+        self._journal_generation, self._journal_stamp, self._journal_position, self._journal_lines = None, None, 0, 0
 
-    def _save_cache(self):
-        with open(self._cache_file, "w") as f:
-            json.dump(self._cache, f, indent=2)
+    @staticmethod
+    def _read_generation(f) -> Optional[str]:
+        f.seek(0)
+        line = f.readline()
+        if not line.endswith(b"\n"):
+            return None
 
-    def _load_cache(self):
-        if os.path.exists(self._cache_file):
-            with open(self._cache_file, "r") as f:
-                data = json.load(f)
-                self._cache = {k: CacheEntry(id=k,
-                                             filename=v["filename"],
-                                             updated=datetime.fromisoformat(v["updated"]),
-                                             expires=datetime.fromisoformat(v["expires"])) for k, v in data.items()}
+        try:
+            return json.loads(line).get("generation")
+        except ValueError:
+            return None
 
-    def _store_cache_entry(self, id: str, basename: str, content: bytes, lifetime: int):
-        file_path = os.path.join(self.cache_dir, f"{id}-{basename}")
-        with open(file_path, "wb") as f:
-            f.write(content)
+    def _sync(self) -> None:
+        """
+        Applies the lines appended to the journal since it was last read. Reads it again if it was replaced.
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self._journal_file)
+                if (stat.st_ino, stat.st_ctime_ns) == self._journal_stamp and stat.st_size == self._journal_position:
+                    return
+
+                with open(self._journal_file, "rb") as f:
+                    # The journal may have been replaced since the stat
+                    stat = os.fstat(f.fileno())
+                    generation = self._read_generation(f)
+                    if generation != self._journal_generation or stat.st_size < self._journal_position:
+                        self._reset_journal()
+                        self._journal_generation = generation
+
+                    f.seek(self._journal_position)
+                    data = f.read()
+            except FileNotFoundError:
+                self._reset_journal()
+                return
+
+            # A line that is still being appended is read next time
+            end = data.rfind(b"\n") + 1
+            records = []
+            for line in data[:end].splitlines():
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    if self._journal_position > 0:
+                        # Read from the middle of a journal that was replaced unnoticed. Read it again from the start.
+                        self._reset_journal()
+                        self._sync()
+                        return
+
+                    self._logger.warning(f"Skipping a corrupt line of {self._journal_file}")
+
+            for record in records:
+                if "generation" not in record:
+                    self._apply(record)
+                self._journal_lines += 1
+
+            self._journal_position += end
+            self._journal_stamp = (stat.st_ino, stat.st_ctime_ns)
+
+    def _apply(self, record: dict) -> None:
+        if record.get("deleted", False):
+            self._cache.pop(record["id"], None)
+        else:
+            self._cache[record["id"]] = CacheEntry(id=record["id"],
+                                                   filename=record["filename"],
+                                                   updated=datetime.fromisoformat(record["updated"]),
+                                                   expires=datetime.fromisoformat(record["expires"]),
+                                                   size=record.get("size", 0))
+
+    @staticmethod
+    def _record(entry: CacheEntry) -> dict:
+        return dict(id=entry.id, filename=entry.filename, updated=entry.updated.isoformat(),
+                    expires=entry.expires.isoformat(), size=entry.size)
+
+    def _append(self, records: List[dict]) -> None:
+        # Must hold the file lock
+        self._sync()
+        if not os.path.exists(self._journal_file):
+            # Starts a new generation
+            self._compact()
+
+        with open(self._journal_file, "a") as f:
+            f.writelines(json.dumps(r) + "\n" for r in records)
+        self._sync()
+
+        if self._journal_lines > 2 * len(self._cache) + 100:
+            self._compact()
+
+    def _over_limits(self, entries: List[CacheEntry]) -> bool:
+        if self.max_entries is not None and len(entries) > self.max_entries:
+            return True
+        if self.max_bytes is not None and sum(e.size for e in entries) > self.max_bytes:
+            return True
+
+        return any(sum(e.size for e in entries if e.namespace == n) > q for n, q in self.quotas.items())
+
+    def _last_used(self, entry: CacheEntry) -> float:
+        try:
+            return os.stat(self._path(entry)).st_mtime
+        except FileNotFoundError:
+            return 0
+
+    def _evict(self) -> None:
+        """
+        Removes expired entries and then the least recently used ones until the cache is within its limits.
+        """
+        # Must hold the file lock
+        now = datetime.now()
+        evicted = [e for e in self._cache.values() if e.expires <= now]
+        entries = [e for e in self._cache.values() if e.expires > now]
+
+        if self._over_limits(entries):
+            entries.sort(key=self._last_used)
+
+            total = sum(e.size for e in entries)
+            by_namespace = dict((n, sum(e.size for e in entries if e.namespace == n)) for n in NAMESPACES)
+            count = len(entries)
+            for entry in entries:
+                quota = self.quotas.get(entry.namespace)
+                if not any([
+                    self.max_entries is not None and count > self.max_entries,
+                    self.max_bytes is not None and total > self.max_bytes,
+                    quota is not None and by_namespace[entry.namespace] > quota
+                ]):
+                    continue
+
+                evicted.append(entry)
+                count -= 1
+                total -= entry.size
+                by_namespace[entry.namespace] -= entry.size
+
+        if len(evicted) == 0:
+            return
+
+        for entry in evicted:
+            file_path = self._path(entry)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+        with self._lock:
+            self._stats["evictions"] += len(evicted)
 
+        self._append([dict(id=e.id, deleted=True) for e in evicted])
+
+    def _compact(self) -> None:
+        # Must hold the file lock
+        fd, tmp = tempfile.mkstemp(".journal", dir=self.cache_dir)
+        with os.fdopen(fd, "w") as f:
+            f.write(json.dumps(dict(generation=uuid.uuid4().hex)) + "\n")
+            f.writelines(json.dumps(self._record(e)) + "\n" for e in self._cache.values())
+        os.replace(tmp, self._journal_file)
+        self._sync()
+
+    def _path(self, entry: CacheEntry) -> str:
+        return os.path.join(self.cache_dir, f"{entry.id}-{entry.filename}")
+
+    def _store_cache_entry(self, id: str, basename: str, content: bytes, lifetime: int):
         updated = datetime.now()
         expires = updated + timedelta(seconds=lifetime)
-        self._cache[id] = CacheEntry(filename=basename, updated=updated, expires=expires, id=id)
-        self._save_cache()
+        entry = CacheEntry(filename=basename, updated=updated, expires=expires, id=id, size=len(content))
+
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp, self._path(entry))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        with self._locked():
+            self._append([self._record(entry)])
+            self._stats["stores"] += 1
+            self._evict()
+
+    def _retrieve_from_cache(self, id: str, count: bool = True) -> Optional[bytes]:
+        with self._lock:
+            self._sync()
+            entry = self._cache.get(id, None)
+
+        content = None
+        if entry is not None and entry.expires > datetime.now():
+            try:
+                file_path = self._path(entry)
+                with open(file_path, "rb") as f:
+                    content = f.read()
+
+                # Marks the entry as recently used
+                os.utime(file_path)
+            except FileNotFoundError:
+                # Removed by another process since the journal was read
+                pass
+
+        if count:
+            with self._lock:
+                self._stats["hits" if content is not None else "misses"] += 1
 
-    def _retrieve_from_cache(self, id: str):
-        entry = self._cache.get(id, None)
-        if entry is None:
-            return None
-
-        if entry.expires > datetime.now():
-            with open(os.path.join(self.cache_dir, f"{id}-{entry.filename}"), "rb") as f:
-                return f.read()
-        else:
-            del self._cache[id]
-        return None
+        return content
 
     def get_from_github(self, gh: GitHub, repo: str, path: str, lifetime: Optional[int] = None) -> bytes:
-        self._load_cache()
-
         lifetime = lifetime or self.lifetime
 
         id = "GH_" + hashlib.md5((repo + "$" + path).encode()).hexdigest()
         basename = os.path.basename(path)
 
-        if id in self._cache:
-            content = self._retrieve_from_cache(id)
-            if content is not None:
-                return content
+        content = self._retrieve_from_cache(id)
+        if content is not None:
+            return content
 
         content = get_file(gh, repo, path)
         self._store_cache_entry(id, basename, content, lifetime)
@@ -91,17 +332,14 @@ class FileCache:
         return content
 
     def get_from_url(self, url: str, lifetime: Optional[int] = None) -> bytes:
-        self._load_cache()
-
         lifetime = lifetime or self.lifetime
 
         id = "URL_" + hashlib.md5(url.encode()).hexdigest()
         basename = os.path.basename(url)
 
-        if id in self._cache:
-            content = self._retrieve_from_cache(id)
-            if content is not None:
-                return content
+        content = self._retrieve_from_cache(id)
+        if content is not None:
+            return content
 
         response = requests.get(url)
         response.raise_for_status()
@@ -109,45 +347,59 @@ class FileCache:
         self._store_cache_entry(id, basename, content, lifetime)
 
         return content
-    
-    def store(self, id: str, content: bytes, basename: Optional[str] = None, lifetime: Optional[int] = None) -> str:
-        self._load_cache()
 
+    def store(self, id: str, content: bytes, basename: Optional[str] = None, lifetime: Optional[int] = None) -> str:
         lifetime = lifetime or self.lifetime
         basename = basename or "CACHE_DATA"
 
-        if id in self._cache:
-            existing_content = self._retrieve_from_cache(id)
-            if existing_content is not None:
-                return id
+        if self._retrieve_from_cache(id, count=False) is not None:
+            return id
 
         self._store_cache_entry(id, basename, content, lifetime)
 
         return id
-    
+
     def retrieve(self, id: str) -> Optional[bytes]:
-        self._load_cache()
-        
         return self._retrieve_from_cache(id)
 
     def cleanup(self):
-
-        to_delete = []
-        for id, entry in self._cache.items():
-            if entry.expires <= datetime.now():
-                to_delete.append(id)
-        for id in to_delete:
-            file_path = os.path.join(self.cache_dir, f"{id}-{self._cache[id].filename}")
-            if os.path.exists(file_path):
-                os.remove(file_path)
-            del self._cache[id]
-        self._save_cache()
+        with self._locked():
+            self._sync()
+            self._evict()
+            self._compact()
 
     def clear(self):
-        self._load_cache()
-        for entry in self._cache.values():
-            file_path = os.path.join(self.cache_dir, f"{entry.id}-{entry.filename}")
-            if os.path.exists(file_path):
-                os.remove(file_path)
-        self._cache.clear()
-        self._save_cache()
+        with self._locked():
+            self._sync()
+
+            for entry in self._cache.values():
+                file_path = self._path(entry)
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+            self._cache.clear()
+
+            self._compact()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Usage of the cache. Hits, misses, stores, and evictions are counted since this process started. Entries and
+        sizes are those of the whole cache.
+        """
+        with self._lock:
+            self._sync()
+            entries = list(self._cache.values())
+            stats: Dict[str, Any] = dict(self._stats)
+
+        stats.update(
+            entries=len(entries),
+            bytes=sum(e.size for e in entries),
+            max_entries=self.max_entries,
+            max_bytes=self.max_bytes,
+            namespaces=dict((n, dict(
+                entries=sum(1 for e in entries if e.namespace == n),
+                bytes=sum(e.size for e in entries if e.namespace == n),
+                quota=self.quotas.get(n)
+            )) for n in NAMESPACES)
+        )
+
+        return stats
@@ -0,0 +1,422 @@
+import logging
+import os
+import re
+from typing import Optional, Dict, List, Tuple, Any, Callable
+
+import pyhornedowl
+from pyhornedowl.model import (IRI, Annotation, AnnotationAssertion, AnnotationProperty, AnnotationPropertyDomain,
+                               AnnotationPropertyRange, Class, ClassExpression, DataAllValuesFrom, DataExactCardinality,
+                               DataHasValue, DataMaxCardinality, DataMinCardinality, DataProperty, DataPropertyDomain,
+                               DataPropertyRange, DataSomeValuesFrom, Datatype, DatatypeLiteral, DeclareAnnotationProperty,
+                               DeclareClass, DeclareDataProperty, DeclareDatatype, DeclareNamedIndividual,
+                               DeclareObjectProperty, EquivalentClasses, EquivalentDataProperties,
+                               EquivalentObjectProperties, Import, NamedIndividual, ObjectAllValuesFrom,
+                               ObjectComplementOf, ObjectExactCardinality, ObjectHasValue, ObjectIntersectionOf,
+                               ObjectMaxCardinality, ObjectMinCardinality, ObjectProperty, ObjectPropertyDomain,
+                               ObjectPropertyRange, ObjectSomeValuesFrom, ObjectUnionOf, OntologyID, SimpleLiteral,
+                               SubAnnotationPropertyOf, SubClassOf, SubDataPropertyOf, SubObjectPropertyOf)
+
+from .OntologyTemplate import OntologyTemplate
+from .RobotOntologyBuildService import RobotOntologyBuildService
+from ..model.ExcelOntology import ExcelOntology
+from ..model.Relation import OWLPropertyType
+from ..model.Result import Result
+
+RDFS_LABEL = "http://www.w3.org/2000/01/rdf-schema#label"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+# Prefixes known to ROBOT without declaring them
+DEFAULT_PREFIXES = {
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "rdfs": "http://www.w3.org/2000/01/rdf-schema#",
+    "xsd": XSD,
+    "owl": "http://www.w3.org/2002/07/owl#",
+    "obo": "http://purl.obolibrary.org/obo/",
+    "oboInOwl": "http://www.geneontology.org/formats/oboInOwl#",
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "dcterms": "http://purl.org/dc/terms/",
+    "skos": "http://www.w3.org/2004/02/skos/core#",
+    "foaf": "http://xmlns.com/foaf/0.1/",
+}
+BUILTIN_NAMESPACES = [DEFAULT_PREFIXES[p] for p in ["rdf", "rdfs", "xsd", "owl"]]
+
+_TOKEN = re.compile(r"\s*(?:(\()|(\))|'([^']*)'|\"((?:[^\"\\]|\\.)*)\"(?:\^\^(\S+))?|<([^>]*)>|([^\s()]+))")
+_TEMPLATE = re.compile(r"^(\w+)(?: (.*?))?(?: SPLIT=(.+))?$")
+
+# Entity and declaration of each entity type
+_ENTITIES = {
+    "class": (Class, DeclareClass),
+    "object property": (ObjectProperty, DeclareObjectProperty),
+    "data property": (DataProperty, DeclareDataProperty),
+    "annotation property": (AnnotationProperty, DeclareAnnotationProperty),
+    "individual": (NamedIndividual, DeclareNamedIndividual),
+    "datatype": (Datatype, DeclareDatatype),
+}
+
+
+class TemplateError(Exception):
+    pass
+
+
+def _expand(id: str, prefixes: Dict[str, str]) -> Optional[str]:
+    if id.startswith("http://") or id.startswith("https://"):
+        return id
+
+    prefix, sep, local = id.partition(":")
+    if sep and prefix in prefixes:
+        return prefixes[prefix] + local
+    if sep and re.fullmatch(r"[A-Za-z][A-Za-z0-9_]*", prefix):
+        # Like the OBO context of ROBOT, e.g. RO:0002233
+        return f"{DEFAULT_PREFIXES['obo']}{prefix}_{local}"
+
+    return None
+
+
+class _Expressions:
+    """
+    Parses Manchester syntax class expressions as used in ROBOT templates, e.g. ``'has part' some (A or B)``.
+
+    Entities are given by label in single quotes, by CURIE, or by full IRI in angle brackets. Whether an entity is an
+    object or a data property is looked up by its IRI. Properties default to object properties.
+    """
+
+    def __init__(self, o: pyhornedowl.PyIndexedOntology, iri: Callable[[str], str],
+                 labels: Callable[[str], Optional[str]], types: Dict[str, str]) -> None:
+        self._o = o
+        self._iri = iri
+        self._labels = labels
+        self._types = types
+
+        self.signature: Dict[str, str] = dict()
+        "Entities used by the parsed expressions and their types"
+
+        self._tokens: List[Tuple[str, str]] = []
+        self._pos = 0
+
+    def entity_iri(self, kind: str, value: str) -> str:
+        if kind == "label":
+            id = self._labels(value)
+            if id is None:
+                raise TemplateError(f"Unknown label '{value}'")
+            return self._iri(id)
+        elif kind == "iri":
+            return value
+        else:
+            return self._iri(value)
+
+    def single_iri(self, text: str) -> str:
+        """
+        Parses a single entity, e.g. the parent of a property, and returns its IRI.
+        """
+        tokens = self._tokenize(text)
+        if len(tokens) != 1 or tokens[0][0] not in ["label", "iri", "word"]:
+            raise TemplateError(f"Expected a single entity but got '{text}'")
+
+        return self.entity_iri(*tokens[0])
+
+    def entity(self, text: str, typ: str) -> Any:
+        return _ENTITIES[typ][0](self.declare(self.single_iri(text), typ))
+
+    def declare(self, iri: str, typ: str) -> IRI:
+        if not any(iri.startswith(n) for n in BUILTIN_NAMESPACES):
+            self.signature.setdefault(iri, typ)
+
+        return self._o.iri(iri)
+
+    def class_expression(self, text: str) -> ClassExpression:
+        self._tokens = self._tokenize(text)
+        self._pos = 0
+
+        expression = self._union()
+        if self._pos < len(self._tokens):
+            raise TemplateError(f"Unexpected '{self._tokens[self._pos][1]}' in '{text}'")
+
+        return expression
+
+    @staticmethod
+    def _tokenize(text: str) -> List[Tuple[str, str]]:
+        tokens = []
+        pos = 0
+        text = text.strip()
+        while pos < len(text):
+            match = _TOKEN.match(text, pos)
+            if match is None or match.end() == pos:
+                raise TemplateError(f"Invalid expression '{text}'")
+
+            pos = match.end()
+            opening, closing, label, literal, datatype, iri, word = match.groups()
+            if opening is not None:
+                tokens.append(("(", opening))
+            elif closing is not None:
+                tokens.append((")", closing))
+            elif label is not None:
+                tokens.append(("label", label))
+            elif literal is not None:
+                tokens.append(("literal", literal + ("^^" + datatype if datatype is not None else "")))
+            elif iri is not None:
+                tokens.append(("iri", iri))
+            else:
+                tokens.append(("word", word))
+
+        return tokens
+
+    def _peek(self) -> Optional[Tuple[str, str]]:
+        return self._tokens[self._pos] if self._pos < len(self._tokens) else None
+
+    def _next(self) -> Tuple[str, str]:
+        token = self._peek()
+        if token is None:
+            raise TemplateError("Unexpected end of expression")
+
+        self._pos += 1
+        return token
+
+    def _keyword(self, *keywords: str) -> Optional[str]:
+        token = self._peek()
+        if token is not None and token[0] == "word" and token[1].lower() in keywords:
+            self._pos += 1
+            return token[1].lower()
+
+        return None
+
+    def _union(self) -> ClassExpression:
+        operands = [self._intersection()]
+        while self._keyword("or"):
+            operands.append(self._intersection())
+
+        return operands[0] if len(operands) == 1 else ObjectUnionOf(operands)
+
+    def _intersection(self) -> ClassExpression:
+        operands = [self._unary()]
+        while self._keyword("and", "that"):
+            operands.append(self._unary())
+
+        return operands[0] if len(operands) == 1 else ObjectIntersectionOf(operands)
+
+    def _unary(self) -> ClassExpression:
+        if self._keyword("not"):
+            return ObjectComplementOf(self._unary())
+
+        token = self._next()
+        if token[0] == "(":
+            expression = self._union()
+            if self._next()[0] != ")":
+                raise TemplateError("Missing ')'")
+            return expression
+
+        if token[0] not in ["label", "iri", "word"]:
+            raise TemplateError(f"Unexpected '{token[1]}'")
+
+        iri = self.entity_iri(*token)
+        restriction = self._keyword("some", "only", "value", "min", "max", "exactly")
+        if restriction is None:
+            return Class(self.declare(iri, "class"))
+
+        if self._types.get(iri) == "data property":
+            return self._data_restriction(DataProperty(self.declare(iri, "data property")), restriction)
+
+        return self._object_restriction(ObjectProperty(self.declare(iri, "object property")), restriction)
+
+    def _cardinality(self) -> int:
+        token = self._next()
+        if token[0] != "word" or not token[1].isdigit():
+            raise TemplateError(f"Expected a number but got '{token[1]}'")
+
+        return int(token[1])
+
+    def _has_operand(self) -> bool:
+        token = self._peek()
+        return token is not None and token[0] != ")" and not (
+                token[0] == "word" and token[1].lower() in ["and", "or", "that"])
+
+    def _object_restriction(self, p: ObjectProperty, restriction: str) -> ClassExpression:
+        if restriction == "some":
+            return ObjectSomeValuesFrom(p, self._unary())
+        elif restriction == "only":
+            return ObjectAllValuesFrom(p, self._unary())
+        elif restriction == "value":
+            token = self._next()
+            iri = self.entity_iri(*token)
+            return ObjectHasValue(p, NamedIndividual(self.declare(iri, "individual")))
+
+        n = self._cardinality()
+        filler = self._unary() if self._has_operand() else Class(self._o.iri(DEFAULT_PREFIXES["owl"] + "Thing"))
+        return {
+            "min": ObjectMinCardinality,
+            "max": ObjectMaxCardinality,
+            "exactly": ObjectExactCardinality
+        }[restriction](n, p, filler)
+
+    def _data_range(self) -> Datatype:
+        token = self._next()
+        return Datatype(self.declare(self.entity_iri(*token), "datatype"))
+
+    def _data_restriction(self, p: DataProperty, restriction: str) -> ClassExpression:
+        if restriction == "some":
+            return DataSomeValuesFrom(p, self._data_range())
+        elif restriction == "only":
+            return DataAllValuesFrom(p, self._data_range())
+        elif restriction == "value":
+            kind, value = self._next()
+            if kind == "literal":
+                value, _, datatype = value.partition("^^")
+                if datatype:
+                    return DataHasValue(p, DatatypeLiteral(value, self._o.iri(self.entity_iri("word", datatype))))
+                return DataHasValue(p, SimpleLiteral(value))
+            if kind == "word" and re.fullmatch(r"-?\d+", value):
+                return DataHasValue(p, DatatypeLiteral(value, self._o.iri(XSD + "integer")))
+            raise TemplateError(f"Expected a literal but got '{value}'")
+
+        n = self._cardinality()
+        filler = self._data_range() if self._has_operand() else \
+            Datatype(self._o.iri(DEFAULT_PREFIXES["rdfs"] + "Literal"))
+        return {
+            "min": DataMinCardinality,
+            "max": DataMaxCardinality,
+            "exactly": DataExactCardinality
+        }[restriction](n, p, filler)
+
+
+class HornedOwlOntologyBuildService(RobotOntologyBuildService):
+    """
+    Builds ontologies from their ROBOT template with py-horned-owl instead of ROBOT.
+
+    The same template as for ``robot template`` is interpreted in-process, which avoids starting a JVM for each release
+    file. Only ``build_ontology`` differs from ``RobotOntologyBuildService``. Importing, merging, and collapsing
+    external ontologies as well as reasoning still use ROBOT.
+
+    Unlike the ROBOT build, the built file is not reasoned over and reduced. This happens when all files are merged into
+    the release.
+    """
+    _logger = logging.getLogger(__name__)
+
+    def build_ontology(self, ontology: ExcelOntology, outfile: str, prefixes: Optional[Dict[str, str]],
+                       dependency_iris: Optional[List[str]], tmp_dir: str, iri_prefix: str) -> Result[Any]:
+        result = Result(())
+        prefixes = {**DEFAULT_PREFIXES, **(prefixes or {})}
+        template = OntologyTemplate.from_ontology(ontology)
+
+        o = pyhornedowl.PyIndexedOntology()
+        for prefix, definition in prefixes.items():
+            o.add_prefix_mapping(prefix, definition)
+
+        o.add_component(OntologyID(o.iri(ontology.iri()), None))
+        for dependency in dependency_iris or []:
+            o.add_component(Import(o.iri(dependency)))
+
+        def iri(id: str) -> str:
+            expanded = _expand(id, prefixes)
+            if expanded is None:
+                raise TemplateError(f"'{id}' is neither an IRI nor a CURIE")
+
+            return expanded
+
+        # Labels are resolved against the template first and then against the imported ontologies
+        labels: Dict[str, str] = dict()
+        types: Dict[str, str] = dict()
+        for row in template.rows:
+            if row.get("label") and row.get("id"):
+                labels.setdefault(row["label"], row["id"])
+                types.setdefault(row["id"], row["type"])
+        for relation in ontology.used_relations():
+            if relation.label is not None and relation.id is not None:
+                labels.setdefault(relation.label, relation.id)
+                if relation.owl_property_type == OWLPropertyType.DataProperty:
+                    types.setdefault(relation.id, "data property")
+        types = dict((_expand(id, prefixes), t) for id, t in types.items())
+
+        expressions = _Expressions(o, iri, lambda label: labels.get(label) or ontology.find_term_id(label), types)
+
+        columns = [(name, _TEMPLATE.match(template_string).groups()) for name, template_string in template.header]
+        for row in template.rows:
+            try:
+                subject = iri(row["id"])
+            except TemplateError as e:
+                result.error(type="template-invalid-id", id=row["id"], msg=f"Failed to build '{row['id']}': {e}")
+                continue
+
+            typ = row["type"]
+            expressions.declare(subject, typ)
+
+            for name, (kind, pattern, split) in columns:
+                value = row.get(name)
+                if value is None or value == "" or kind in ["TYPE", "ID"]:
+                    continue
+
+                values = [v.strip() for v in str(value).split(split)] if split is not None else [str(value).strip()]
+                for v in values:
+                    if v == "":
+                        continue
+
+                    try:
+                        self._add_cell(o, expressions, iri, subject, typ, kind, pattern, v)
+                    except TemplateError as e:
+                        result.error(type="template-invalid-cell",
+                                     id=row["id"],
+                                     column=name,
+                                     value=v,
+                                     msg=f"Failed to build '{row['id']}' from '{v}' in column '{name}': {e}")
+
+        for entity, typ in expressions.signature.items():
+            entity_type, declaration = _ENTITIES[typ]
+            o.add_component(declaration(entity_type(o.iri(entity))))
+
+        if result.has_errors():
+            return result
+
+        if dependency_iris is not None and len(dependency_iris) > 0:
+            self._create_catalog_file(tmp_dir, dependency_iris)
+
+        o.save_to_file(os.path.join(tmp_dir, outfile), "owl")
+
+        return result
+
+    def _add_cell(self, o: pyhornedowl.PyIndexedOntology, expressions: _Expressions, iri: Callable[[str], str],
+                  subject: str, typ: str, kind: str, pattern: Optional[str], value: str) -> None:
+        """
+        Adds the axioms of a single value of a template cell.
+
+        :param subject: IRI of the entity of the row
+        :param typ: Type of the entity of the row
+        :param kind: Kind of the template string of the column, e.g. ``SC`` or ``A``
+        :param pattern: The template string after the kind, e.g. ``% SPLIT=;`` or ``'has part' some %``
+        :param value: The value of the cell
+        """
+        text = pattern.replace("%", value) if pattern is not None else value
+        s = o.iri(subject)
+
+        if kind == "LABEL":
+            o.add_component(AnnotationAssertion(s, Annotation(AnnotationProperty(o.iri(RDFS_LABEL)),
+                                                              SimpleLiteral(value))))
+        elif kind == "A":
+            p = AnnotationProperty(expressions.declare(iri(pattern), "annotation property"))
+            o.add_component(AnnotationAssertion(s, Annotation(p, SimpleLiteral(value))))
+        elif typ == "class":
+            if kind == "SC":
+                o.add_component(SubClassOf(Class(s), expressions.class_expression(text)))
+            elif kind == "EC":
+                o.add_component(EquivalentClasses([Class(s), expressions.class_expression(text)]))
+        elif typ in ["object property", "data property", "annotation property"]:
+            p = _ENTITIES[typ][0](s)
+            if kind == "SP":
+                parent = expressions.entity(text, typ)
+                o.add_component({
+                                    "object property": SubObjectPropertyOf,
+                                    "data property": SubDataPropertyOf,
+                                    "annotation property": SubAnnotationPropertyOf,
+                                }[typ](p, parent))
+            elif kind == "EP" and typ == "object property":
+                o.add_component(EquivalentObjectProperties([p, expressions.entity(text, typ)]))
+            elif kind == "EP" and typ == "data property":
+                o.add_component(EquivalentDataProperties([p, expressions.entity(text, typ)]))
+            elif kind == "DOMAIN" and typ == "object property":
+                o.add_component(ObjectPropertyDomain(p, expressions.class_expression(text)))
+            elif kind == "DOMAIN" and typ == "data property":
+                o.add_component(DataPropertyDomain(p, expressions.class_expression(text)))
+            elif kind == "RANGE" and typ == "object property":
+                o.add_component(ObjectPropertyRange(p, expressions.class_expression(text)))
+            elif kind == "RANGE" and typ == "data property":
+                o.add_component(DataPropertyRange(p, expressions.entity(text, "datatype")))
+            elif kind in ["DOMAIN", "RANGE"] and typ == "annotation property":
+                value_iri = o.iri(expressions.single_iri(text))
+                o.add_component((AnnotationPropertyDomain if kind == "DOMAIN" else AnnotationPropertyRange)(p, value_iri))
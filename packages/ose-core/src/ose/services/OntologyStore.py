@@ -0,0 +1,208 @@
+import contextlib
+import dataclasses
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Iterator, Tuple
+
+import requests
+
+from ..model.Result import Result
+
+CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class StoreEntry:
+    url: str
+    digest: str
+    size: int
+    fetched: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+class OntologyStore:
+    """
+    Content-addressed store of downloaded external ontologies.
+
+    Files are stored once under their SHA-256 digest. A manifest maps each URL to the digest of its latest content
+    together with the validators (ETag and Last-Modified) sent by the server. These are used to revalidate a URL with a
+    conditional request instead of downloading it again. Files are written to a temporary file first and moved into
+    place atomically. The manifest is guarded by a file lock, so several releases may share the store, also across
+    processes.
+
+    Stored content of immutable URLs, e.g. version IRIs, is served without a request. Entries without validators are
+    served without a request for ``max_age`` after they were fetched, as they could only be downloaded again.
+
+    In offline mode only previously stored files are served.
+    """
+    _logger = logging.getLogger(__name__)
+
+    root: str
+    offline: bool
+    timeout: float
+    max_age: timedelta
+
+    def __init__(self, root: str, offline: bool = False, timeout: float = 60,
+                 max_age: timedelta = timedelta(hours=24)) -> None:
+        self.root = root
+        self.offline = offline
+        self.timeout = timeout
+        self.max_age = max_age
+
+        os.makedirs(os.path.join(self.root, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(self.root, "tmp"), exist_ok=True)
+
+    @property
+    def _manifest_file(self) -> str:
+        return os.path.join(self.root, "manifest.json")
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.root, "objects", digest[:2], digest + ".owl")
+
+    def lookup(self, url: str) -> Optional[StoreEntry]:
+        """
+        Stored entry of a URL if its file is present and complete.
+        """
+        with self._locked(shared=True):
+            entry = self._read_manifest().get(url)
+
+        if entry is None or not os.path.exists(self.path(entry.digest)) or \
+                os.path.getsize(self.path(entry.digest)) != entry.size:
+            return None
+
+        return entry
+
+    def is_fresh(self, entry: StoreEntry) -> bool:
+        """
+        Whether an entry without validators was fetched recently enough to be served without a request.
+        """
+        if entry.etag is not None or entry.last_modified is not None:
+            return False
+
+        try:
+            return datetime.utcnow() - datetime.fromisoformat(entry.fetched) < self.max_age
+        except ValueError:
+            return False
+
+    def fetch(self, url: str, immutable: bool = False) -> Result[str]:
+        """
+        Returns the local path of the content of a URL. Downloads or revalidates the URL unless in offline mode, the URL
+        is immutable and stored, or the stored entry is fresh.
+
+        If the URL cannot be reached but was stored before, the stored content is used and a warning is added.
+
+        :param url: The URL to fetch
+        :param immutable: Whether the content of the URL never changes, e.g. for version IRIs
+        :return: The path of the stored file
+        """
+        result = Result()
+        entry = self.lookup(url)
+
+        if self.offline:
+            if entry is None:
+                result.error(type="download-offline",
+                             url=url,
+                             msg=f"'{url}' is not available offline. Download it once without offline mode.")
+            else:
+                result.value = self.path(entry.digest)
+            return result
+
+        if entry is not None and (immutable or self.is_fresh(entry)):
+            self._logger.debug(f"Using '{url}' fetched {entry.fetched} without revalidation")
+            result.value = self.path(entry.digest)
+            return result
+
+        headers = dict()
+        if entry is not None:
+            if entry.etag is not None:
+                headers["If-None-Match"] = entry.etag
+            if entry.last_modified is not None:
+                headers["If-Modified-Since"] = entry.last_modified
+
+        try:
+            with requests.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+                if response.status_code == 304 and entry is not None:
+                    self._logger.debug(f"'{url}' not modified since {entry.fetched}")
+                    self._update_manifest(dataclasses.replace(entry, fetched=datetime.utcnow().isoformat()))
+                    result.value = self.path(entry.digest)
+                    return result
+
+                response.raise_for_status()
+
+                digest, size = self._store(response.iter_content(CHUNK_SIZE))
+                self._update_manifest(StoreEntry(
+                    url=url,
+                    digest=digest,
+                    size=size,
+                    fetched=datetime.utcnow().isoformat(),
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                ))
+                result.value = self.path(digest)
+        except (requests.RequestException, OSError) as e:
+            self._logger.error(f"Failed to download '{url}': {e}")
+            if entry is not None:
+                result.warning(type="download-failed-using-stored",
+                               url=url,
+                               msg=f"Failed to download '{url}'. Using the version fetched {entry.fetched}: {e}")
+                result.value = self.path(entry.digest)
+            else:
+                result.error(type="download-failed", url=url, msg=f"Failed to download '{url}': {e}")
+
+        return result
+
+    def _store(self, chunks: Iterator[bytes]) -> Tuple[str, int]:
+        h = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    h.update(chunk)
+                    size += len(chunk)
+
+            digest = h.hexdigest()
+            target = self.path(digest)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            # Same digest, same content. An existing file is kept as it might be in use.
+            if not os.path.exists(target):
+                os.replace(tmp, target)
+
+            return digest, size
+        finally:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+
+    @contextlib.contextmanager
+    def _locked(self, shared: bool = False):
+        with open(os.path.join(self.root, "manifest.lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_manifest(self) -> Dict[str, StoreEntry]:
+        if not os.path.exists(self._manifest_file):
+            return dict()
+
+        with open(self._manifest_file, "r") as f:
+            return dict((k, StoreEntry(**v)) for k, v in json.load(f).items())
+
+    def _update_manifest(self, entry: StoreEntry) -> None:
+        with self._locked():
+            manifest = self._read_manifest()
+            manifest[entry.url] = entry
+
+            fd, tmp = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+            with os.fdopen(fd, "w") as f:
+                json.dump(dict((k, dataclasses.asdict(v)) for k, v in manifest.items()), f, indent=2)
+            os.replace(tmp, self._manifest_file)
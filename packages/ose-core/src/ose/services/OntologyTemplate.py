@@ -0,0 +1,99 @@
+import csv
+from dataclasses import dataclass
+from typing import List, Tuple, Dict, Any, TextIO
+
+from typing_extensions import Self
+
+from ..model.ExcelOntology import ExcelOntology
+from ..model.Relation import OWLPropertyType
+from ..model.TermIdentifier import TermIdentifier
+
+
+@dataclass
+class OntologyTemplate:
+    """
+    ROBOT template of the terms and relations of an ontology. See http://robot.obolibrary.org/template
+
+    The first row of a ROBOT template names the columns, the second holds the template strings of the columns.
+    """
+    header: List[Tuple[str, str]]
+    "Name and template string of each column"
+    rows: List[Dict[str, Any]]
+    "Values of each row by column name"
+
+    @classmethod
+    def from_ontology(cls, ontology: ExcelOntology) -> Self:
+        internal_relations = [r.id for r in ontology.used_relations() if
+                              r.owl_property_type == OWLPropertyType.Internal]
+
+        header = [
+            ("type", "TYPE"),
+            ("id", "ID"),
+            ("label", "LABEL"),
+            ("parent class", "SC % SPLIT=;"),
+            ("parent relation", "SP % SPLIT=;"),
+            ("logical definition", "EC %"),
+            ("domain", "DOMAIN"),
+            ("range", "RANGE"),
+            ("equivalent relationship", "EP % SPLIT=;")
+        ]
+
+        for relation in ontology.used_relations():
+            if relation.owl_property_type == OWLPropertyType.AnnotationProperty:
+                header.append((f"REL '{relation.label}'", f"A {relation.id} SPLIT=;"))
+            elif relation.owl_property_type in [OWLPropertyType.DataProperty, OWLPropertyType.ObjectProperty]:
+                header.append((f"REL '{relation.label}'", f"SC '{relation.label}' some % SPLIT=;"))
+            else:
+                pass
+
+        rows = []
+        for term in ontology.terms():
+            row = {
+                "type": "class",
+                "id": term.id,
+                "label": term.label,
+                "parent class": ";".join(t.id for t in term.sub_class_of),
+                "logical definition": ";".join(t for t in term.equivalent_to)
+            }
+
+            for relation, value in term.relations:
+                if relation.id in internal_relations:
+                    continue
+
+                row[f"REL '{relation.label}'"] = value.id if isinstance(value, TermIdentifier) else value
+
+            rows.append(row)
+
+        for relation in ontology.relations():
+            if relation.owl_property_type == OWLPropertyType.Internal:
+                continue
+
+            typ = {
+                OWLPropertyType.AnnotationProperty: "annotation property",
+                OWLPropertyType.ObjectProperty: "object property",
+                OWLPropertyType.DataProperty: "data property"
+            }[relation.owl_property_type]
+            row = {
+                "type": typ,
+                "id": relation.id,
+                "label": relation.label,
+                "parent relation": ";".join(r.id for r in relation.sub_property_of),
+                "domain": relation.domain.id if relation.domain is not None else None,
+                "range": relation.range.id if relation.range is not None else None,
+                "equivalent relationship": ";".join(p.id for p in relation.equivalent_relations)
+            }
+
+            for r, value in relation.relations:
+                row[f"REL '{r.label}'"] = value
+
+            rows.append(row)
+
+        return cls(header, rows)
+
+    def write_csv(self, file: TextIO) -> None:
+        fieldnames = [k for k, _ in self.header]
+        writer = csv.DictWriter(file, fieldnames, delimiter=',', quotechar='\"', quoting=csv.QUOTE_MINIMAL)
+
+        writer.writeheader()
+        writer.writerow(dict(self.header))
+        writer.writerows(self.rows)
@@ -1,9 +1,12 @@
 from abc import abstractmethod, ABC
-from typing import Optional, Any, Dict, List, Tuple, Literal
+from typing import Optional, Any, Dict, List, Tuple, Literal, Callable
 
 from ..model.ExcelOntology import OntologyImport, ExcelOntology
 from ..model.Result import Result
 
+# Called with the number of finished items, the total number of items, and the name of the last finished item
+ProgressCallback = Callable[[int, int, str], None]
+
 
 class OntologyBuildService(ABC):
     @abstractmethod
@@ -14,8 +17,13 @@ class OntologyBuildService(ABC):
                       main_ontology_name: str,
                       tmp_dir: str,
                       renamings: List[Tuple[str, str, Literal["class", "object property", "data_property"]]],
-                      new_parents: List[Tuple[str, str, Literal["class", "object property", "data_property"]]]
+                      new_parents: List[Tuple[str, str, Literal["class", "object property", "data_property"]]],
+                      progress: Optional[ProgressCallback] = None
                       ) -> Result[Any]:
+        """
+        :param progress: Called for each imported ontology once it is extracted. Called in the calling thread, so it may
+                         raise to abort the merge.
+        """
         ...
 
     @abstractmethod
@@ -40,3 +48,16 @@ class OntologyBuildService(ABC):
     @abstractmethod
     def collapse_imports(self, file: str) -> Result[Any]:
         ...
+
+    def register_dependencies(self, tmp_dir: str, dependency_iris: List[str]) -> None:
+        """
+        Makes the ontologies with the given IRIs resolvable from files in the directory, as `build_ontology` does for
+        its dependencies. Used for files that are not built but taken from a previous build.
+        """
+        pass
+
+    def cancel(self) -> None:
+        """
+        Stops all running builds. Builds started afterwards fail immediately.
+        """
+        pass
@@ -1,15 +1,20 @@
+import copy
 import json
 import logging
+import threading
+import time
 from os import path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 
 import requests
 import yaml
 from dacite import from_dict
 from flask_github import GitHub, GitHubError
 
+from ose.model.ReleaseScript import ReleaseScript
 from ose.model.RepositoryConfiguration import RepositoryConfiguration
 from ose.services.ConfigurationService import ConfigurationService
+from ose.utils.github import get_revalidated
 
 REPOSITORY_CONFIG_PATH_PROP = "REPOSITORIES_REPOSITORY_CONFIG_PATH"
 REPOSITORY_CONFIG_STARTUP_REPOSITORIES_PROP = "REPOSITORIES_REPOSITORY_CONFIG_STARTUP_REPOSITORIES_FILE"
@@ -17,11 +22,25 @@ BASE_URL_PROP = "REPOSITORIES_REPOSITORY_CONFIG_BASE_URL"
 DEFAULT_HEADERS_PROP = "REPOSITORIES_REPOSITORY_CONFIG_REQUEST_HEADERS"
 ALLOW_LOAD_REPOSITORIES_PROP = "REPOSITORIES_REPOSITORY_CONFIG_ALLOW_LOAD"
 ALLOW_SAVE_REPOSITORIES_PROP = "REPOSITORIES_REPOSITORY_CONFIG_ALLOW_SAVE"
+REFRESH_INTERVAL_PROP = "REPOSITORIES_REPOSITORY_CONFIG_REFRESH_INTERVAL"
 
 
 class RepositoryConfigurationService(ConfigurationService):
+    """
+    Loads the configurations of repositories and their release scripts from GitHub.
+
+    Parsed release scripts are kept by the commit of the main branch they were loaded from. The commit is checked at
+    most once per refresh interval (``REPOSITORIES_REPOSITORY_CONFIG_REFRESH_INTERVAL`` seconds) or after ``refresh``
+    was called, e.g. for a push event. If it changed, the repository configuration and the release script are loaded
+    again.
+    """
     _logger = logging.getLogger(__name__)
     _loaded_repositories: Dict[str, RepositoryConfiguration]
+    _by_short_name: Dict[str, RepositoryConfiguration]
+    # Commit of the main branch by repository and when it was checked
+    _heads: Dict[str, Tuple[str, float]]
+    _release_scripts: Dict[str, Tuple[str, Optional[ReleaseScript]]]
+    _lock: threading.Lock
 
     def __init__(self, app_config: Dict[str, Any], gh: GitHub, *_args, **_kwargs):
         super().__init__(app_config)
@@ -31,7 +50,12 @@ class RepositoryConfigurationService(ConfigurationService):
         self._config_path = app_config.get(REPOSITORY_CONFIG_PATH_PROP)
         self._base_url = app_config.get(BASE_URL_PROP)
         self._headers = app_config.get(DEFAULT_HEADERS_PROP)
+        self._refresh_interval = app_config.get(REFRESH_INTERVAL_PROP, 60)
         self._loaded_repositories = {}
+        self._by_short_name = {}
+        self._heads = {}
+        self._release_scripts = {}
+        self._lock = threading.Lock()
 
         self._startup_repos_path = self.app_config.get(REPOSITORY_CONFIG_STARTUP_REPOSITORIES_PROP)
 
@@ -110,9 +134,11 @@ class RepositoryConfigurationService(ConfigurationService):
         return list(self._loaded_repositories.values())
 
     def get_by_short_name(self, short_name: str) -> Optional[RepositoryConfiguration]:
-        config = next((c for c in self._loaded_repositories.values() if c.short_name.lower() == short_name.lower()),
-                      None)
-        return config
+        return self._by_short_name.get(short_name.lower())
+
+    def _index(self) -> None:
+        with self._lock:
+            self._by_short_name = dict((c.short_name.lower(), c) for c in self._loaded_repositories.values())
 
     def get_by_full_name(self, full_name: str) -> Optional[RepositoryConfiguration]:
         url = self._base_url.format(full_name=full_name, path=self._config_path)
@@ -154,35 +180,98 @@ class RepositoryConfigurationService(ConfigurationService):
             return None
 
         self._loaded_repositories[url] = configuration
+        self._index()
 
         return configuration
 
-    def get_file_raw(self, config: RepositoryConfiguration, path: str) -> Optional[bytes]:
+    def get_file_raw(self, config: RepositoryConfiguration, path: str, ref: Optional[str] = None) -> Optional[bytes]:
         url = self._base_url.format(full_name=config.full_name, path=path)
 
         try:
-            response = self._gh.get(url, headers=self._headers)
+            return get_revalidated(self._gh, url, params={"ref": ref} if ref is not None else None,
+                                   headers=self._headers, raw=True)
         except GitHubError as e:
             self._logger.warning(f"Could not get file '{path}': {e}")
-            return
+            return None
 
-        if not response.ok:
-            self._logger.warning(f"Could not get file '{path}': {response}")
+    def _head(self, config: RepositoryConfiguration) -> Optional[str]:
+        """
+        Commit of the main branch of a repository. Checked again once the refresh interval passed.
+        """
+        with self._lock:
+            known = self._heads.get(config.full_name)
+        if known is not None and time.monotonic() - known[1] < self._refresh_interval:
+            return known[0]
+
+        if self._gh.get_access_token() is None:
             return None
 
-        return response.content
+        try:
+            sha = get_revalidated(self._gh, f"repos/{config.full_name}/commits/{config.main_branch}",
+                                  headers={"Accept": "application/vnd.github.sha"}, raw=True).decode().strip()
+        except GitHubError as e:
+            self._logger.warning(f"Could not get the latest commit of '{config.full_name}': {e}")
+            return known[0] if known is not None else None
+
+        with self._lock:
+            self._heads[config.full_name] = (sha, time.monotonic())
+
+        if known is not None and known[0] != sha:
+            self._reload_configuration(config)
+
+        return sha
+
+    def _reload_configuration(self, config: RepositoryConfiguration) -> None:
+        url = self._base_url.format(full_name=config.full_name, path=self._config_path)
+        previous = self._loaded_repositories.pop(url, None)
+        if previous is None:
+            return
+
+        if self.get_by_full_name(config.full_name) is None:
+            # Keep the previous configuration rather than losing the repository
+            self._loaded_repositories[url] = previous
+            self._index()
+
+    def load_release_script(self, config: RepositoryConfiguration) -> Optional[ReleaseScript]:
+        sha = self._head(config)
+        if sha is None:
+            return super().load_release_script(config)
+
+        with self._lock:
+            cached = self._release_scripts.get(config.full_name)
+
+        if cached is None or cached[0] != sha:
+            file = self.get_file_raw(config, config.release_script_path, ref=sha)
+            cached = (sha, ReleaseScript.from_json(json.loads(file)) if file is not None else None)
+            with self._lock:
+                self._release_scripts[config.full_name] = cached
+
+        # Callers may change the release script
+        return copy.deepcopy(cached[1])
+
+    def refresh(self, full_name: str) -> None:
+        with self._lock:
+            known = self._heads.get(full_name)
+            if known is not None:
+                # Check the commit on the next access
+                self._heads[full_name] = (known[0], float("-inf"))
 
     def unload(self, name: str) -> bool:
         key = next((k for k, v in self._loaded_repositories.items() if
                     v.full_name == name or v.short_name == name or k == name), None)
         if key is not None:
             del self._loaded_repositories[key]
+            self._index()
             return True
 
         return False
 
     def reload(self) -> None:
         self._loaded_repositories.clear()
+        self._index()
+        with self._lock:
+            self._heads.clear()
+            self._release_scripts.clear()
         self._load_startups()
 
         for repo in self.startup_repositories():
@@ -0,0 +1,149 @@
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from flask_github import GitHub, GitHubError, is_valid_response
+from typing_extensions import Self
+
+from ose.utils.github import get_file
+
+DEFAULT_WORKERS = 8
+
+
+class RepositorySnapshot:
+    """
+    Read-only view of the files of a repository at one commit.
+
+    The recursive tree of the commit is listed once. Files are then downloaded as git blobs, in parallel if several are
+    prefetched, instead of one contents request each. All files read from a snapshot belong to the same tree, even if
+    the branch moves meanwhile. Blobs are kept in memory by their sha, so files with the same content are downloaded
+    once.
+    """
+    _logger = logging.getLogger(__name__)
+
+    full_name: str
+    ref: str
+    commit_sha: str
+    tree_sha: str
+
+    # Blob sha and size by path
+    _entries: Dict[str, Tuple[str, int]]
+    _blobs: Dict[str, bytes]
+    _truncated: bool
+    _lock: threading.Lock
+
+    def __init__(self, gh: GitHub, full_name: str, ref: str, commit_sha: str, tree_sha: str,
+                 entries: Dict[str, Tuple[str, int]], truncated: bool = False):
+        self._gh = gh
+        self.full_name = full_name
+        self.ref = ref
+        self.commit_sha = commit_sha
+        self.tree_sha = tree_sha
+        self._entries = entries
+        self._truncated = truncated
+        self._blobs = dict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, gh: GitHub, full_name: str, ref: str) -> Self:
+        """
+        :param gh: GitHub client
+        :param full_name: Full name of the repository
+        :param ref: Branch, tag, or commit
+        :raises GitHubError: If the commit cannot be resolved or the tree cannot be listed
+        """
+        # Pin the ref to its current commit, so files read later come from the same tree even if the branch moves
+        response = gh.raw_request("GET", f"repos/{full_name}/commits/{ref}",
+                                  headers={"Accept": "application/vnd.github.sha"})
+        if not is_valid_response(response):
+            raise GitHubError(response)
+        commit_sha = response.text.strip()
+
+        tree = gh.get(f"repos/{full_name}/git/trees/{commit_sha}", params={"recursive": "true"})
+        entries = dict((e["path"], (e["sha"], e.get("size", 0))) for e in tree["tree"] if e["type"] == "blob")
+
+        truncated = tree.get("truncated", False)
+        if truncated:
+            cls._logger.warning(f"The tree of '{full_name}' at '{ref}' ({commit_sha}) is truncated. "
+                                f"Missing files are requested one by one.")
+
+        return cls(gh, full_name, ref, commit_sha, tree["sha"], entries, truncated)
+
+    def paths(self, include_pattern: Optional[Union[re.Pattern, str]] = None) -> List[str]:
+        """
+        :param include_pattern: Only paths matching this pattern are listed
+        :return: Paths of all files in the snapshot
+        """
+        return [p for p in self._entries if include_pattern is None or re.match(include_pattern, p)]
+
+    def __contains__(self, path: str) -> bool:
+        return path in self._entries
+
+    def prefetch(self, paths: Iterable[str], workers: int = DEFAULT_WORKERS) -> None:
+        """
+        Downloads the blobs of files in parallel, so later reads of them do not request GitHub.
+
+        Paths that are not in the snapshot are skipped.
+
+        :param paths: Files to download
+        :param workers: Number of concurrent requests
+        """
+        with self._lock:
+            missing = list(dict.fromkeys(self._entries[p][0] for p in paths
+                                         if p in self._entries and self._entries[p][0] not in self._blobs))
+
+        # The access token is usually looked up in the request context, which worker threads do not have
+        access_token = self._gh.get_access_token()
+        if access_token is None or workers <= 1 or len(missing) <= 1:
+            for sha in missing:
+                self._fetch(sha, access_token)
+            return
+
+        with ThreadPoolExecutor(max_workers=min(workers, len(missing))) as executor:
+            for _ in executor.map(lambda sha: self._fetch(sha, access_token), missing):
+                pass
+
+    def _fetch(self, sha: str, access_token: Optional[str]) -> bytes:
+        response = self._gh.raw_request("GET", f"repos/{self.full_name}/git/blobs/{sha}", access_token=access_token,
+                                        headers={"Accept": "application/vnd.github.raw"})
+        if not is_valid_response(response):
+            raise GitHubError(response)
+
+        with self._lock:
+            return self._blobs.setdefault(sha, response.content)
+
+    def read(self, path: str) -> bytes:
+        """
+        :param path: Path of the file in the repository
+        :return: The content of the file
+        :raises FileNotFoundError: If the file is not in the snapshot
+        """
+        entry = self._entries.get(path)
+        if entry is None:
+            if self._truncated:
+                return get_file(self._gh, self.full_name, path, branch=self.commit_sha)
+
+            raise FileNotFoundError(f"'{path}' is not in the snapshot of '{self.full_name}'")
+
+        with self._lock:
+            content = self._blobs.get(entry[0])
+
+        if content is None:
+            content = self._fetch(entry[0], self._gh.get_access_token())
+
+        return content
+
+    def write(self, path: str, local_path: str) -> None:
+        """
+        Writes a file of the snapshot to disk.
+
+        :param path: Path of the file in the repository
+        :param local_path: Where to write the file
+        """
+        content = self.read(path)
+        os.makedirs(os.path.dirname(local_path) or ".", exist_ok=True)
+        with open(local_path, "wb") as f:
+            f.write(content)
@@ -1,41 +1,113 @@
 import csv
 import hashlib
+import json
 import logging
 import os
+import shutil
+import signal
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from functools import reduce
 from multiprocessing import Pool
-from typing import Optional, Any, Dict, List, Union, Tuple, Literal
+from typing import Optional, Any, Dict, List, Union, Tuple, Literal, Set
 
-from .OntoloyBuildService import OntologyBuildService
+from .OntologyStore import OntologyStore
+from .OntologyTemplate import OntologyTemplate
+from .OntoloyBuildService import OntologyBuildService, ProgressCallback
+from .RobotWorker import RobotWorker, RobotWorkerError, find_robot_jar, robot_arguments, jvm_max_heap
 from ..model.ExcelOntology import ExcelOntology, OntologyImport
-from ..model.Relation import OWLPropertyType
 from ..model.Result import Result
-from ..model.TermIdentifier import TermIdentifier
 
 ROBOT = os.environ.get("ROBOT", "robot")
+# Run ROBOT commands in long-lived workers instead of starting a JVM for each command
+ROBOT_WORKER = os.environ.get("ROBOT_WORKER", "true").lower() not in ["0", "false", "no"]
+# Only use previously downloaded external ontologies
+EXTERNALS_OFFLINE = os.environ.get("EXTERNALS_OFFLINE", "false").lower() in ["1", "true", "yes"]
 
 
-def _import_id(imp: OntologyImport):
-    h = hashlib.sha256()
-    h.update(f"{imp.version_iri}|{imp.iri}".encode())
-    return h.hexdigest()
+def _available_memory() -> Optional[int]:
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
 
 
 class RobotOntologyBuildService(OntologyBuildService):
     _logger = logging.getLogger(__name__)
 
+    _lock: threading.Lock
+    _processes: Set[subprocess.Popen]
+    _canceled: bool
+    _catalog_entries: Dict[str, Set[str]]
+
+    _offline: bool
+    _workers: Optional[int]
+    _robot_version_cache: Optional[str]
+    _robot_jar: Optional[str]
+    _idle_workers: Dict[Optional[str], List[RobotWorker]]
+    _busy_workers: Set[RobotWorker]
+
+    def __init__(self, offline: bool = EXTERNALS_OFFLINE, workers: Optional[int] = None) -> None:
+        """
+        :param offline: Only use previously downloaded external ontologies
+        :param workers: Maximum number of slims extracted at the same time. Defaults to the number of CPUs. Always bounded
+                        by the available memory divided by the heap size of a ROBOT JVM.
+        """
+        self._offline = offline
+        self._workers = workers
+        self._lock = threading.Lock()
+        self._processes = set()
+        self._canceled = False
+        self._catalog_entries = {}
+
+        self._robot_version_cache = None
+        self._robot_jar = find_robot_jar(ROBOT) if ROBOT_WORKER else None
+        self._idle_workers = {}
+        self._busy_workers = set()
+
+    def __getstate__(self):
+        # Sent to pool workers. Running processes and locks stay with this instance.
+        return dict(_canceled=self._canceled, _offline=self._offline, _workers=self._workers,
+                    _robot_version_cache=self._robot_version_cache)
+
+    def __setstate__(self, state):
+        self.__init__(state["_offline"], state["_workers"])
+        self._canceled = state["_canceled"]
+        self._robot_version_cache = state["_robot_version_cache"]
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._canceled = True
+            for process in [*self._processes, *self._busy_workers]:
+                try:
+                    # Kill the whole process group as ROBOT is started through a shell
+                    os.killpg(process.pid, signal.SIGTERM)
+                except ProcessLookupError:
+                    pass
+
     def _create_catalog_file(self, tmp_dir, files: List[str]):
-        uris = "\n".join([f'<uri name="{f}" uri="file:{tmp_dir}/{f.split("/")[-1]}"/>' for f in files])
-        content = f"""<?xml version="1.0" encoding="UTF-8" standalone="no"?>
+        # Builds may run concurrently in the same directory. Keep the entries of all of them as each IRI is always
+        # mapped to the same file, and replace the catalog atomically.
+        with self._lock:
+            entries = self._catalog_entries.setdefault(tmp_dir, set())
+            entries.update(files)
+
+            uris = "\n".join([f'<uri name="{f}" uri="file:{tmp_dir}/{f.split("/")[-1]}"/>' for f in sorted(entries)])
+            content = f"""<?xml version="1.0" encoding="UTF-8" standalone="no"?>
 <catalog prefer="public" xmlns="urn:oasis:names:tc:entity:xmlns:xml:catalog">
     <group id="Folder Repository, directory=, recursive=true, Auto-Update=true, version=2" prefer="public" xml:base="">
 {uris}
     </group>
 </catalog>
 """
-        with open(os.path.join(tmp_dir, "catalog-v001.xml"), "w") as f:
-            f.write(content)
+            catalog_file = os.path.join(tmp_dir, "catalog-v001.xml")
+            with open(catalog_file + ".tmp", "w") as f:
+                f.write(content)
+            os.replace(catalog_file + ".tmp", catalog_file)
+
+    def register_dependencies(self, tmp_dir: str, dependency_iris: List[str]) -> None:
+        self._create_catalog_file(tmp_dir, dependency_iris)
 
     def merge_imports(self,
                       imports: List[OntologyImport],
@@ -44,7 +116,8 @@ class RobotOntologyBuildService(OntologyBuildService):
                       main_ontology_name: str,
                       tmp_dir: str,
                       renamings: List[Tuple[str, str, Literal["class", "object property", "data_property"]]],
-                      new_parents: List[Tuple[str, str, Literal["class", "object property", "data_property"]]]
+                      new_parents: List[Tuple[str, str, Literal["class", "object property", "data_property"]]],
+                      progress: Optional[ProgressCallback] = None
                       ) -> Result[str]:
 
         download_path = os.path.join("/", "tmp", "onto-ed-release", "robot-download-cache")
@@ -52,88 +125,161 @@ class RobotOntologyBuildService(OntologyBuildService):
         os.makedirs(download_path, exist_ok=True)
         result = Result()
         with Pool(2) as p:
+            urls = sorted({x.version_iri if x.version_iri is not None else x.iri for x in imports})
+            # The content of a version IRI does not change
+            version_iris = {x.version_iri for x in imports if x.version_iri is not None}
             results = p.starmap(self._download_ontology,
-                                {(x.version_iri if x.version_iri is not None else x.iri, _import_id(x), download_path)
-                                 for x in imports})
+                                [(url, download_path, url in version_iris) for url in urls])
             result = reduce(lambda a, b: a + b, results, result)
 
             if result.has_errors():
                 return result
 
-            for imp in imports:
-                src = os.path.join(download_path, _import_id(imp) + ".owl")
-                dst = os.path.join(download_path, imp.id + ".owl")
-                if os.path.exists(dst):
-                    os.unlink(dst)
-
-                os.link(src, dst)
+            stored = dict(zip(urls, (r.value for r in results)))
+            # ROBOT reads the files from the store. They are never changed, as they are named by their content, so
+            # concurrent releases may read the same file.
+            sources = dict((imp.id, stored[imp.version_iri if imp.version_iri is not None else imp.iri])
+                           for imp in imports)
+
+        # The extractions run in threads as the work is done by ROBOT. Threads share the ROBOT workers of this instance.
+        self._robot_version()
+        slims: Dict[str, Result] = dict()
+        with ThreadPoolExecutor(max_workers=self._slim_workers(len(imports))) as executor:
+            futures = dict((executor.submit(self._extract_slim_ontology, main_ontology_name, x, download_path,
+                                            sources[x.id], tmp_dir), x) for x in imports)
+            try:
+                for future in as_completed(futures):
+                    slims[futures[future].id] = future.result()
+                    if progress is not None:
+                        progress(len(slims), len(imports), futures[future].id)
+            except BaseException:
+                executor.shutdown(wait=False, cancel_futures=True)
+                self.cancel()
+                raise
 
-            results = p.starmap(self._extract_slim_ontology, [(main_ontology_name, x, download_path) for x in imports])
-            result = reduce(lambda a, b: a + b, results, result)
+        for imp in imports:
+            result += slims[imp.id]
 
-            if result.has_errors():
-                return result
+        if result.has_errors():
+            return result
 
-        result += self._merge_imported_ontologies(iri, outfile, main_ontology_name, download_path, imports, renamings,
+        result += self._merge_imported_ontologies(iri, outfile, main_ontology_name, tmp_dir, imports, renamings,
                                                   new_parents)
 
         return result
 
-    def _download_ontology(self, iri: str, name: str, download_path: str) -> Result[Union[str, Tuple]]:
-        out = os.path.join(download_path, name + ".owl")
-        if not os.path.exists(out):
-            get_ontology_cmd = f'curl -L "{iri}" > {out}'
-            result = self._execute_command(get_ontology_cmd, shell_flag=True)
+    def _slim_workers(self, imports: int) -> int:
+        """
+        Number of slims to extract at the same time. Each extraction runs its own JVM which can take several GB. Without
+        an explicit heap size a JVM takes up to a quarter of the physical memory.
+        """
+        workers = min(imports, self._workers or os.cpu_count() or 1)
 
-            if result.has_errors():
-                self._logger.error(f"Failed to download '{name}' from '{iri}'")
+        memory = _available_memory()
+        heap = jvm_max_heap()
+        if memory is not None:
+            workers = min(workers, memory // heap if heap is not None else 4)
 
-            return result
+        return max(1, workers)
 
-        return Result(())
+    def _download_ontology(self, iri: str, download_path: str, immutable: bool = False) -> Result[str]:
+        store = OntologyStore(os.path.join(download_path, "store"), offline=self._offline)
+        return store.fetch(iri, immutable=immutable)
+
+    def _robot_version(self) -> str:
+        if self._robot_version_cache is None:
+            result = self._execute_command(f"{ROBOT} --version")
+            self._robot_version_cache = result.value.strip() if result.ok() and not result.has_errors() else "unknown"
+
+        return self._robot_version_cache
+
+    def _slim_key(self, imp: OntologyImport, source_digest: str) -> str:
+        """
+        Digest of all inputs of a slim extraction. Equal keys yield equal slims, regardless of the order in which terms
+        or prefixes were given and of the ontology the import belongs to.
+        """
+        inputs = dict(
+            source=source_digest,
+            method="MIREOT",
+            upper_term=imp.root_id.id,
+            lower_terms=sorted({t.id for t in imp.imported_terms if t.id is not None}),
+            excluding=sorted({t.id for t in imp.excluding if t.id is not None}),
+            intermediates=imp.intermediates,
+            prefixes=sorted({f"{prefix}: {definition}" for prefix, definition in imp.prefixes}),
+            robot=self._robot_version(),
+        )
+
+        return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
 
     def _extract_slim_ontology(self,
                                main_ontology_name: str,
                                imp: OntologyImport,
-                               download_path: str) -> Result[Union[str, Tuple]]:
-        filename = os.path.join(download_path, f"{imp.id}.{main_ontology_name}.slim.owl")
-        slim_cmd = [ROBOT, 'merge',
-                    '--input', f'"{os.path.join(download_path, imp.id + ".owl")}"',
-                    'extract', '--method', 'MIREOT',
-                    '--annotate-with-source', 'true',
-                    '--upper-term', imp.root_id.id,
-                    '--intermediates', imp.intermediates,
-                    ]
-        for prefix, definition in imp.prefixes:
-            slim_cmd.append('--prefix')
-            slim_cmd.append(f'"{prefix}: {definition}"')
-
-        for term in imp.imported_terms:
-            slim_cmd.append('--lower-term')
-            slim_cmd.append(term.id)
-
-        if len(imp.excluding) > 0:
-            slim_cmd.extend(['remove', '--preserve-structure', 'false',
-                             *[a for x in imp.excluding for a in ['--term', x.id]]])
-
-        slim_cmd.extend(['--output', f'"{filename}"'])
-        slim_cmd = " ".join(slim_cmd)
-
-        if os.path.exists(filename) and os.path.exists(filename + ".cache"):
-            with open(filename + ".cache", "r") as f:
-                c = f.readlines()
-                if c is not None and len(c) >= 1:
-                    cache = c[0]
-                    if cache.strip() == slim_cmd.strip():
-                        return Result(())
-
-        result = self._execute_command(slim_cmd, shell_flag=True)
-        if result.ok():
-            with open(filename + ".cache", "w") as f:
-                f.writelines([slim_cmd])
-        return result
+                               download_path: str,
+                               source: str,
+                               tmp_dir: str) -> Result[Union[str, Tuple]]:
+        """
+        Extracts the slim of an imported ontology into the directory of the release.
 
-    def _merge_imported_ontologies(self, merged_iri: str, merged_file: str, main_ontology_name: str, download_path: str,
+        :param download_path: Directory shared between releases with the cached slims
+        :param source: File of the imported ontology in the store, named by the digest of its content
+        :param tmp_dir: Directory of the release
+        """
+        filename = os.path.join(tmp_dir, f"{imp.id}.{main_ontology_name}.slim.owl")
+
+        # Slims are cached by the digest of their inputs and shared between releases and repositories
+        key = self._slim_key(imp, os.path.splitext(os.path.basename(source))[0])
+        cached = os.path.join(download_path, "slims", f"{key}.owl")
+        os.makedirs(os.path.dirname(cached), exist_ok=True)
+
+        if not os.path.exists(cached):
+            tmp = os.path.join(download_path, "slims", f"{key}.{os.getpid()}.{threading.get_ident()}.tmp.owl")
+            slim_cmd = [ROBOT, 'merge',
+                        '--input', f'"{source}"',
+                        'extract', '--method', 'MIREOT',
+                        '--annotate-with-source', 'true',
+                        '--upper-term', imp.root_id.id,
+                        '--intermediates', imp.intermediates,
+                        ]
+            for prefix, definition in sorted(set(imp.prefixes)):
+                slim_cmd.append('--prefix')
+                slim_cmd.append(f'"{prefix}: {definition}"')
+
+            for term in sorted({t.id for t in imp.imported_terms if t.id is not None}):
+                slim_cmd.append('--lower-term')
+                slim_cmd.append(term)
+
+            if len(imp.excluding) > 0:
+                slim_cmd.extend(['remove', '--preserve-structure', 'false',
+                                 *[a for x in sorted({t.id for t in imp.excluding if t.id is not None})
+                                   for a in ['--term', x]]])
+
+            slim_cmd.extend(['--output', f'"{tmp}"'])
+
+            result = self._execute_command(" ".join(slim_cmd), shell_flag=True)
+            if not result.ok() or result.has_errors():
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+                return result
+
+            os.replace(tmp, cached)
+        else:
+            self._logger.debug(f"Using cached slim {key} of '{imp.id}'")
+
+        # Link under a unique name first, so the file is replaced atomically
+        tmp = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.link(cached, tmp)
+        except OSError:
+            # The release directory may be on another file system than the cache
+            shutil.copyfile(cached, tmp)
+        os.replace(tmp, filename)
+        if os.path.exists(tmp):
+            # Renaming a link onto another link of the same file does nothing
+            os.unlink(tmp)
+
+        return Result(())
+
+    def _merge_imported_ontologies(self, merged_iri: str, merged_file: str, main_ontology_name: str, tmp_dir: str,
                                    imports: List[OntologyImport],
                                    renamings: List[
                                        Tuple[str, str, Literal["class", "object property", "data_property"]]],
@@ -146,14 +292,14 @@ class RobotOntologyBuildService(OntologyBuildService):
         :param merged_iri: IRI of the new, merged ontology
         :param merged_file: Output filename
         :param main_ontology_name: Name of the main ontology to be included in an annotation
-        :param download_path: Path where the imported ontologies were downloaded
+        :param tmp_dir: Directory of the release with the extracted slims
         :return:
         """
         # Now merge all the imports into a single file
         cmd = [ROBOT]
 
         if len(renamings) + len(new_parents) > 0:
-            modifications_file = os.path.join(download_path, "external_modifications.csv")
+            modifications_file = os.path.join(tmp_dir, "external_modifications.csv")
             with open(modifications_file, "w") as f:
                 csv_writer = csv.DictWriter(f, ["ID", "Type", "Parent", "Label"])
                 csv_writer.writeheader()
@@ -177,7 +323,7 @@ class RobotOntologyBuildService(OntologyBuildService):
 
         for imp in imports:
             cmd.append('--input')
-            cmd.append(os.path.join(download_path, f"{imp.id}.{main_ontology_name}.slim.owl"))
+            cmd.append(os.path.join(tmp_dir, f"{imp.id}.{main_ontology_name}.slim.owl"))
 
         cmd.extend([
             'reason',
@@ -205,80 +351,12 @@ class RobotOntologyBuildService(OntologyBuildService):
             iri_prefix = iri_prefix[:-1]
 
         with open(os.path.join(tmp_dir, os.path.basename(outfile)) + ".csv", "w") as csv_file:
-            internal_relations = [r.id for r in ontology.used_relations() if
-                                  r.owl_property_type == OWLPropertyType.Internal]
-
-            header = [
-                ("type", "TYPE"),
-                ("id", "ID"),
-                ("label", "LABEL"),
-                ("parent class", "SC % SPLIT=;"),
-                ("parent relation", "SP % SPLIT=;"),
-                ("logical definition", "EC %"),
-                ("domain", "DOMAIN"),
-                ("range", "RANGE"),
-                ("equivalent relationship", "EP % SPLIT=;")
-            ]
-
-            for relation in ontology.used_relations():
-                if relation.owl_property_type == OWLPropertyType.AnnotationProperty:
-                    header.append((f"REL '{relation.label}'", f"A {relation.id} SPLIT=;"))
-                elif relation.owl_property_type in [OWLPropertyType.DataProperty, OWLPropertyType.ObjectProperty]:
-                    header.append((f"REL '{relation.label}'", f"SC '{relation.label}' some % SPLIT=;"))
-                else:
-                    pass
-
-            fieldnames = [k for k, _ in header]
-            writer = csv.DictWriter(csv_file, fieldnames, delimiter=',', quotechar='\"', quoting=csv.QUOTE_MINIMAL)
-
-            writer.writeheader()
-            writer.writerow(dict(header))
-
-            for term in ontology.terms():
-                row = {
-                    "type": "class",
-                    "id": term.id,
-                    "label": term.label,
-                    "parent class": ";".join(t.id for t in term.sub_class_of),
-                    "logical definition": ";".join(t for t in term.equivalent_to)
-                }
-
-                for relation, value in term.relations:
-                    if relation.id in internal_relations:
-                        continue
-
-                    row[f"REL '{relation.label}'"] = value.id if isinstance(value, TermIdentifier) else value
-
-                writer.writerow(row)
-
-            for relation in ontology.relations():
-                if relation.owl_property_type == OWLPropertyType.Internal:
-                    continue
-
-                typ = {
-                    OWLPropertyType.AnnotationProperty: "annotation property",
-                    OWLPropertyType.ObjectProperty: "object property",
-                    OWLPropertyType.DataProperty: "data property"
-                }[relation.owl_property_type]
-                row = {
-                    "type": typ,
-                    "id": relation.id,
-                    "label": relation.label,
-                    "parent relation": ";".join(r.id for r in relation.sub_property_of),
-                    "domain": relation.domain.id if relation.domain is not None else None,
-                    "range": relation.range.id if relation.range is not None else None,
-                    "equivalent relationship": ";".join(p.id for p in relation.equivalent_relations)
-                }
-
-                for r, value in relation.relations:
-                    row[f"REL '{r.label}'"] = value
-
-                writer.writerow(row)
+            OntologyTemplate.from_ontology(ontology).write_csv(csv_file)
 
             # A bit of hacking to deal appropriately with external dependency files:
             command: List[str] = [ROBOT]
             if dependency_iris is not None and len(dependency_iris) > 0:
-                dependency_file_name = os.path.join(tmp_dir, "imports.owl")
+                dependency_file_name = os.path.join(tmp_dir, os.path.basename(outfile) + ".imports.owl")
                 # with NamedTemporaryFile("w", suffix="import.owl") as dependency_f:
                 with open(dependency_file_name, "w") as dependency_f:
 
@@ -386,14 +464,32 @@ class RobotOntologyBuildService(OntologyBuildService):
     #                   .replace("http://www.semanticweb.org/ontologies/temporary", iri_prefix), end='')
 
     def _execute_command(self, command_str: str, shell_flag=True, cwd=None) -> Result[str]:
+        args = robot_arguments(command_str, ROBOT) if self._robot_jar is not None else None
+        if args is not None:
+            result = self._execute_in_worker(command_str, args, cwd)
+            if result is not None:
+                return result
+
         result = Result()
         self._logger.debug(f"Executing command: {command_str}")
-        output = subprocess.Popen(command_str,
-                                  cwd=cwd,
-                                  shell=shell_flag,
-                                  stdout=subprocess.PIPE,
-                                  stderr=subprocess.STDOUT)
-        stdout, stderr = output.communicate()
+        with self._lock:
+            if self._canceled:
+                result.error(type="canceled", command=command_str, msg="The build was canceled")
+                return result
+
+            output = subprocess.Popen(command_str,
+                                      cwd=cwd,
+                                      shell=shell_flag,
+                                      stdout=subprocess.PIPE,
+                                      stderr=subprocess.STDOUT,
+                                      start_new_session=True)
+            self._processes.add(output)
+
+        try:
+            stdout, stderr = output.communicate()
+        finally:
+            with self._lock:
+                self._processes.discard(output)
 
         if output.returncode != 0:
             sout = stdout.decode() if stdout is not None else None
@@ -408,5 +504,61 @@ class RobotOntologyBuildService(OntologyBuildService):
         result.value = stdout.decode()
         return result
 
+    def _execute_in_worker(self, command_str: str, args: List[str], cwd: Optional[str]) -> Optional[Result[str]]:
+        """
+        Executes a ROBOT command in a long-lived worker.
+
+        :return: The result of the command or None if no worker is available and the command must be executed in a
+                 shell instead
+        """
+        result = Result()
+        self._logger.debug(f"Executing command in ROBOT worker: {command_str}")
+
+        with self._lock:
+            idle = self._idle_workers.get(cwd, [])
+            worker = idle.pop() if len(idle) > 0 else None
+
+        try:
+            if worker is None or not worker.alive():
+                worker = RobotWorker(self._robot_jar, cwd)
+        except (OSError, RobotWorkerError) as e:
+            self._logger.warning(f"Failed to start ROBOT worker. Falling back to a new process for each command: {e}")
+            self._robot_jar = None
+            return None
+
+        with self._lock:
+            if self._canceled:
+                worker.close()
+                result.error(type="canceled", command=command_str, msg="The build was canceled")
+                return result
+
+            self._busy_workers.add(worker)
+
+        try:
+            code, output = worker.execute(args)
+        except RobotWorkerError as e:
+            with self._lock:
+                self._busy_workers.discard(worker)
+                if self._canceled:
+                    result.error(type="canceled", command=command_str, msg="The build was canceled")
+                    return result
+
+            self._logger.warning(f"ROBOT worker failed. Executing the command in a new process: {e}")
+            return None
+
+        with self._lock:
+            self._busy_workers.discard(worker)
+            self._idle_workers.setdefault(cwd, []).append(worker)
+
+        if code != 0:
+            result.error(command=command_str,
+                         out=output,
+                         err=None,
+                         code=code)
+            self._logger.error(f"Command exited with code {code}: {command_str}\nOUTPUT: {output}")
+
+        result.value = output
+        return result
+
     def collapse_imports(self, file: str) -> Result[Any]:
         return self._execute_command(f'{ROBOT} merge --input "{file}" --output "{file}" -c true')
@@ -0,0 +1,63 @@
+import java.io.BufferedReader;
+import java.io.ByteArrayOutputStream;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.io.PrintStream;
+import java.nio.charset.StandardCharsets;
+import java.util.Base64;
+
+import org.obolibrary.robot.CommandLineInterface;
+
+/**
+ * Runs ROBOT commands in a long-lived JVM to avoid paying the JVM startup for every command.
+ *
+ * Started by ose.services.RobotWorker with ROBOT on the class path. Each request is a single line on stdin with the
+ * base64 encoded arguments separated by spaces, i.e. the command line of ROBOT without the leading "robot". A command
+ * may chain several ROBOT commands which then share the loaded ontology. Each response is a single line on stdout
+ * starting with the response marker followed by the exit code and the base64 encoded output of the command. Other
+ * lines on stdout, e.g. from loggers, must be ignored by the reader. The worker exits when stdin is closed.
+ */
+public class RobotWorker {
+    private static final String MARKER = "@@robot-worker@@";
+
+    public static void main(String[] args) throws IOException {
+        PrintStream protocol = System.out;
+        PrintStream stderr = System.err;
+        BufferedReader in = new BufferedReader(new InputStreamReader(System.in, StandardCharsets.UTF_8));
+        Base64.Decoder decoder = Base64.getDecoder();
+        Base64.Encoder encoder = Base64.getEncoder();
+
+        protocol.println(MARKER + " ready");
+        protocol.flush();
+
+        String line;
+        while ((line = in.readLine()) != null) {
+            String[] encoded = line.isBlank() ? new String[0] : line.trim().split(" ");
+            String[] command = new String[encoded.length];
+            for (int i = 0; i < encoded.length; i++) {
+                command[i] = new String(decoder.decode(encoded[i]), StandardCharsets.UTF_8);
+            }
+
+            ByteArrayOutputStream output = new ByteArrayOutputStream();
+            PrintStream capture = new PrintStream(output, true, StandardCharsets.UTF_8);
+            System.setOut(capture);
+            System.setErr(capture);
+
+            int code = 0;
+            try {
+                CommandLineInterface.execute(command);
+            } catch (Throwable e) {
+                capture.println(e.getMessage());
+                e.printStackTrace(capture);
+                code = 1;
+            } finally {
+                capture.flush();
+                System.setOut(protocol);
+                System.setErr(stderr);
+            }
+
+            protocol.println(MARKER + " " + code + " " + encoder.encodeToString(output.toByteArray()));
+            protocol.flush();
+        }
+    }
+}
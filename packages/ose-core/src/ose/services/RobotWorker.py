@@ -0,0 +1,155 @@
+import base64
+import logging
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import weakref
+from typing import Optional, List, Tuple
+
+JAVA = os.environ.get("JAVA", "java")
+ROBOT_JAVA_ARGS = os.environ.get("ROBOT_JAVA_ARGS", "")
+
+_SOURCE = os.path.join(os.path.dirname(__file__), "RobotWorker.java")
+_MARKER = b"@@robot-worker@@"
+
+
+class RobotWorkerError(Exception):
+    """
+    The worker could not be started or stopped responding.
+    """
+    pass
+
+
+def find_robot_jar(robot: str) -> Optional[str]:
+    """
+    Locates the ROBOT jar. Either given by the environment variable ``ROBOT_JAR`` or next to the ROBOT script.
+
+    :param robot: Name or path of the ROBOT script
+    :return: Path of the jar if found
+    """
+    jar = os.environ.get("ROBOT_JAR")
+    if jar is not None:
+        return jar if os.path.exists(jar) else None
+
+    script = shutil.which(robot)
+    if script is None:
+        return None
+
+    jar = os.path.join(os.path.dirname(os.path.realpath(script)), "robot.jar")
+    return jar if os.path.exists(jar) else None
+
+
+def jvm_max_heap() -> Optional[int]:
+    """
+    Maximum heap size of a ROBOT JVM as set by ``-Xmx`` in ``ROBOT_JAVA_ARGS``.
+
+    :return: The heap size in bytes or None if not set
+    """
+    match = re.findall(r"-Xmx(\d+)([kKmMgGtT]?)", ROBOT_JAVA_ARGS)
+    if len(match) == 0:
+        return None
+
+    # The last option wins like for the JVM itself
+    size, unit = match[-1]
+    return int(size) * {"": 1, "k": 1024, "m": 1024 ** 2, "g": 1024 ** 3, "t": 1024 ** 4}[unit.lower()]
+
+
+def robot_arguments(command: str, robot: str) -> Optional[List[str]]:
+    """
+    Splits a shell command into the arguments of ROBOT.
+
+    :param command: The shell command
+    :param robot: Name or path of the ROBOT script the command starts with
+    :return: The arguments after the ROBOT script or None if the command is not a plain ROBOT command, e.g. if it uses
+             pipes, redirects, or variables
+    """
+    if "$" in command or "`" in command:
+        return None
+
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=True)
+    lexer.whitespace_split = True
+    try:
+        tokens = list(lexer)
+    except ValueError:
+        return None
+
+    if len(tokens) == 0 or tokens[0] != robot:
+        return None
+
+    if any(t and all(c in lexer.punctuation_chars for c in t) for t in tokens):
+        return None
+
+    return tokens[1:]
+
+
+class RobotWorker:
+    """
+    A long-lived JVM executing ROBOT commands sent over a pipe. See ``RobotWorker.java`` for the protocol.
+
+    A worker executes one command at a time. Relative paths are resolved against the working directory the worker was
+    started in.
+    """
+    _logger = logging.getLogger(__name__)
+
+    _process: subprocess.Popen
+    cwd: Optional[str]
+
+    def __init__(self, jar: str, cwd: Optional[str] = None) -> None:
+        self.cwd = cwd
+        self._process = subprocess.Popen([JAVA, *shlex.split(ROBOT_JAVA_ARGS), "-cp", jar, _SOURCE],
+                                         cwd=cwd,
+                                         stdin=subprocess.PIPE,
+                                         stdout=subprocess.PIPE,
+                                         start_new_session=True)
+        # Closing stdin lets the JVM exit once the worker is no longer referenced
+        weakref.finalize(self, self._process.stdin.close)
+
+        try:
+            self._read_response()
+        except RobotWorkerError:
+            self.close()
+            raise
+
+    @property
+    def pid(self) -> int:
+        return self._process.pid
+
+    def alive(self) -> bool:
+        return self._process.poll() is None
+
+    def execute(self, args: List[str]) -> Tuple[int, str]:
+        """
+        Executes a ROBOT command.
+
+        :param args: The arguments of ROBOT, e.g. ``["merge", "--input", "a.owl", "--output", "b.owl"]``
+        :return: The exit code and the output of the command
+        """
+        request = b" ".join(base64.b64encode(a.encode()) for a in args) + b"\n"
+        try:
+            self._process.stdin.write(request)
+            self._process.stdin.flush()
+        except (BrokenPipeError, ValueError) as e:
+            raise RobotWorkerError("The ROBOT worker is not running") from e
+
+        code, _, output = self._read_response().partition(" ")
+        return int(code), base64.b64decode(output).decode(errors="replace")
+
+    def _read_response(self) -> str:
+        while True:
+            line = self._process.stdout.readline()
+            if not line:
+                raise RobotWorkerError(f"The ROBOT worker exited with code {self._process.wait()}")
+
+            if line.startswith(_MARKER):
+                return line[len(_MARKER):].decode().strip()
+
+            self._logger.debug(f"ROBOT worker: {line.decode(errors='replace').rstrip()}")
+
+    def close(self) -> None:
+        try:
+            self._process.stdin.close()
+            self._process.wait(timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            self._process.kill()
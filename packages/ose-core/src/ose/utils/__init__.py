@@ -1,8 +1,9 @@
 from .github import (get_spreadsheet, get_spreadsheets, get_file, save_file, download_file,
                      get_csv, merge_pr, create_pr, create_branch)
-from .strings import str_empty, letters, str_space_eq, lower
+from .spreadsheets import open_sheet
+from .strings import str_empty, letters, str_space_eq, str_space_normalise, lower
 
 __all__ = [
     "get_spreadsheet", "get_spreadsheets", "get_file", "save_file", "download_file", "get_csv", "merge_pr", "create_pr",
-    "create_branch", "str_empty", "letters", "str_space_eq", "lower"
+    "create_branch", "str_empty", "letters", "str_space_eq", "str_space_normalise", "lower", "open_sheet"
 ]
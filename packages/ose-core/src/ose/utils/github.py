@@ -5,21 +5,122 @@ import csv
 import io
 import logging
 import re
-from typing import List, Tuple, Dict, Optional, Literal, Union
+import threading
+from collections import OrderedDict
+from typing import List, Tuple, Dict, Optional, Literal, Union, Any, Hashable, NamedTuple
 
-import openpyxl
-from flask_github import GitHub, GitHubError
+from flask_github import GitHub, GitHubError, is_json_response, is_valid_response
+
+from .spreadsheets import open_sheet
 
 _logger = logging.getLogger(__name__)
 
 
+class _Revalidatable(NamedTuple):
+    etag: str
+    content: Any
+    size: int
+
+
+class RevalidationCache:
+    """
+    Responses of the GitHub API kept with their ETag.
+
+    A resource that was fetched before is requested again with ``If-None-Match``. If it did not change, GitHub
+    answers with 304 Not Modified without a body, which does not count against the rate limit, and the kept response
+    is returned. GitHub only answers 304 if the user may read the resource, so responses are shared between users. The
+    least recently used responses are dropped once their total size exceeds ``max_bytes``.
+    """
+    max_bytes: int
+
+    _responses: "OrderedDict[Hashable, _Revalidatable]"
+    _size: int
+    _lock: threading.Lock
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._responses = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, github: GitHub, resource: str, params: Optional[Dict[str, str]] = None,
+            headers: Optional[Dict[str, str]] = None, raw: bool = False) -> Any:
+        """
+        Requests a resource like ``GitHub.get`` but revalidates a kept response instead of fetching it again.
+
+        :param github: GitHub client
+        :param resource: Resource to request, e.g. "repos/{owner}/{repo}/contents/{path}"
+        :param params: Query parameters, e.g. the branch as "ref"
+        :param headers: Request headers, e.g. "Accept" for the raw content of a file
+        :param raw: Whether to return the content as bytes even for JSON responses
+        :return: The decoded JSON for JSON responses, the raw content otherwise
+        """
+        params = params or {}
+        headers = dict(headers or {})
+        key = (resource, tuple(sorted(params.items())), headers.get("Accept"), raw)
+
+        with self._lock:
+            kept = self._responses.get(key)
+        if kept is not None:
+            headers["If-None-Match"] = kept.etag
+
+        response = github.raw_request("GET", resource, headers=headers, params=params)
+        if kept is not None and response.status_code == 304:
+            with self._lock:
+                if key in self._responses:
+                    self._responses.move_to_end(key)
+            return kept.content
+
+        if not is_valid_response(response):
+            raise GitHubError(response)
+
+        content = response.json() if is_json_response(response) and not raw else response.content
+        etag = response.headers.get("ETag")
+        if etag is not None:
+            self._keep(key, _Revalidatable(etag, content, len(response.content)))
+
+        return content
+
+    def _keep(self, key: Hashable, response: _Revalidatable) -> None:
+        with self._lock:
+            previous = self._responses.pop(key, None)
+            if previous is not None:
+                self._size -= previous.size
+
+            if response.size > self.max_bytes:
+                return
+
+            self._responses[key] = response
+            self._size += response.size
+            while self._size > self.max_bytes:
+                _, dropped = self._responses.popitem(last=False)
+                self._size -= dropped.size
+
+    def clear(self) -> None:
+        with self._lock:
+            self._responses.clear()
+            self._size = 0
+
+
+revalidation_cache = RevalidationCache()
+
+
+def get_revalidated(github: GitHub, resource: str, params: Optional[Dict[str, str]] = None,
+                    headers: Optional[Dict[str, str]] = None, raw: bool = False) -> Any:
+    """
+    Requests a resource from GitHub with a conditional request if it was requested before. See ``RevalidationCache``.
+    """
+    return revalidation_cache.get(github, resource, params, headers, raw)
+
+
 def get_csv(github: GitHub,
             repository_name: str,
             folder: str,
             spreadsheet_name: str,
             branch: Optional[str] = None) -> Tuple[str, List[List[str]], List[str]]:
     params = {"ref": branch} if branch else {}
-    csv_file = github.get(
+    csv_file = get_revalidated(
+        github,
         f'repos/{repository_name}/contents/{folder}/{spreadsheet_name}',
         params=params
     )
@@ -45,28 +146,27 @@ def download_file(github: GitHub, repository_name: str, spreadsheet: str, outpat
 
 def get_file(github: GitHub, repository_name: str, spreadsheet: str, branch: Optional[str] = None) -> bytes:
     params = {"ref": branch} if branch else {}
-    response = github.get(
+    return get_revalidated(
+        github,
         f'repos/{repository_name}/contents/{spreadsheet}',
         headers={
             "Accept": "application/vnd.github.raw+json"
         },
-        params=params
+        params=params,
+        raw=True
     )
-    return response.content
 
 
 def parse_spreadsheet(data: bytes) -> Tuple[List[Dict[str, str]], List[str]]:
-    wb = openpyxl.load_workbook(io.BytesIO(data))
-    sheet = wb.active
+    _, row_iterator = open_sheet(data)
 
-    header = [cell.value for cell in sheet[1] if cell.value]
+    header = [value for value in next(row_iterator, ()) if value]
     rows = []
-    row_iterator = sheet.rows
-    next(row_iterator)  # Skip header
     for row in row_iterator:
         values = {}
-        for key, cell in zip(header, row):
-            values[key] = cell.value
+        # Trailing empty cells are not part of the row
+        for i, key in enumerate(header):
+            values[key] = row[i] if i < len(row) else None
         if any(values.values()):
             rows.append(values)
 
@@ -78,7 +178,8 @@ def get_spreadsheet(github: GitHub,
                     path: str,
                     branch: Optional[str] = None) -> Tuple[str, List[Dict[str, str]], List[str]]:
     params = {"ref": branch} if branch else {}
-    spreadsheet_file = github.get(
+    spreadsheet_file = get_revalidated(
+        github,
         f'repos/{repository_name}/contents/{path}',
         params=params
     )
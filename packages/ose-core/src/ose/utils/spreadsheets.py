@@ -0,0 +1,38 @@
+from io import BytesIO
+from typing import Any, Iterator, Tuple, Union
+
+import openpyxl
+
+SheetRow = Tuple[Any, ...]
+
+
+def open_sheet(file: Union[bytes, str, BytesIO]) -> Tuple[str, Iterator[SheetRow]]:
+    """
+    Opens the active sheet of an Excel file for streaming reads.
+
+    The workbook is loaded in read-only mode and rows are produced as plain tuples of cell values. No cell objects or
+    styles are created and the workbook is never held in memory as a whole. The workbook is closed once all rows have
+    been consumed or the row iterator is discarded.
+
+    Rows may be shorter than the header if their trailing cells are empty. Empty rows in between are produced as empty
+    tuples so that row numbers stay aligned with the sheet.
+
+    :param file: The Excel file. Either a filename, bytes of the Excel file, or a file-like object
+    :return: Title of the active sheet and an iterator over its rows, starting with the header
+    """
+    if isinstance(file, bytes):
+        file = BytesIO(file)
+
+    wb = openpyxl.load_workbook(file, read_only=True)
+    sheet = wb.active
+
+    # The dimensions stored in the file are not always correct. Determine them from the cells instead.
+    sheet.reset_dimensions()
+
+    def rows() -> Iterator[SheetRow]:
+        try:
+            yield from sheet.iter_rows(values_only=True)
+        finally:
+            wb.close()
+
+    return sheet.title, rows()
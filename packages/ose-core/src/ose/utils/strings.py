@@ -1,6 +1,8 @@
 import re
 import typing
 
+_REPEATED_SPACES = re.compile(r"\s{2,}")
+
 
 def str_empty(value: typing.Optional[str]) -> bool:
     return value is None or not any(value.strip())
@@ -16,22 +18,21 @@ def str_space_eq(a: typing.Optional[str], b: typing.Optional[str], none_as_empty
     @param none_as_empty: Whether `None` should be treated as empty string
     @return:
     """
-    if a is None and b is None:
-        return True
-
-    if a is None and none_as_empty:
-        a = ""
+    return str_space_normalise(a, none_as_empty) == str_space_normalise(b, none_as_empty)
 
-    if b is None and none_as_empty:
-        b = ""
 
-    if a is None or b is None:
-        return False
+def str_space_normalise(value: typing.Optional[str], none_as_empty=True) -> typing.Optional[str]:
+    """
+    Normalises a string such that two strings are equal if and only if they are equivalent according to `str_space_eq`
 
-    a = re.sub(r"\s{2,}", " ", a)
-    b = re.sub(r"\s{2,}", " ", b)
+    @param value: String to normalise
+    @param none_as_empty: Whether `None` should be treated as empty string
+    @return: The normalised string
+    """
+    if value is None:
+        return "" if none_as_empty else None
 
-    return a.strip() == b.strip()
+    return _REPEATED_SPACES.sub(" ", value).strip()
 
 
 def lower(string: typing.Optional[str]) -> typing.Optional[str]:
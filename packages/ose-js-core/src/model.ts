@@ -112,6 +112,8 @@ export interface RepositoryConfig {
     }
     readonly_files: {[K: string]: string}
     validation: ("include-external" | "include-dependencies")[]
+    ontology_builder: "robot" | "horned-owl"
+    incremental_releases: boolean
 }
 
 interface _BaseChangeRecord {
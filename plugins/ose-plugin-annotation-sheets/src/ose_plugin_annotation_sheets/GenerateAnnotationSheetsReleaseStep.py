@@ -128,7 +128,14 @@ class GenerateAnnotationSheetsReleaseStep(ReleaseStep):
         for idx, (file_key, file) in enumerate(files):
             self._next_item(item=file.target.file, message="Generating annotation sheet for")
 
-            G, ontology = build_hierarchy(file, self._artifacts(), self._local_name, self._repo_config.prefixes)
+            parsed = self._resolved_ontology(file_key)
+            result += parsed
+            if not parsed.ok():
+                self._set_release_result(result)
+                return False
+
+            G, ontology = build_hierarchy(file, self._artifacts(), self._local_name, self._repo_config.prefixes,
+                                          parsed.value)
             sheet_name = self._sheet_display_name(file_key)
             # Excel sheet names are limited to 31 characters
             sheet_name = sheet_name[:31]
@@ -49,13 +49,14 @@ class BCIOSearchReleaseStep(ReleaseStep):
             result += ontology.add_imported_terms(s.file, xlsx)
 
         for i, (k, file) in enumerate(sources):
-            for s in file.sources:
-                if s.type == "classes":
-                    result += ontology.add_terms_from_excel(s.file, self._local_name(s.file))
-                elif s.type == "relations":
-                    result += ontology.add_relations_from_excel(s.file, self._local_name(s.file))
-
-                self._raise_if_canceled()
+            parsed = self._resolved_ontology(k)
+            result += parsed
+            if not parsed.ok():
+                self._set_release_result(result)
+                return False
+
+            ontology.merge_copies(parsed.value)
+            self._raise_if_canceled()
 
         ontology.resolve()
         self._raise_if_canceled()
@@ -1,4 +1,3 @@
-import json
 from io import BytesIO
 from typing import Annotated, List
 
@@ -10,7 +9,6 @@ from flask_github import GitHub
 
 from ose.model.Script import Script
 import ose.utils.github as github
-from ose.model.ReleaseScript import ReleaseScript
 from ose.model.Result import Result
 from ose.services.ConfigurationService import ConfigurationService
 from ose.utils import str_space_eq, lower
@@ -35,11 +33,9 @@ class UpdateImportsToLatestVersionsScript(Script):
         
         assert repository is not None, f"Repository configuration for '{repo}' not found."
         
-        release_script_json = self.config.get_file(repository, repository.release_script_path)
-        
-        assert release_script_json is not None, f"Release script not found at '{repository.release_script_path}'"
-        
-        release_script = ReleaseScript.from_json(json.loads(release_script_json))
+        release_script = self.config.load_release_script(repository)
+
+        assert release_script is not None, f"Release script not found at '{repository.release_script_path}'"
 
         for source in release_script.external.sources:
             file = self.config.get_file_raw(repository, source.file)
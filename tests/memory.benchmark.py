@@ -0,0 +1,70 @@
+"""
+Measures the resident memory needed to hold terms in an ExcelOntology.
+
+The terms mimic externals loaded with ExcelOntology.from_owl and sheets with a few annotations each, i.e. every term
+has a parent, a definition, and a curation status. Run it on two revisions to compare the memory footprint of the model
+classes:
+
+    python tests/memory.benchmark.py --terms 100000
+"""
+import argparse
+import gc
+import resource
+import sys
+
+from ose.model.ExcelOntology import ExcelOntology
+from ose.model.Term import Term
+from ose.model.TermIdentifier import TermIdentifier
+
+
+def rss() -> int:
+    """
+    Current resident set size in bytes.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        # Peak instead of current RSS. Still sufficient as the benchmark only allocates.
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def build(n: int) -> ExcelOntology:
+    ontology = ExcelOntology("https://example.com/")
+    for i in range(n):
+        # Fresh strings for every term as they would come from a spreadsheet cell or an OWL file
+        ontology.add_term(Term(
+            id=f"EX:{i:07d}",
+            label=f"term {i}",
+            origin=("benchmark", i),
+            relations=[
+                (TermIdentifier("IAO:" + "0000115", "definition"), f"Definition of term {i}"),
+                (TermIdentifier("IAO:" + "0000114", "has curation status"), "Published"),
+            ],
+            sub_class_of=[TermIdentifier(f"EX:{i // 100:07d}", f"term {i // 100}")],
+            equivalent_to=[],
+            disjoint_with=[],
+        ))
+
+    return ontology
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--terms", type=int, default=100_000, help="Number of terms to create")
+    args = parser.parse_args()
+
+    gc.collect()
+    before = rss()
+    ontology = build(args.terms)
+    gc.collect()
+    after = rss()
+
+    per_100k = (after - before) / args.terms * 100_000
+    print(f"{len(ontology.terms())} terms: {(after - before) / 2 ** 20:.1f} MiB, "
+          f"{per_100k / 2 ** 20:.1f} MiB RSS per 100k terms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Checks that the py-horned-owl builder produces the same axioms as ROBOT for a release file.
+
+Both builders build the given spreadsheets without dependencies, i.e. ROBOT only runs `template` and `annotate`. The
+built files are loaded with py-horned-owl and their axioms are compared. Requires ROBOT:
+
+    python tests/ontology_builder.equivalence.py --iri http://example.com/ex.owl --prefix EX=http://example.com/EX_ \\
+        --externals externals.owl --relations relations.xlsx classes.xlsx
+
+Exits with 1 if the axioms differ.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from typing import Optional
+
+import pyhornedowl
+
+from ose.model.ExcelOntology import ExcelOntology
+from ose.services.HornedOwlOntologyBuildService import HornedOwlOntologyBuildService
+from ose.services.OntoloyBuildService import OntologyBuildService
+from ose.services.RobotOntologyBuildService import RobotOntologyBuildService
+
+
+def axioms(file: str) -> set[str]:
+    return set(str(a) for a in pyhornedowl.open_ontology_from_file(file).get_axioms())
+
+
+def build(builder: OntologyBuildService, ontology: ExcelOntology, prefixes: dict[str, str],
+          tmp: str) -> Optional[set[str]]:
+    outfile = os.path.join(tmp, "ontology.owl")
+    start = time.perf_counter()
+    result = builder.build_ontology(ontology, outfile, prefixes, None, tmp, ontology.iri())
+    print(f"{type(builder).__name__}: {time.perf_counter() - start:.2f} s")
+
+    for error in result.errors:
+        print(f"  error: {error}")
+
+    return axioms(outfile) if not result.has_errors() else None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("classes", nargs="+", help="Spreadsheets with classes")
+    parser.add_argument("--iri", required=True, help="IRI of the built ontology")
+    parser.add_argument("--prefix", action="append", default=[], help="Prefix as NAME=IRI")
+    parser.add_argument("--relations", action="append", default=[], help="Spreadsheets with relations")
+    parser.add_argument("--externals", help="OWL file of the imported external terms to resolve labels")
+    args = parser.parse_args()
+
+    prefixes = dict(p.split("=", 1) for p in args.prefix)
+
+    ontology = ExcelOntology(args.iri)
+    if args.externals is not None:
+        ontology.import_other_excel_ontology(ExcelOntology.from_owl(args.externals, prefixes).value)
+    for file in args.relations:
+        ontology.add_relations_from_excel(os.path.basename(file), file)
+    for file in args.classes:
+        ontology.add_terms_from_excel(os.path.basename(file), file)
+    ontology.resolve()
+
+    with tempfile.TemporaryDirectory() as robot_tmp, tempfile.TemporaryDirectory() as horned_tmp:
+        expected = build(RobotOntologyBuildService(), ontology, prefixes, robot_tmp)
+        actual = build(HornedOwlOntologyBuildService(), ontology, prefixes, horned_tmp)
+
+    if expected is None or actual is None:
+        return 1
+
+    for axiom in sorted(expected - actual):
+        print(f"- {axiom}")
+    for axiom in sorted(actual - expected):
+        print(f"+ {axiom}")
+
+    print(f"{len(expected & actual)} equal, {len(expected - actual)} only ROBOT, {len(actual - expected)} only py-horned-owl")
+    return 0 if expected == actual else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())